@@ -0,0 +1,123 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from main import WritePolicy, download_http, move_into_place, parse_size, format_size
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """Static file handler that honours single byte ranges, like a video CDN."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        range_header = self.headers.get('Range')
+        if range_header and range_header.startswith('bytes='):
+            first, _, last = range_header[6:].partition('-')
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            try:
+                while remaining > 0:
+                    data = f.read(min(remaining, 1024 * 1024))
+                    if not data:
+                        break
+                    self.wfile.write(data)
+                    remaining -= len(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Client stopped reading, e.g. a probe request
+
+def start_server(directory):
+    handler = lambda *args, **kwargs: RangeRequestHandler(*args, directory=directory, **kwargs)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run_scenario(name, policy, url, size, output_dir, parallel):
+    # Download the test file `parallel` times at once and report aggregate throughput
+    def fetch(index):
+        target = os.path.join(output_dir, f"{name}-{index}.bin")
+        if policy.staging_dir:
+            staged = os.path.join(policy.staging_dir, f"{name}-{index}.bin")
+            download_http(url, staged, policy, expected_size=size)
+            move_into_place(staged, target, fsync=policy.fsync_interval > 0)
+        else:
+            download_http(url, target, policy, expected_size=size)
+        return target
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        targets = list(executor.map(fetch, range(parallel)))
+    elapsed = time.monotonic() - started
+    for target in targets:
+        os.remove(target)
+    throughput = size * parallel / elapsed
+    print(f"{name:<28} {elapsed:8.2f}s {format_size(throughput):>12}/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark download write-path settings against a local server")
+    parser.add_argument('--size', type=parse_size, default='256M', help="size of the test file")
+    parser.add_argument('--parallel', type=int, default=4, help="simultaneous downloads per scenario")
+    parser.add_argument('--output-dir', help="where files are written (e.g. a NAS mount), default a temp dir")
+    parser.add_argument('--staging-dir', help="fast local directory for the staging scenario")
+    args = parser.parse_args()
+
+    source_dir = tempfile.mkdtemp(prefix='tubemaster-bench-src-')
+    output_dir = args.output_dir or tempfile.mkdtemp(prefix='tubemaster-bench-out-')
+    staging_dir = args.staging_dir or tempfile.mkdtemp(prefix='tubemaster-bench-stage-')
+    os.makedirs(output_dir, exist_ok=True)
+
+    source = os.path.join(source_dir, 'video.bin')
+    with open(source, 'wb') as f:
+        block = os.urandom(1024 * 1024)
+        for _ in range(args.size // len(block)):
+            f.write(block)
+    size = os.path.getsize(source)
+
+    server = start_server(source_dir)
+    url = f"http://127.0.0.1:{server.server_address[1]}/video.bin"
+    print(f"Writing {args.parallel} x {format_size(size)} to {output_dir}")
+
+    scenarios = [
+        ("small buffer (1 KB)", WritePolicy(buffer_size=1024)),
+        ("1 MB buffer", WritePolicy()),
+        ("4 MB buffer", WritePolicy(buffer_size=4 * 1024 * 1024)),
+        ("1 MB buffer, preallocated", WritePolicy(preallocate=True)),
+        ("preallocated, fsync 64 MB", WritePolicy(preallocate=True, fsync_interval=64 * 1024 * 1024)),
+        ("staged, then moved", WritePolicy(preallocate=True, staging_dir=staging_dir)),
+    ]
+    try:
+        for name, policy in scenarios:
+            run_scenario(name, policy, url, size, output_dir, args.parallel)
+    finally:
+        server.shutdown()
+        shutil.rmtree(source_dir, ignore_errors=True)
+        if not args.staging_dir:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        if not args.output_dir:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
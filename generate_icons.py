@@ -1,104 +1,185 @@
 import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import importlib.util
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 
+SVG_PATH = 'assets/logo.svg'
+ICONS_DIR = 'assets/icons'
+CACHE_PATH = os.path.join(ICONS_DIR, '.render-cache.json')
+
+# Windows ICO sizes
+ICO_SIZES = [16, 24, 32, 48, 64, 128, 256]
+
+# macOS iconset entries: (pixel size, file name); several names share a size
+ICNS_SIZES = [
+    (16, '16x16.png'),
+    (32, '16x16@2x.png'),
+    (32, '32x32.png'),
+    (64, '32x32@2x.png'),
+    (128, '128x128.png'),
+    (256, '128x128@2x.png'),
+    (256, '256x256.png'),
+    (512, '256x256@2x.png'),
+    (512, '512x512.png'),
+    (1024, '512x512@2x.png'),
+]
+
+ICONSET_PATH = os.path.join(ICONS_DIR, 'icon.iconset')
+
 def ensure_dir(directory):
     if not os.path.exists(directory):
         os.makedirs(directory)
 
+def find_renderer():
+    """Pick the SVG renderer once: Inkscape, ImageMagick, or Qt in this process."""
+    if shutil.which('inkscape'):
+        return 'inkscape'
+    if shutil.which('magick'):
+        return 'magick'
+    if shutil.which('convert'):
+        return 'convert'
+    try:
+        if importlib.util.find_spec('PySide6.QtSvg') is None:
+            return None
+    except ImportError:
+        return None
+    return 'qt'
+
+def render_external(renderer, output_path, size):
+    if renderer == 'inkscape':
+        command = ['inkscape', '--export-filename=' + output_path, '-w', str(size), '-h', str(size), SVG_PATH]
+    else:
+        command = [renderer, '-background', 'none', '-resize', f'{size}x{size}', SVG_PATH, output_path]
+    subprocess.run(command, check=True, capture_output=True)
+
+def qt_app():
+    # QSvgRenderer needs a QGuiApplication; offscreen works on build machines without a display
+    from PySide6.QtGui import QGuiApplication
+    return QGuiApplication.instance() or QGuiApplication([sys.argv[0], '-platform', 'offscreen'])
+
+def render_qt(svg_data, output_path, size):
+    from PySide6.QtCore import QByteArray, Qt
+    from PySide6.QtGui import QImage, QPainter
+    from PySide6.QtSvg import QSvgRenderer
+    renderer = QSvgRenderer(QByteArray(svg_data))
+    image = QImage(size, size, QImage.Format_ARGB32)
+    image.fill(Qt.transparent)
+    painter = QPainter(image)
+    renderer.render(painter)
+    painter.end()
+    if not image.save(output_path, 'PNG'):
+        raise OSError(f"Could not write {output_path}")
+
+def load_cache():
+    try:
+        with open(CACHE_PATH, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(cache):
+    with open(CACHE_PATH, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+
 def generate_icons():
-    """Generate icons for all platforms using Inkscape or convert"""
+    """Generate icons for all platforms, rendering each size once and only when the SVG changed"""
     print("Generating icons for all platforms...")
-    
+    started = time.monotonic()
+
     # Ensure assets directory exists
-    ensure_dir('assets/icons')
-    
-    # Source SVG file
-    svg_path = 'assets/logo.svg'
-    
-    if not os.path.exists(svg_path):
-        print(f"Error: SVG file not found at {svg_path}")
+    ensure_dir(ICONS_DIR)
+    ensure_dir(ICONSET_PATH)
+
+    if not os.path.exists(SVG_PATH):
+        print(f"Error: SVG file not found at {SVG_PATH}")
         return
-    
-    # Try using Inkscape first, then ImageMagick's convert
-    def convert_svg(output_path, size):
-        try:
-            # Try Inkscape first
-            if subprocess.run(['which', 'inkscape'], capture_output=True).returncode == 0:
-                subprocess.run([
-                    'inkscape',
-                    '--export-filename=' + output_path,
-                    '-w', str(size),
-                    '-h', str(size),
-                    svg_path
-                ], check=True)
-                return True
-            # Try ImageMagick's convert
-            elif subprocess.run(['which', 'convert'], capture_output=True).returncode == 0:
-                subprocess.run([
-                    'convert',
-                    '-background', 'none',
-                    '-resize', f'{size}x{size}',
-                    svg_path,
-                    output_path
-                ], check=True)
-                return True
-        except subprocess.CalledProcessError:
-            return False
-        return False
+
+    with open(SVG_PATH, 'rb') as f:
+        svg_data = f.read()
+    svg_hash = hashlib.sha256(svg_data).hexdigest()
+
+    # Every PNG the build needs, by pixel size
+    outputs = [(f'{ICONS_DIR}/icon_{size}x{size}.png', size) for size in ICO_SIZES]
+    outputs += [(os.path.join(ICONSET_PATH, f'icon_{filename}'), size) for size, filename in ICNS_SIZES]
+    outputs.append(('assets/app_icon.png', 512))
+
+    # Outputs rendered from the same SVG at the same size are skipped
+    cache = load_cache()
+    def key(size):
+        return f'{svg_hash}:{size}'
+    stale = [(path, size) for path, size in outputs if cache.get(path) != key(size) or not os.path.exists(path)]
+
+    if stale:
+        renderer = find_renderer()
+        if renderer is None:
+            print("\nPlease install one of the following to convert SVG to PNG:")
+            print("1. Inkscape (recommended):")
+            print("   sudo apt-get install inkscape")
+            print("2. Or ImageMagick:")
+            print("   sudo apt-get install imagemagick")
+            print("3. Or PySide6:")
+            print("   pip install PySide6")
+            return
+
+        # Render each size once, in parallel, then copy it to the other names that share it
+        by_size = {}
+        for path, size in stale:
+            by_size.setdefault(size, []).append(path)
+        if renderer == 'qt':
+            qt_app()
+            render = lambda path, size: render_qt(svg_data, path, size)
+        else:
+            render = lambda path, size: render_external(renderer, path, size)
+
+        def render_size(size, paths):
+            render(paths[0], size)
+            for path in paths[1:]:
+                shutil.copyfile(paths[0], path)
+            return paths
+
+        with ThreadPoolExecutor(max_workers=min(len(by_size), os.cpu_count() or 4)) as executor:
+            futures = {size: executor.submit(render_size, size, paths) for size, paths in by_size.items()}
+        for size, future in futures.items():
+            try:
+                for path in future.result():
+                    cache[path] = key(size)
+            except (subprocess.CalledProcessError, OSError) as e:
+                print(f"Could not render {size}x{size}: {e}")
+        save_cache(cache)
+        print(f"Rendered {len(by_size)} sizes with {renderer}")
+    else:
+        print("Icons are up to date")
+
+    stale_paths = {path for path, _ in stale}
 
     # Windows ICO
-    sizes = [16, 24, 32, 48, 64, 128, 256]
-    ico_images = []
-    
-    for size in sizes:
-        png_path = f'assets/icons/icon_{size}x{size}.png'
-        if convert_svg(png_path, size):
-            ico_images.append(Image.open(png_path))
-    
-    if ico_images:
-        # Save ICO file
-        ico_images[0].save('assets/app_icon.ico', format='ICO', sizes=[(s, s) for s in sizes], 
-                          append_images=ico_images[1:])
+    ico_paths = [f'{ICONS_DIR}/icon_{size}x{size}.png' for size in ICO_SIZES]
+    if all(os.path.exists(path) for path in ico_paths) and (
+            stale_paths.intersection(ico_paths) or not os.path.exists('assets/app_icon.ico')):
+        ico_images = [Image.open(path) for path in ico_paths]
+        # Save ICO file; Pillow only keeps sizes up to the first image's, so start from the largest
+        ico_images[-1].save('assets/app_icon.ico', format='ICO', sizes=[(s, s) for s in ICO_SIZES],
+                            append_images=ico_images[:-1])
         print("Created Windows ICO file")
-    
-    # macOS ICNS sizes
-    icns_sizes = {
-        '16x16': '16x16.png',
-        '32x32': '16x16@2x.png',
-        '32x32': '32x32.png',
-        '64x64': '32x32@2x.png',
-        '128x128': '128x128.png',
-        '256x256': '128x128@2x.png',
-        '256x256': '256x256.png',
-        '512x512': '256x256@2x.png',
-        '512x512': '512x512.png',
-        '1024x1024': '512x512@2x.png'
-    }
-    
-    iconset_path = 'assets/icons/icon.iconset'
-    ensure_dir(iconset_path)
-    
-    for size, filename in icns_sizes.items():
-        width = int(size.split('x')[0])
-        png_path = os.path.join(iconset_path, f'icon_{filename}')
-        convert_svg(png_path, width)
-    
+
     # Create ICNS file on macOS
-    if os.system('which iconutil') == 0:  # macOS
-        os.system(f'iconutil -c icns {iconset_path} -o assets/app_icon.icns')
+    iconset_paths = {os.path.join(ICONSET_PATH, f'icon_{filename}') for _, filename in ICNS_SIZES}
+    if shutil.which('iconutil') and (
+            stale_paths & iconset_paths or not os.path.exists('assets/app_icon.icns')):
+        subprocess.run(['iconutil', '-c', 'icns', ICONSET_PATH, '-o', 'assets/app_icon.icns'], check=False)
         print("Created macOS ICNS file")
-    
+
     # Linux PNG (512x512)
-    if convert_svg('assets/app_icon.png', 512):
+    if 'assets/app_icon.png' in stale_paths and os.path.exists('assets/app_icon.png'):
         print("Created Linux PNG file")
-    
-    print("Icon generation complete!")
-    print("\nPlease install one of the following to convert SVG to PNG:")
-    print("1. Inkscape (recommended):")
-    print("   sudo apt-get install inkscape")
-    print("2. Or ImageMagick:")
-    print("   sudo apt-get install imagemagick")
+
+    print(f"Icon generation complete in {time.monotonic() - started:.2f}s!")
 
 if __name__ == "__main__":
     generate_icons()
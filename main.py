@@ -1,18 +1,66 @@
 import sys
 import os
+import time
+import shutil
+import subprocess
+import threading
+import gzip
+import bz2
+import lzma
+import json
+import re
+import hashlib
+import uuid
+import queue
+import argparse
+import signal
+import socket
+import ipaddress
+import errno
+import random
+import heapq
+import itertools
+import traceback
+import tracemalloc
+import tempfile
+import platform
+import zipfile
+import atexit
+import bisect
+import multiprocessing
+import sqlite3
+import http.cookiejar
 import yt_dlp
+import yt_dlp.cookies
 import requests
 from PIL import Image
 from io import BytesIO
-from datetime import datetime
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from collections import deque, Counter
+from urllib.parse import urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, wait as wait_futures
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QLineEdit, QPushButton, QLabel, 
                              QComboBox, QProgressBar, QScrollArea, QMessageBox,
-                             QFrame, QSizePolicy, QFileDialog, QToolTip)
-from PySide6.QtCore import Qt, QThread, Signal, QPropertyAnimation, QEasingCurve, QSize, QTimer, QByteArray, QRectF
-from PySide6.QtGui import QPixmap, QIcon, QPainter, QColor, QPen, QBrush, QPainterPath
+                             QFrame, QSizePolicy, QFileDialog, QToolTip, QDialog,
+                             QTableView, QAbstractItemView, QHeaderView, QSystemTrayIcon, QCheckBox,
+                             QListView, QStyledItemDelegate, QStyle)
+from PySide6.QtCore import (Qt, QCoreApplication, QObject, QThread, Signal, QPropertyAnimation, QEasingCurve, QSize, QTimer,
+                            QByteArray, QRectF, QUrl, QAbstractTableModel, QAbstractListModel, QModelIndex, QEvent)
+from PySide6.QtGui import (QPixmap, QIcon, QPainter, QColor, QPen, QBrush, QPainterPath, QDesktopServices,
+                           QGuiApplication, QPixmapCache, QImage, QFont)
 from PySide6.QtSvg import QSvgRenderer
 
+# Optional faster hashes for integrity checks
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
 # Define SVG icons directly in the code since the resources module might not be loading correctly
 YOUTUBE_ICON = """
 <svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24">
@@ -38,15 +86,49 @@ LOCATION_ICON = """
 </svg>
 """
 
-def create_svg_icon(svg_data, size):
-    renderer = QSvgRenderer(QByteArray(svg_data.encode()))
-    pixmap = QPixmap(size)
+SUCCESS_ICON = """
+<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24">
+    <path fill="#4CAF50" d="M9 16.17L4.83 12l-1.42 1.41L9 19 21 7l-1.41-1.41L9 16.17z"/>
+</svg>
+"""
+
+# Parsed SVG documents, keyed by content hash
+_svg_renderers = {}
+
+def device_pixel_ratio():
+    app = QGuiApplication.instance()
+    return app.devicePixelRatio() if app else 1.0
+
+def create_svg_icon(svg_data, size, dpr=None):
+    # Rendered pixmaps are shared through QPixmapCache, keyed by SVG, size and pixel ratio
+    if dpr is None:
+        dpr = device_pixel_ratio()
+    digest = hashlib.sha1(svg_data.encode()).hexdigest()
+    key = f"svg:{digest}:{size.width()}x{size.height()}@{dpr}"
+    pixmap = QPixmapCache.find(key)
+    if pixmap is not None and not pixmap.isNull():
+        return pixmap
+
+    renderer = _svg_renderers.get(digest)
+    if renderer is None:
+        renderer = QSvgRenderer(QByteArray(svg_data.encode()))
+        _svg_renderers[digest] = renderer
+    pixmap = QPixmap(round(size.width() * dpr), round(size.height() * dpr))
     pixmap.fill(Qt.transparent)
     painter = QPainter(pixmap)
     renderer.render(painter)
     painter.end()
+    pixmap.setDevicePixelRatio(dpr)
+    QPixmapCache.insert(key, pixmap)
     return pixmap
 
+def format_size(size):
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024.0:
+            return f"{size:.1f} {unit}"
+        size /= 1024.0
+    return f"{size:.1f} TB"
+
 class CustomFrame(QFrame):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -60,29 +142,36 @@ class CustomFrame(QFrame):
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
 
 class SpinnerWidget(QWidget):
+    FRAME_COUNT = 36  # One frame per 10 degree step
+
+    # Pre-rendered frames shared by all spinners, keyed by size, color and pixel ratio
+    _frames = {}
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.angle = 0
+        self.frame = 0
         self.timer = QTimer()
         self.timer.timeout.connect(self.rotate)
         self.timer.setInterval(50)  # 20 fps
         self.setFixedSize(40, 40)
         self.color = QColor("#FF0000")  # YouTube red
+        self.watched = []
 
-    def rotate(self):
-        self.angle = (self.angle + 10) % 360
-        self.update()
-
-    def showEvent(self, event):
-        super().showEvent(event)
-        self.timer.start()
-
-    def hideEvent(self, event):
-        super().hideEvent(event)
-        self.timer.stop()
+    def frames(self):
+        dpr = self.devicePixelRatioF()
+        key = (self.width(), self.height(), self.color.name(), dpr)
+        frames = self._frames.get(key)
+        if frames is None:
+            frames = [self.render_frame(i * 360 / self.FRAME_COUNT, dpr)
+                      for i in range(self.FRAME_COUNT)]
+            self._frames[key] = frames
+        return frames
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
+    def render_frame(self, angle, dpr):
+        pixmap = QPixmap(round(self.width() * dpr), round(self.height() * dpr))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
         painter.setRenderHint(QPainter.Antialiasing)
         
         # Create a circular path
@@ -97,7 +186,7 @@ class SpinnerWidget(QWidget):
         
         # Rotate and draw the arc
         painter.translate(self.width() / 2, self.height() / 2)
-        painter.rotate(self.angle)
+        painter.rotate(angle)
         painter.translate(-self.width() / 2, -self.height() / 2)
         
         # Draw the spinning arc
@@ -107,6 +196,52 @@ class SpinnerWidget(QWidget):
         painter.setBrush(QBrush(self.color))
         painter.setPen(Qt.NoPen)
         painter.drawEllipse(rect.center(), 3, 3)
+        painter.end()
+        return pixmap
+
+    def rotate(self):
+        self.frame = (self.frame + 1) % self.FRAME_COUNT
+        self.update()
+
+    def is_on_screen(self):
+        window = self.window()
+        handle = window.windowHandle()
+        return (self.isVisible() and not window.isMinimized()
+                and handle is not None and handle.isExposed())
+
+    def update_animation(self):
+        # Only animate while something can actually see the spinner
+        if self.is_on_screen():
+            if not self.timer.isActive():
+                self.timer.start()
+        else:
+            self.timer.stop()
+
+    def watch_window(self):
+        window = self.window()
+        for obj in (window, window.windowHandle()):
+            if obj is not None and obj not in self.watched:
+                obj.installEventFilter(self)
+                self.watched.append(obj)
+
+    def eventFilter(self, obj, event):
+        if event.type() in (QEvent.Expose, QEvent.WindowStateChange, QEvent.Hide, QEvent.Show):
+            # Exposure state is only final once the event has been handled
+            QTimer.singleShot(0, self.update_animation)
+        return False
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.watch_window()
+        self.update_animation()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self.frames()[self.frame])
 
 class LoadingOverlay(QWidget):
     def __init__(self, parent=None):
@@ -198,65 +333,1128 @@ class AnimatedButton(QPushButton):
         self._animation.start()
         super().leaveEvent(event)
 
+# Per-user data directory for caches and databases
+DATA_DIR = os.path.join(os.path.expanduser("~"), ".tubemaster")
+DEFAULT_DOWNLOAD_DIR = os.path.join(os.path.expanduser("~"), "Downloads", "TubeMaster")
+
+def deep_sizeof(obj):
+    # Approximate memory held by an object graph (containers and slotted objects)
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, '__slots__'):
+            stack.extend(getattr(item, name) for name in item.__slots__ if hasattr(item, name))
+    return total
+
+class MetadataCache:
+    """Keeps full yt-dlp info dicts on disk, gzipped JSON keyed by video id.
+
+    Entries expire after TTL seconds, since the format URLs in them stop
+    working, and only the MAX_ENTRIES most recently used are kept.
+    """
+    MAX_ENTRIES = 500
+    TTL = 6 * 3600
+
+    def __init__(self, cache_dir=None, max_entries=None, ttl=None):
+        self.cache_dir = cache_dir or os.path.join(DATA_DIR, "metadata")
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self.ttl = ttl or self.TTL
+
+    def path_for(self, video_id):
+        safe_id = "".join(c if c.isalnum() or c in '-_' else '_' for c in str(video_id))
+        return os.path.join(self.cache_dir, f"{safe_id}.json.gz")
+
+    def put(self, video_id, info):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path_for(video_id)
+        tmp_path = path + '.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(info, f, default=str)
+        os.replace(tmp_path, path)
+        self.prune()
+        return path
+
+    def get(self, video_id):
+        path = self.path_for(video_id)
+        try:
+            modified = os.path.getmtime(path)
+        except FileNotFoundError:
+            return None
+        if time.time() - modified > self.ttl:
+            remove_file(path)
+            return None
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            info = json.load(f)
+        try:
+            os.utime(path)  # The modification time doubles as the last use
+        except OSError:
+            pass
+        return info
+
+    def prune(self):
+        # Drops expired entries and the least recently used beyond max_entries
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith('.json.gz'):
+                    continue
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except FileNotFoundError:
+                    pass
+        entries.sort(reverse=True)
+        cutoff = time.time() - self.ttl
+        for index, (modified, path) in enumerate(entries):
+            if index >= self.max_entries or modified < cutoff:
+                remove_file(path)
+
+class CookieStore:
+    """Cookies shared by every YoutubeDL in this process and in other TubeMaster processes.
+
+    Cookies are kept in SQLite so processes merge their changes instead of
+    overwriting each other's cookies.txt. Within a process all workers share
+    one jar, which is reloaded whenever another process has saved.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(DATA_DIR, "cookies.db")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Login cookies are private; SQLite gives the WAL and SHM files the database's mode
+        os.close(os.open(self.path, os.O_WRONLY | os.O_CREAT, 0o600))
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.chmod(self.path + suffix, 0o600)
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS cookies (
+                    domain TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    value TEXT,
+                    secure INTEGER NOT NULL DEFAULT 0,
+                    expires INTEGER,
+                    updated_at REAL,
+                    PRIMARY KEY (domain, path, name)
+                ) WITHOUT ROWID
+            """)
+        self.cookie_jar = yt_dlp.cookies.YoutubeDLCookieJar()
+        self.saved = {}  # (domain, path, name) -> (value, secure, expires) as last read or written
+        self.data_version = None
+
+    def jar(self):
+        # data_version only changes when another connection commits
+        with self.lock:
+            version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            if version != self.data_version:
+                self.data_version = version
+                self.load()
+            return self.cookie_jar
+
+    def load(self):
+        # Rebuild the jar from the database, so cookies deleted elsewhere go too;
+        # changes made here that aren't saved yet are kept
+        now = time.time()
+        unsaved = [cookie for cookie in list(self.cookie_jar)
+                   if self.saved.get((cookie.domain, cookie.path, cookie.name))
+                   != (cookie.value, bool(cookie.secure), cookie.expires)]
+        with self.conn:
+            self.conn.execute("DELETE FROM cookies WHERE expires IS NOT NULL AND expires < ?", (now,))
+        self.cookie_jar.clear()
+        self.saved = {}
+        for domain, path, name, value, secure, expires in self.conn.execute(
+                "SELECT domain, path, name, value, secure, expires FROM cookies"):
+            self.cookie_jar.set_cookie(http.cookiejar.Cookie(
+                0, name, value, None, False, domain, bool(domain), domain.startswith('.'),
+                path, bool(path), bool(secure), expires, expires is None, None, None, {}))
+            self.saved[(domain, path, name)] = (value, bool(secure), expires)
+        for cookie in unsaved:
+            self.cookie_jar.set_cookie(cookie)
+
+    def save(self):
+        # Write only the cookies that changed since they were last read or written
+        now = time.time()
+        with self.lock:
+            current = {
+                (cookie.domain, cookie.path, cookie.name): (cookie.value, bool(cookie.secure), cookie.expires)
+                for cookie in list(self.cookie_jar) if not cookie.is_expired(now)
+            }
+            changed = [(*key, *value, now) for key, value in current.items() if self.saved.get(key) != value]
+            removed = [key for key in self.saved if key not in current]
+            if not changed and not removed:
+                return True
+            try:
+                with self.conn:
+                    self.conn.executemany(
+                        "INSERT INTO cookies (domain, path, name, value, secure, expires, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT(domain, path, name) DO UPDATE SET value = excluded.value, "
+                        "secure = excluded.secure, expires = excluded.expires, updated_at = excluded.updated_at",
+                        changed)
+                    self.conn.executemany("DELETE FROM cookies WHERE domain = ? AND path = ? AND name = ?",
+                                          removed)
+            except sqlite3.Error:
+                return False  # e.g. locked for too long; the changes go out with the next save
+            self.saved = current
+            return True
+
+    def attach(self, ydl):
+        # YoutubeDL.cookiejar is a cached property, so this replaces the empty jar it would build
+        ydl.cookiejar = self.jar()
+        return ydl
+
+    def import_cookies(self, cookie_file=None, browser=None):
+        """Import a Netscape cookies.txt or a browser profile, given as BROWSER[:PROFILE]."""
+        browser_spec = None
+        if browser:
+            name, _, profile = browser.partition(':')
+            browser_spec = (name.lower(), profile or None, None, None)
+        with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
+            imported = yt_dlp.cookies.load_cookies(cookie_file, browser_spec, ydl)
+        jar = self.jar()
+        count = 0
+        for cookie in imported:
+            jar.set_cookie(cookie)
+            count += 1
+        if not self.save():
+            raise sqlite3.OperationalError(f"Could not write {self.path}")
+        return count
+
+    def clear(self):
+        with self.lock:
+            self.cookie_jar.clear()
+            self.saved = {}
+            with self.conn:
+                self.conn.execute("DELETE FROM cookies")
+
+    def stats(self):
+        with self.lock:
+            count, domains = self.conn.execute("SELECT COUNT(*), COUNT(DISTINCT domain) FROM cookies").fetchone()
+        return {'cookies': count, 'domains': domains}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+_cookie_store = None
+_cookie_store_lock = threading.Lock()
+
+def cookie_store():
+    """The process-wide CookieStore, or None if its database can't be opened."""
+    global _cookie_store
+    with _cookie_store_lock:
+        if _cookie_store is None:
+            try:
+                _cookie_store = CookieStore()
+            except (OSError, sqlite3.Error):
+                _cookie_store = False
+        return _cookie_store or None
+
+@contextmanager
+def youtube_dl(params):
+    """A YoutubeDL using the shared cookies; cookies the site set are saved on exit."""
+    store = cookie_store()
+    with yt_dlp.YoutubeDL(params) as ydl:
+        if store:
+            store.attach(ydl)
+        try:
+            yield ydl
+        finally:
+            if store:
+                store.save()
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one call.
+
+    The first caller for a key runs it; callers arriving while it runs wait
+    for it and get the same result, or the same exception. Keys are tuples
+    whose first item names the kind of call, which the counters group by.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}  # key -> Future of the running call
+        self.counts = Counter()
+
+    def do(self, key, func, *args, **kwargs):
+        with self.lock:
+            future = self.in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self.in_flight[key] = Future()
+            self.counts[key[0], 'run' if leader else 'shared'] += 1
+        if not leader:
+            return future.result()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+
+    def stats(self):
+        with self.lock:
+            stats = {}
+            for (kind, outcome), count in self.counts.items():
+                stats.setdefault(kind, {'run': 0, 'shared': 0})[outcome] = count
+            for key in self.in_flight:
+                kind = stats.setdefault(key[0], {'run': 0, 'shared': 0})
+                kind['in_flight'] = kind.get('in_flight', 0) + 1
+            return stats
+
+# Shared by every extraction and thumbnail fetch in this process
+single_flight = SingleFlight()
+
+YOUTUBE_ID = re.compile(r'(?:[?&]v=|youtu\.be/|/shorts/|/embed/|/live/)([0-9A-Za-z_-]{11})(?![0-9A-Za-z_-])')
+
+def video_key(url):
+    # Watch, short and share links of one YouTube video coalesce to the same key
+    match = YOUTUBE_ID.search(url)
+    if match:
+        return f"youtube:{match.group(1)}"
+    return url.split('#', 1)[0]
+
+URL_SCHEME = re.compile(r'^[a-z][a-z0-9+.-]*://', re.IGNORECASE)
+HOST_PATH = re.compile(r'^(?:www\.\S+|(?:[a-z0-9-]+\.)+[a-z]{2,}(?::\d+)?/\S+)$', re.IGNORECASE)
+
+def as_url(text):
+    """text as a URL to extract, or None when it reads as search terms.
+
+    Scheme-less links such as youtu.be/ID count as URLs when a site extractor
+    claims them or they have the shape host/path or www.host.
+    """
+    if URL_SCHEME.match(text):
+        return text
+    if any(char.isspace() for char in text):
+        return None
+    url = 'https://' + text
+    if HOST_PATH.match(text) or any(ie.suitable(url) for ie in yt_dlp.extractor.gen_extractor_classes()
+                                    if ie.ie_key() != 'Generic'):
+        return url
+    return None
+
+class FormatRecord:
+    __slots__ = ('format_id', 'ext', 'format_note', 'acodec', 'vcodec', 'filesize', 'filesize_approx',
+                 'url', 'protocol', 'http_headers')
+
+    def __init__(self, format_id, ext=None, format_note=None, acodec=None, vcodec=None,
+                 filesize=None, url=None, protocol=None, http_headers=None, filesize_approx=None):
+        self.format_id = format_id
+        self.ext = ext
+        self.format_note = format_note
+        self.acodec = acodec
+        self.vcodec = vcodec
+        self.filesize = filesize
+        self.filesize_approx = filesize_approx
+        self.url = url
+        self.protocol = protocol
+        self.http_headers = http_headers
+
+    @classmethod
+    def from_info(cls, f):
+        return cls(
+            f.get('format_id'),
+            ext=f.get('ext'),
+            format_note=f.get('format_note'),
+            acodec=f.get('acodec'),
+            vcodec=f.get('vcodec'),
+            filesize=f.get('filesize'),
+            url=f.get('url'),
+            protocol=f.get('protocol'),
+            http_headers=f.get('http_headers'),
+            filesize_approx=f.get('filesize_approx'),
+        )
+
+    @property
+    def estimated_size(self):
+        return self.filesize or self.filesize_approx
+
+    @property
+    def has_audio(self):
+        return self.acodec != 'none'
+
+    @property
+    def has_video(self):
+        return self.vcodec != 'none'
+
+def probe_size(url, headers=None, session=None):
+    """Size of the file at url from a HEAD request, or from a one-byte range request when HEAD doesn't say."""
+    session = session or requests
+    response = session.head(url, headers=headers, allow_redirects=True, timeout=(5, 15))
+    length = response.headers.get('Content-Length')
+    if response.ok and length and int(length) > 0 and 'Content-Encoding' not in response.headers:
+        return int(length)
+    with session.get(url, headers=dict(headers or {}, Range='bytes=0-0'), stream=True,
+                     timeout=(5, 15)) as response:
+        response.raise_for_status()
+        content_range = response.headers.get('Content-Range', '')
+        if '/' in content_range and not content_range.endswith('*'):
+            return int(content_range.rsplit('/', 1)[1])
+        length = response.headers.get('Content-Length')
+        if response.status_code == 200 and length and 'Content-Encoding' not in response.headers:
+            return int(length)
+    return None
+
+class SizeCache:
+    """Probed file sizes per URL, kept for TTL seconds (failures for FAILURE_TTL)."""
+    TTL = 1800
+    FAILURE_TTL = 60
+    MAX_ENTRIES = 4096
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}  # URL -> (size or None, expiry)
+
+    def get(self, url, headers=None):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry and entry[1] > now:
+                return entry[0]
+        try:
+            size = single_flight.do(('size', url), probe_size, url, headers)
+        except (requests.RequestException, ValueError):
+            size = None
+        with self.lock:
+            self.entries.pop(url, None)
+            self.entries[url] = (size, now + (self.TTL if size else self.FAILURE_TTL))
+            # Entries are in insertion order, so the oldest go first
+            while len(self.entries) > self.MAX_ENTRIES:
+                del self.entries[next(iter(self.entries))]
+        return size
+
+# Shared by the format list and download workers in this process
+size_cache = SizeCache()
+
+def needs_size(format_info):
+    return (not format_info.filesize and bool(format_info.url)
+            and format_info.protocol in ('http', 'https'))
+
+class VideoRecord:
+    """The subset of a yt-dlp info dict the app keeps in memory."""
+    __slots__ = ('id', 'title', 'duration', 'channel', 'webpage_url', 'thumbnail', 'formats')
+
+    def __init__(self, id, title, duration=None, channel=None, webpage_url=None,
+                 thumbnail=None, formats=()):
+        self.id = id
+        self.title = title
+        self.duration = duration
+        self.channel = channel
+        self.webpage_url = webpage_url
+        self.thumbnail = thumbnail
+        self.formats = tuple(formats)
+
+    @classmethod
+    def from_info(cls, info):
+        # Only formats the UI can offer (anything with audio) are retained
+        formats = [FormatRecord.from_info(f) for f in info.get('formats') or []
+                   if f.get('acodec') != 'none']
+        return cls(
+            info.get('id'),
+            info.get('title', 'video'),
+            duration=info.get('duration'),
+            channel=info.get('channel') or info.get('uploader'),
+            webpage_url=info.get('webpage_url'),
+            thumbnail=info.get('thumbnail'),
+            formats=formats,
+        )
+
+    def get_format(self, format_id):
+        return next((f for f in self.formats if f.format_id == format_id), None)
+
+def extract_info(url, ydl_opts):
+    with youtube_dl(ydl_opts) as ydl:
+        return ydl.extract_info(url, download=False)
+
+def fetch_video(url, cache_dir=None, progress=None):
+    # Extraction and thumbnail preparation, run on a SearchWorker thread or in an extraction process
+    def report(value, text):
+        if progress:
+            progress(value, text)
+
+    ydl_opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'extract_flat': False
+    }
+    
+    report(30, "Fetching video information...")
+    with youtube_dl(ydl_opts) as ydl:
+        video_info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+    
+    report(60, "Processing video details...")
+    
+    # Keep a compact record and spill the full info dict to disk
+    record = VideoRecord.from_info(video_info)
+    memory = (deep_sizeof(video_info), deep_sizeof(record))
+    if record.id:
+        try:
+            MetadataCache(cache_dir).put(record.id, video_info)
+        except OSError:
+            pass
+    del video_info
+    
+    # Fetch thumbnail
+    thumbnail_url = record.thumbnail
+    thumbnail_data = None
+    if thumbnail_url:
+        report(80, "Loading thumbnail...")
+        response = single_flight.do(('thumbnail', thumbnail_url), requests.get, thumbnail_url, timeout=(10, 60))
+        img = Image.open(BytesIO(response.content))
+        img = img.resize((720, 405), Image.Resampling.LANCZOS)
+        img_byte_arr = BytesIO()
+        img.save(img_byte_arr, format='PNG')
+        thumbnail_data = img_byte_arr.getvalue()
+    
+    return {
+        'info': record,
+        'thumbnail': thumbnail_data,
+        'memory': memory
+    }
+
+def warm_up():
+    # Runs once per extraction process so the imports are paid before the first search
+    return os.getpid()
+
+extraction_progress = None  # Queue back to the parent, in extraction processes
+
+def init_extraction_process(progress_queue):
+    global extraction_progress
+    extraction_progress = progress_queue
+
+def run_with_progress(task_id, func, *args):
+    # Progress reports of one task, relayed to its caller by ExtractionPool
+    return func(*args, progress=lambda value, text: extraction_progress.put((task_id, value, text)))
+
+class ExtractionPool:
+    """Warm worker processes that run yt-dlp extraction outside the GUI process.
+
+    Extraction is CPU-heavy Python, so running it here keeps it from competing
+    with the Qt event loop for the GIL. A crashed extractor only costs the pool
+    a restart. A hung one moves new work to a fresh pool, while the old pool
+    finishes its other extractions before its processes are stopped; the
+    window keeps running. Progress reported by a task comes back over a queue.
+    """
+    TIMEOUT = 120
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+        self.executor = None
+        self.in_flight = {}  # Executor -> futures submitted to it
+        self.listeners = {}  # Task id -> progress callback
+        self.task_ids = itertools.count()
+        self.closed = False
+        self._start()
+
+    def _start(self):
+        context = multiprocessing.get_context('spawn')
+        progress_queue = context.Queue()
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context,
+                                            initializer=init_extraction_process, initargs=(progress_queue,))
+        self.in_flight[self.executor] = set()
+        threading.Thread(target=self._relay, args=(self.executor, progress_queue),
+                         name='extraction-progress', daemon=True).start()
+        for _ in range(self.max_workers):
+            self.executor.submit(warm_up)
+
+    def _relay(self, executor, progress_queue):
+        # Runs until the pool is retired or shut down
+        while not self.closed and executor in self.in_flight:
+            try:
+                task_id, value, text = progress_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            listener = self.listeners.get(task_id)
+            if listener is not None:
+                listener(value, text)
+
+    def run(self, func, *args, timeout=None, progress=None):
+        task_id = next(self.task_ids)
+        with self.lock:
+            executor = self.executor
+            if progress is not None:
+                self.listeners[task_id] = progress
+                future = executor.submit(run_with_progress, task_id, func, *args)
+            else:
+                future = executor.submit(func, *args)
+            self.in_flight[executor].add(future)
+        try:
+            return future.result(timeout=timeout or self.TIMEOUT)
+        except BrokenProcessPool:
+            self.restart(executor)
+            raise RuntimeError("The extraction process crashed")
+        except FuturesTimeoutError:
+            self.restart(executor, future)
+            raise RuntimeError(f"Extraction did not finish within {timeout or self.TIMEOUT} seconds")
+        finally:
+            self.listeners.pop(task_id, None)
+            with self.lock:
+                self.in_flight.get(executor, set()).discard(future)
+
+    def restart(self, broken, stuck=None):
+        # Send new work to a fresh pool; a crashed pool is stopped now, a hung one once
+        # its other extractions are done
+        with self.lock:
+            if self.executor is not broken:
+                return  # Another caller already replaced it
+            self._start()
+        if stuck is None:
+            self._stop(broken)
+        else:
+            threading.Thread(target=self._retire, args=(broken, stuck), name='extraction-retire',
+                             daemon=True).start()
+
+    def _retire(self, executor, stuck):
+        # Each caller gives up after its own timeout and drops its future
+        while True:
+            with self.lock:
+                others = [future for future in self.in_flight.get(executor, ())
+                          if future is not stuck and not future.done()]
+            if not others:
+                break
+            wait_futures(others, timeout=1)
+        self._stop(executor)
+
+    def _stop(self, executor):
+        with self.lock:
+            self.in_flight.pop(executor, None)
+        processes = list((getattr(executor, '_processes', None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    def shutdown(self):
+        self.closed = True
+        with self.lock:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+class SizeProber(QObject):
+    """Fills in missing format sizes with concurrent probes, reporting each one as it arrives."""
+    probed = Signal(str, str, object)  # Video id, format id, size in bytes
+    MAX_WORKERS = 6
+
+    def __init__(self, max_workers=MAX_WORKERS, parent=None):
+        super().__init__(parent)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='size-probe')
+
+    def probe(self, video_info):
+        for format_info in video_info.formats:
+            if needs_size(format_info):
+                self.executor.submit(self.probe_format, video_info.id, format_info)
+
+    def probe_format(self, video_id, format_info):
+        size = size_cache.get(format_info.url, format_info.http_headers)
+        if size:
+            format_info.filesize = size
+            self.probed.emit(video_id or '', format_info.format_id, size)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
 class SearchWorker(QThread):
     progress = Signal(float, str)
     finished = Signal(dict)
     error = Signal(str)
 
-    def __init__(self, url):
+    def __init__(self, url, metadata_cache=None, extraction_pool=None):
         super().__init__()
         self.url = url
+        self.metadata_cache = metadata_cache or MetadataCache()
+        self.extraction_pool = extraction_pool
 
     def run(self):
         try:
             self.progress.emit(10, "Initializing search...")
             
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'extract_flat': False
-            }
-            
-            self.progress.emit(30, "Fetching video information...")
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                video_info = ydl.extract_info(self.url, download=False)
-            
-            self.progress.emit(60, "Processing video details...")
-            
-            # Fetch thumbnail
-            thumbnail_url = video_info.get('thumbnail')
-            thumbnail_data = None
-            if thumbnail_url:
-                self.progress.emit(80, "Loading thumbnail...")
-                response = requests.get(thumbnail_url)
-                img = Image.open(BytesIO(response.content))
-                img = img.resize((720, 405), Image.Resampling.LANCZOS)
-                img_byte_arr = BytesIO()
-                img.save(img_byte_arr, format='PNG')
-                thumbnail_data = img_byte_arr.getvalue()
+            cache_dir = self.metadata_cache.cache_dir
+            # A search for a video that is already being extracted waits for that extraction
+            key = ('video', video_key(self.url))
+            if self.extraction_pool is not None:
+                self.progress.emit(30, "Fetching video information...")
+                result = single_flight.do(key, self.extraction_pool.run, fetch_video, self.url, cache_dir,
+                                          progress=self.progress.emit)
+            else:
+                result = single_flight.do(key, fetch_video, self.url, cache_dir, self.progress.emit)
             
             self.progress.emit(100, "Complete!")
-            self.finished.emit({
-                'info': video_info,
-                'thumbnail': thumbnail_data
-            })
+            self.finished.emit(result)
             
         except Exception as e:
             self.error.emit(str(e))
 
+def search_result(entry):
+    # The fields the result list shows, from a flat search entry
+    thumbnails = [t for t in entry.get('thumbnails') or [] if t.get('url')]
+    # The smallest thumbnail that still fills a list row
+    sized = sorted((t for t in thumbnails if (t.get('width') or 0) >= 160), key=lambda t: t['width'])
+    thumbnail = (sized or thumbnails or [{}])[0].get('url') or entry.get('thumbnail')
+    return {
+        'id': entry.get('id') or entry.get('url'),
+        'title': entry.get('title'),
+        'channel': entry.get('channel') or entry.get('uploader'),
+        'duration': entry.get('duration'),
+        'thumbnail': thumbnail,
+        'url': entry.get('url') or entry.get('webpage_url'),
+    }
+
+class KeywordSearch:
+    """Keyword search through a yt-dlp search extractor, one page of flat results at a time.
+
+    The extractor's result generator is kept between pages, so each page only
+    costs the requests for that page and no format info is resolved.
+    """
+    PAGE_SIZE = 20
+
+    def __init__(self, query, prefix='ytsearch'):
+        self.query = query
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.ydl = None
+        self.store = None
+        self.entries = None
+        self.exhausted = False
+
+    def next_page(self):
+        with self.lock:
+            if self.exhausted:
+                return []
+            if self.entries is None:
+                self.ydl = yt_dlp.YoutubeDL({
+                    'quiet': True,
+                    'no_warnings': True,
+                    'extract_flat': 'in_playlist',
+                    'lazy_playlist': True,
+                })
+                self.store = cookie_store()
+                if self.store:
+                    self.store.attach(self.ydl)
+                info = self.ydl.extract_info(f"{self.prefix}all:{self.query}", download=False, process=False)
+                self.entries = iter(info.get('entries') or [])
+            page = [search_result(entry) for entry in itertools.islice(self.entries, self.PAGE_SIZE) if entry]
+            if len(page) < self.PAGE_SIZE:
+                self.exhausted = True
+            if self.store:
+                self.store.save()
+            return page
+
+    def close(self):
+        with self.lock:
+            self.exhausted = True
+            self.entries = None
+            if self.ydl is not None:
+                self.ydl.close()
+                self.ydl = None
+
+class SearchPageWorker(QThread):
+    finished = Signal(list)
+    error = Signal(str)
+
+    def __init__(self, search):
+        super().__init__()
+        self.search = search
+
+    def run(self):
+        try:
+            self.finished.emit(self.search.next_page())
+        except Exception as e:
+            self.error.emit(str(e))
+
+HASH_ALGORITHMS = ['sha256', 'sha1', 'md5'] + (['xxh64', 'xxh3_64', 'xxh3_128'] if xxhash else [])
+
+def new_hash(algorithm):
+    if algorithm.startswith('xxh'):
+        if xxhash is None:
+            raise ValueError(f"{algorithm} needs the xxhash package")
+        return getattr(xxhash, algorithm)()
+    return hashlib.new(algorithm)
+
+def hash_file(path, algorithm, buffer_size=1024 * 1024):
+    file_hash = new_hash(algorithm)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(buffer_size), b''):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+class IncrementalHasher:
+    """Hashes a download while it is written.
+
+    Our own writer feeds it every block; for yt-dlp downloads catch_up() reads
+    back only the bytes appended since the last progress update, which are
+    still in the page cache. Anything that isn't a plain append (a restarted
+    download, several files merged into one) marks it invalid and the caller
+    hashes the finished file instead.
+    """
+
+    def __init__(self, algorithm, buffer_size=1024 * 1024):
+        self.algorithm = algorithm
+        self.buffer_size = buffer_size
+        self.hash = new_hash(algorithm)
+        self.path = None
+        self.offset = 0
+        self.valid = True
+
+    def update(self, data):
+        self.hash.update(data)
+        self.offset += len(data)
+
+    def catch_up(self, path):
+        if not self.valid:
+            return
+        # Same file, or the .part file renamed to its final name
+        if self.path not in (None, path, path + '.part') and self.offset:
+            self.valid = False
+            return
+        self.path = path
+        try:
+            if os.path.getsize(path) < self.offset:
+                self.valid = False
+                return
+            with open(path, 'rb') as f:
+                f.seek(self.offset)
+                for block in iter(lambda: f.read(self.buffer_size), b''):
+                    self.update(block)
+        except OSError:
+            self.valid = False
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+class WritePolicy:
+    """How downloads are written to disk.
+
+    preallocate reserves the expected size up front, buffer_size is the write
+    buffer and read size, chunk_size the size of each ranged HTTP request,
+    fsync_interval flushes to disk after that many bytes (0 leaves it to the
+    OS) and staging_dir downloads to a fast local directory before the file is
+    moved into place. hash_algorithm is computed while the file is written
+    (None to skip).
+    """
+
+    def __init__(self, preallocate=False, buffer_size=1024 * 1024, chunk_size=10 * 1024 * 1024,
+                 fsync_interval=0, staging_dir=None, hash_algorithm='sha256'):
+        self.preallocate = preallocate
+        self.hash_algorithm = hash_algorithm
+        self.buffer_size = buffer_size
+        self.chunk_size = chunk_size
+        self.fsync_interval = fsync_interval
+        self.staging_dir = staging_dir
+
+    @property
+    def direct_write(self):
+        # yt-dlp owns its file handles, so these need our own writer
+        return self.preallocate or self.fsync_interval > 0
+
+    def ydl_options(self):
+        return {
+            'buffersize': self.buffer_size,
+            'noresizebuffer': True,
+            'http_chunk_size': self.chunk_size,
+            # Retry requests and fragments in place with jittered backoff
+            'retries': 10,
+            'fragment_retries': 10,
+            # yt-dlp calls these as func(n=retries so far), starting at 0
+            'retry_sleep_functions': {'http': lambda n: backoff_delay(n + 1),
+                                      'fragment': lambda n: backoff_delay(n + 1)},
+            # Below this rate yt-dlp treats the stream as throttled and re-extracts
+            'throttledratelimit': 50 * 1024,
+        }
+
+def preallocate_file(fd, size):
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError:
+            pass  # Not supported by this filesystem
+    os.ftruncate(fd, size)
+
+class FileWriter:
+    """Buffered output file with optional preallocation and batched fsync."""
+
+    def __init__(self, path, policy, expected_size=None, hasher=None):
+        self.path = path
+        self.policy = policy
+        self.hasher = hasher
+        self.file = open(path, 'wb', buffering=policy.buffer_size)
+        if policy.preallocate and expected_size:
+            preallocate_file(self.file.fileno(), expected_size)
+        self.written = 0
+        self.unsynced = 0
+
+    def write(self, data):
+        self.file.write(data)
+        if self.hasher is not None:
+            self.hasher.update(data)
+        self.written += len(data)
+        self.unsynced += len(data)
+        if self.policy.fsync_interval and self.unsynced >= self.policy.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+
+    def close(self):
+        # Drop any preallocated space the download didn't fill
+        self.file.flush()
+        self.file.truncate(self.written)
+        if self.policy.fsync_interval:
+            self.sync()
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+HTTP_RETRIES = 10
+
+def download_http(url, path, policy, headers=None, expected_size=None, progress=None, hasher=None,
+                  cookies=None, writer=None, cancelled=None):
+    """Download url to path through a FileWriter using ranged requests.
+
+    progress receives yt-dlp style status dicts and may raise to cancel;
+    cancelled is polled while waiting between retries.
+    A writer that produces path itself, like FfmpegPipeWriter, can be passed
+    instead of the default FileWriter.
+    """
+    session = requests.Session()
+    session.headers.update(headers or {})
+    if cookies is not None:
+        session.cookies = cookies
+    writer = writer or FileWriter(path + '.part', policy, expected_size, hasher)
+    started = time.monotonic()
+    last_report = 0
+    total = expected_size
+    attempt = 0
+    ranged = False
+    try:
+        while total is None or writer.written < total:
+            request_headers = {}
+            if policy.chunk_size:
+                end = writer.written + policy.chunk_size - 1
+                if total:
+                    end = min(end, total - 1)
+                request_headers['Range'] = f"bytes={writer.written}-{end}"
+            try:
+                with session.get(url, headers=request_headers, stream=True, timeout=(10, 60)) as response:
+                    if response.status_code == 416 and writer.written:
+                        break  # The expected size was an overestimate
+                    response.raise_for_status()
+                    ranged = ranged or response.status_code == 206
+                    # A server size that disagrees with the estimate would otherwise leave a
+                    # truncated file that still passes the size check
+                    server_total = None
+                    content_range = response.headers.get('Content-Range', '')
+                    if '/' in content_range and not content_range.endswith('*'):
+                        server_total = int(content_range.rsplit('/', 1)[1])
+                    elif response.status_code == 200:
+                        # Server ignored the range and is sending the whole file
+                        server_total = int(response.headers.get('Content-Length') or 0) or None
+                    if server_total is not None:
+                        if total is not None and server_total != total:
+                            raise ValueError(f"Size mismatch: expected {total} bytes, "
+                                             f"server reports {server_total}")
+                        total = server_total
+                    received = 0
+                    for data in response.iter_content(chunk_size=policy.buffer_size):
+                        writer.write(data)
+                        received += len(data)
+                        now = time.monotonic()
+                        if progress and now - last_report >= 0.25:
+                            last_report = now
+                            elapsed = now - started
+                            speed = writer.written / elapsed if elapsed > 0 else None
+                            status = {'status': 'downloading', 'downloaded_bytes': writer.written, 'speed': speed}
+                            if total:
+                                status['total_bytes'] = total
+                                status['eta'] = int((total - writer.written) / speed) if speed else None
+                            progress(status)
+                    if received == 0 or response.status_code == 200:
+                        break
+            except requests.RequestException as e:
+                # Throttling, server errors and dropped connections are retried from
+                # the last written byte, as long as the server honours ranges
+                response = getattr(e, 'response', None)
+                status_code = response.status_code if response is not None else None
+                retryable = status_code is None or status_code == 429 or status_code >= 500
+                resumable = ranged or not writer.written
+                if not retryable or not resumable or attempt >= HTTP_RETRIES:
+                    raise
+                attempt += 1
+                deadline = time.monotonic() + backoff_delay(attempt)
+                while time.monotonic() < deadline:
+                    if cancelled and cancelled():
+                        raise yt_dlp.utils.DownloadCancelled()
+                    time.sleep(min(0.5, max(0, deadline - time.monotonic())))
+                continue
+            attempt = 0
+        writer.close()
+        if writer.path != path:
+            os.replace(writer.path, path)
+        if hasher is not None:
+            hasher.path = path
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        session.close()
+    if progress:
+        progress({'status': 'finished', 'downloaded_bytes': writer.written, 'total_bytes': writer.written})
+    return writer.written
+
+def move_into_place(source, target, fsync=False):
+    # Rename when possible; across filesystems copy next to the target and rename
+    try:
+        os.replace(source, target)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    temp_target = target + '.moving'
+    try:
+        shutil.copyfile(source, temp_target)
+        if fsync:
+            with open(temp_target, 'rb') as f:
+                os.fsync(f.fileno())
+        os.replace(temp_target, target)
+    except BaseException:
+        if os.path.exists(temp_target):
+            os.remove(temp_target)
+        raise
+    os.remove(source)
+
+# Files written next to a download: key -> label
+SIDECARS = {
+    'subtitles': "Subtitles",
+    'info_json': "Info JSON",
+    'description': "Description",
+    'thumbnail': "Thumbnail",
+}
+SUBTITLE_EXTS = ('srt', 'vtt')
+
+def fetch_bytes(url, headers=None):
+    def get():
+        response = requests.get(url, headers=headers, timeout=(10, 60))
+        response.raise_for_status()
+        return response
+    return single_flight.do(('fetch', url), get)
+
+def write_sidecar(kind, info, base_path, languages=('en',)):
+    """Write one sidecar for info next to base_path (the media path without
+    its extension) and return the paths written, empty if the site has none.
+    """
+    if kind == 'info_json':
+        path = base_path + '.info.json'
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(info, f, ensure_ascii=False, default=str)
+        return [path]
+    if kind == 'description':
+        if not info.get('description'):
+            return []
+        path = base_path + '.description'
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(info['description'])
+        return [path]
+    if kind == 'thumbnail':
+        if not info.get('thumbnail'):
+            return []
+        response = fetch_bytes(info['thumbnail'])
+        ext = os.path.splitext(urlparse(info['thumbnail']).path)[1].lstrip('.').lower()
+        if ext not in ('jpg', 'jpeg', 'png', 'webp'):
+            ext = response.headers.get('Content-Type', 'image/jpeg').split('/')[-1].split(';')[0]
+        path = f"{base_path}.{ext}"
+        with open(path, 'wb') as f:
+            f.write(response.content)
+        return [path]
+    if kind == 'subtitles':
+        paths = []
+        for lang in languages:
+            # Uploaded subtitles first, automatic captions as a fallback
+            tracks = ((info.get('subtitles') or {}).get(lang)
+                      or (info.get('automatic_captions') or {}).get(lang))
+            if not tracks:
+                continue
+            track = next((t for ext in SUBTITLE_EXTS for t in tracks if t.get('ext') == ext), tracks[0])
+            path = f"{base_path}.{lang}.{track.get('ext') or 'vtt'}"
+            if track.get('data') is not None:
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(track['data'])
+            else:
+                with open(path, 'wb') as f:
+                    f.write(fetch_bytes(track['url'], track.get('http_headers')).content)
+            paths.append(path)
+        return paths
+    raise ValueError(f"Unknown sidecar: {kind}")
+
 class DownloadWorker(QThread):
     progress = Signal(float, str)  # Progress percentage and status message
-    finished = Signal()
+    finished = Signal(str)  # Path of the downloaded file
     error = Signal(str)
+    cancelled = Signal()
+    sidecar_finished = Signal(str, list, str)  # Sidecar key, paths written, error message
+    size_known = Signal('qint64')  # Expected size in bytes, once the format is resolved
 
-    def __init__(self, url, format_id, save_path, video_info):
+    def __init__(self, url, format_id, save_path, video_info=None, write_policy=None,
+                 sidecars=(), subtitle_languages=('en',), audio_preset=None):
         super().__init__()
         self.url = url
-        self.format_id = format_id
+        self.format_id = format_id  # A format id or any yt-dlp format rule
         self.save_path = save_path
         self.video_info = video_info
+        self.write_policy = write_policy or WritePolicy()
+        self.sidecars = tuple(sidecars)
+        self.subtitle_languages = tuple(subtitle_languages)
+        self.info = None  # Full info dict, only kept when sidecars need it
+        self.sidecar_paths = []
+        self.output_path = None
+        self.started_at = None
+        self.finished_at = None
+        self.is_cancelled = False
+        self.hasher = None
+        self.file_hash = None
+        self.bytes_received = None
+        self.audio_preset = audio_preset  # Audio preset to apply while downloading, when the format allows
+        self.transcoded = False
+        self.resolved_size = None  # Size of a format rule's selection, summed over merged formats
+
+    def cancel(self):
+        self.is_cancelled = True
 
     def progress_hook(self, d):
+        if self.is_cancelled:
+            raise yt_dlp.utils.DownloadCancelled()
+        # Hash what yt-dlp has appended so far; our own writer feeds the hasher directly
+        if self.hasher is not None:
+            if d['status'] == 'downloading' and d.get('tmpfilename'):
+                self.hasher.catch_up(d['tmpfilename'])
+            elif d['status'] == 'finished' and d.get('filename') and self.hasher.path:
+                self.hasher.catch_up(d['filename'])
+        if d['status'] == 'finished':
+            self.bytes_received = d.get('downloaded_bytes') or d.get('total_bytes')
         if d['status'] == 'downloading':
             try:
                 # Calculate progress
@@ -289,11 +1487,7 @@ class DownloadWorker(QThread):
             self.error.emit(str(d.get('error', 'Unknown error')))
 
     def format_size(self, size):
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size < 1024.0:
-                return f"{size:.1f} {unit}"
-            size /= 1024.0
-        return f"{size:.1f} TB"
+        return format_size(size)
 
     def sanitize_filename(self, filename):
         # Remove invalid characters
@@ -303,188 +1497,3901 @@ class DownloadWorker(QThread):
         return filename
 
     def get_safe_filename(self, title, ext):
-        # Create a safe filename from the video title
+        # Create a safe filename from the video title, reserved until run() returns
         base_filename = self.sanitize_filename(title)
-        filename = f"{base_filename}.{ext}"
-        
-        # If file exists, add a number to the end
-        counter = 1
-        while os.path.exists(os.path.join(self.save_path, filename)):
-            filename = f"{base_filename} ({counter}).{ext}"
-            counter += 1
-            
-        return filename
+        return output_names.reserve(self.save_path, base_filename, ext)
+
+    def history_entry(self):
+        format_info = self.video_info.get_format(self.format_id)
+        size = None
+        if self.output_path and os.path.exists(self.output_path):
+            size = os.path.getsize(self.output_path)
+        elapsed = (self.finished_at or time.time()) - (self.started_at or time.time())
+        return {
+            'video_id': self.video_info.id,
+            'title': self.video_info.title,
+            'channel': self.video_info.channel,
+            'url': self.url,
+            'format_id': self.format_id,
+            'format_note': format_info.format_note if format_info else None,
+            'path': self.output_path,
+            'size': size,
+            'duration': self.video_info.duration,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'throughput': size / elapsed if size and elapsed > 0 else None,
+            'hash_algorithm': self.write_policy.hash_algorithm if self.file_hash else None,
+            'hash': self.file_hash,
+            'mtime': os.path.getmtime(self.output_path) if size is not None else None,
+        }
+
+    def finish_hash(self, path):
+        # Use the running hash when it covers exactly the finished file
+        size = os.path.getsize(path)
+        hasher = self.hasher
+        if hasher.valid and hasher.path == path and hasher.offset == size:
+            return hasher.hexdigest()
+        return hash_file(path, hasher.algorithm, self.write_policy.buffer_size)
+
+    def resolve_format(self):
+        # Jobs submitted with only a URL and a format rule are extracted here
+        format_info = self.video_info.get_format(self.format_id) if self.video_info else None
+        if format_info:
+            return self.format_id, format_info.ext or 'mp4'
+        ydl_opts = {
+            'format': self.format_id or 'best',
+            'quiet': True,
+            'no_warnings': True,
+        }
+        info = single_flight.do(('format', video_key(self.url), ydl_opts['format']), extract_info, self.url, ydl_opts)
+        sizes = [f.get('filesize') or f.get('filesize_approx') for f in info.get('requested_formats') or [info]]
+        self.resolved_size = sum(sizes) if all(sizes) else None
+        if self.sidecars:
+            self.info = yt_dlp.YoutubeDL.sanitize_info(info)
+        self.video_info = VideoRecord.from_info(info)
+        return info.get('format_id') or self.format_id, info.get('ext') or 'mp4'
+
+    def sidecar_info(self):
+        # Reuse the info dict the search already extracted, extracting again only on a cache miss
+        if self.info is None and self.video_info and self.video_info.id:
+            try:
+                self.info = MetadataCache().get(self.video_info.id)
+            except (OSError, ValueError):
+                self.info = None
+        if self.info is None:
+            info = single_flight.do(('info', video_key(self.url)), extract_info, self.url,
+                                    {'quiet': True, 'no_warnings': True})
+            self.info = yt_dlp.YoutubeDL.sanitize_info(info)
+        return self.info
+
+    def start_sidecars(self, executor, base_path):
+        # Sidecars are fetched on their own threads while the media downloads
+        try:
+            info = self.sidecar_info()
+        except Exception as e:
+            for kind in self.sidecars:
+                self.sidecar_finished.emit(kind, [], str(e))
+            return []
+        futures = []
+        for kind in self.sidecars:
+            future = executor.submit(write_sidecar, kind, info, base_path, self.subtitle_languages)
+            future.add_done_callback(lambda f, kind=kind: self.sidecar_done(kind, f))
+            futures.append(future)
+        return futures
+
+    def sidecar_done(self, kind, future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            self.sidecar_paths.extend(future.result())
+            self.sidecar_finished.emit(kind, future.result(), '')
+        else:
+            self.sidecar_finished.emit(kind, [], str(error))
+
+    def remove_sidecars(self):
+        for path in self.sidecar_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        self.sidecar_paths = []
+
+    def cover_art(self):
+        # The thumbnail as a temporary JPEG for ffmpeg to embed, or None if there isn't one
+        if not self.video_info.thumbnail:
+            return None
+        try:
+            img = Image.open(BytesIO(fetch_bytes(self.video_info.thumbnail).content)).convert('RGB')
+        except Exception:
+            return None
+        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as f:
+            img.save(f, format='JPEG', quality=90)
+            return f.name
+
+    def stream_audio(self, format_info, download_path, cookies):
+        # Convert with ffmpeg while downloading instead of after
+        muxer, copy_codec, embeds_cover = AUDIO_STREAM_PRESETS[self.audio_preset]
+        cover_path = self.cover_art() if embeds_cover else None
+        metadata = {
+            'title': self.video_info.title,
+            'artist': self.video_info.channel,
+            'comment': self.video_info.webpage_url or self.url,
+        }
+        try:
+            writer = FfmpegPipeWriter(download_path,
+                                      audio_stream_args(self.audio_preset, format_info.acodec, cover_path, metadata),
+                                      [cover_path] if cover_path else ())
+            download_http(format_info.url, download_path, self.write_policy, format_info.http_headers,
+                          format_info.filesize, self.progress_hook, cookies=cookies, writer=writer,
+                          cancelled=lambda: self.is_cancelled)
+        finally:
+            if cover_path:
+                os.remove(cover_path)
+        self.transcoded = True
 
     def run(self):
+        self.started_at = time.time()
+        policy = self.write_policy
+        download_path = None
+        sidecar_pool = ThreadPoolExecutor(max_workers=len(self.sidecars)) if self.sidecars else None
+        sidecar_futures = []
         try:
-            # Get video title and extension
-            title = self.video_info.get('title', 'video')
-            format_info = next((f for f in self.video_info['formats'] 
-                              if f['format_id'] == self.format_id), None)
+            format_id, ext = self.resolve_format()
+            if self.is_cancelled:
+                raise yt_dlp.utils.DownloadCancelled()
             
-            if not format_info:
-                self.error.emit("Selected format not found")
-                return
-                
-            ext = format_info.get('ext', 'mp4')
+            format_info = self.video_info.get_format(format_id)
+            if format_info is not None and needs_size(format_info):
+                # A known size enables preallocation and the size check
+                format_info.filesize = size_cache.get(format_info.url, format_info.http_headers)
+            size = (format_info.estimated_size if format_info else None) or self.resolved_size
+            if size:
+                self.size_known.emit(size)
+            stream_audio = (self.audio_preset in AUDIO_STREAM_PRESETS and is_audio_only(format_info)
+                            and format_info.url and format_info.protocol in ('http', 'https')
+                            and shutil.which('ffmpeg') is not None)
+            if stream_audio:
+                ext = POSTPROCESS_PRESETS[self.audio_preset][1]
             
             # Get safe filename
-            filename = self.get_safe_filename(title, ext)
+            filename = self.get_safe_filename(self.video_info.title or 'video', ext)
+            self.output_path = os.path.join(self.save_path, filename)
             
-            ydl_opts = {
-                'format': self.format_id,
-                'progress_hooks': [self.progress_hook],
-                'outtmpl': os.path.join(self.save_path, filename),
-                'quiet': True,
-                'no_warnings': True,
-                'extract_flat': False,
-            }
+            # Download into the staging directory first when one is configured
+            download_path = self.output_path
+            if policy.staging_dir:
+                os.makedirs(policy.staging_dir, exist_ok=True)
+                download_path = os.path.join(policy.staging_dir, f"{uuid.uuid4().hex}.{ext}")
+            
+            if policy.hash_algorithm and not stream_audio:
+                self.hasher = IncrementalHasher(policy.hash_algorithm, policy.buffer_size)
+            
+            if sidecar_pool is not None:
+                sidecar_futures = self.start_sidecars(sidecar_pool, os.path.splitext(self.output_path)[0])
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([self.url])
-            self.finished.emit()
+            if stream_audio:
+                store = cookie_store()
+                self.stream_audio(format_info, download_path, store.jar() if store else None)
+                if store:
+                    store.save()
+            elif (policy.direct_write and format_info and format_info.url
+                    and format_info.protocol in ('http', 'https')):
+                store = cookie_store()
+                download_http(format_info.url, download_path, policy, format_info.http_headers,
+                              format_info.filesize, self.progress_hook, self.hasher,
+                              store.jar() if store else None, cancelled=lambda: self.is_cancelled)
+                if store:
+                    store.save()
+            else:
+                ydl_opts = {
+                    'format': format_id,
+                    'progress_hooks': [self.progress_hook],
+                    'outtmpl': download_path,
+                    'quiet': True,
+                    'no_warnings': True,
+                    'extract_flat': False,
+                }
+                ydl_opts.update(policy.ydl_options())
+                
+                with youtube_dl(ydl_opts) as ydl:
+                    ydl.download([self.url])
+            
+            # Check the transfer against the size the site announced
+            expected_size = format_info.filesize if format_info else None
+            if expected_size and self.bytes_received and self.bytes_received != expected_size:
+                raise ValueError(f"Size mismatch: expected {expected_size} bytes, received {self.bytes_received}")
+            if self.hasher is not None:
+                self.file_hash = self.finish_hash(download_path)
+            elif stream_audio and policy.hash_algorithm:
+                # The hash covers the converted file, not the bytes received
+                self.file_hash = hash_file(download_path, policy.hash_algorithm, policy.buffer_size)
+            
+            if download_path != self.output_path:
+                move_into_place(download_path, self.output_path, fsync=policy.fsync_interval > 0)
+            wait_futures(sidecar_futures)
+            self.finished_at = time.time()
+            self.finished.emit(self.output_path)
+        except yt_dlp.utils.DownloadCancelled:
+            # Remove the partial download and its sidecars
+            if download_path and os.path.exists(download_path + '.part'):
+                os.remove(download_path + '.part')
+            self.discard_sidecars(sidecar_futures)
+            self.cancelled.emit()
         except Exception as e:
+            self.discard_sidecars(sidecar_futures)
             self.error.emit(str(e))
+        finally:
+            if sidecar_pool is not None:
+                sidecar_pool.shutdown(wait=False)
+            if self.output_path:
+                output_names.release(self.output_path)
 
-class NotificationWidget(QWidget):
-    closed = Signal()
-    
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setParent(None)
-        self.setWindowFlags(Qt.Window | Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
-        self.setFixedSize(400, 200)
-        
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #2b2b2b;
-                border: 2px solid #4CAF50;
-                border-radius: 10px;
+    def discard_sidecars(self, futures):
+        for future in futures:
+            future.cancel()
+        wait_futures(futures)
+        self.remove_sidecars()
+
+# Post-processing presets: (label, output extension, ffmpeg arguments)
+POSTPROCESS_PRESETS = {
+    'none': ("Keep Original", None, None),
+    'mp3': ("Extract Audio (MP3)", 'mp3', ['-vn', '-c:a', 'libmp3lame', '-q:a', '2']),
+    'm4a': ("Extract Audio (M4A)", 'm4a', ['-vn', '-c:a', 'aac', '-b:a', '192k']),
+    'opus': ("Extract Audio (Opus)", 'opus', ['-vn', '-c:a', 'libopus', '-b:a', '128k']),
+    'remux_mp4': ("Remux to MP4", 'mp4', ['-map', '0', '-c', 'copy']),
+    'transcode_mp4': ("Transcode to MP4 (H.264)", 'mp4',
+                      ['-c:v', 'libx264', '-preset', 'medium', '-crf', '23', '-c:a', 'aac', '-b:a', '192k']),
+}
+
+# Audio presets that can convert while an audio-only format downloads:
+# preset -> (ffmpeg muxer, source codec prefix that is copied instead of re-encoded, embeds cover art)
+AUDIO_STREAM_PRESETS = {
+    'mp3': ('mp3', 'mp3', True),
+    'm4a': ('ipod', 'mp4a', True),
+    'opus': ('opus', 'opus', False),
+}
+
+def is_audio_only(format_info):
+    return (format_info is not None and format_info.vcodec == 'none'
+            and bool(format_info.acodec) and format_info.acodec != 'none')
+
+def audio_stream_args(preset, acodec=None, cover_path=None, metadata=None):
+    """ffmpeg output arguments for converting piped audio with an audio preset."""
+    muxer, copy_codec, embeds_cover = AUDIO_STREAM_PRESETS[preset]
+    args = [arg for arg in POSTPROCESS_PRESETS[preset][2] if arg != '-vn']
+    if acodec and acodec.startswith(copy_codec):
+        # Already in the target codec, so only the container changes
+        args = ['-c:a', 'copy']
+    if cover_path and embeds_cover:
+        args = ['-map', '0:a:0', '-map', '1:0'] + args + ['-c:v', 'copy', '-disposition:v:0', 'attached_pic']
+    else:
+        args = ['-map', '0:a:0'] + args
+    if preset == 'mp3':
+        args += ['-id3v2_version', '3']
+    for key, value in (metadata or {}).items():
+        if value:
+            args += ['-metadata', f"{key}={value}"]
+    return args + ['-f', muxer]
+
+class FfmpegPipeWriter:
+    """Download writer that pipes the received bytes into ffmpeg instead of a file.
+
+    Conversion runs while the transfer does, and the source format never
+    reaches the disk; ffmpeg writes only the converted file.
+    """
+
+    def __init__(self, path, args, inputs=()):
+        ffmpeg = shutil.which('ffmpeg')
+        if not ffmpeg:
+            raise RuntimeError("ffmpeg was not found. Please install it to use post-processing.")
+        self.path = path
+        self.part_path = path + '.part'
+        self.stderr = tempfile.TemporaryFile()
+        command = [ffmpeg, '-hide_banner', '-loglevel', 'error', '-y', '-i', 'pipe:0']
+        for extra in inputs:
+            command += ['-i', extra]
+        self.process = subprocess.Popen(command + args + [self.part_path], stdin=subprocess.PIPE,
+                                        stdout=subprocess.DEVNULL, stderr=self.stderr)
+        self.written = 0
+
+    def error(self):
+        self.stderr.seek(0)
+        message = self.stderr.read().decode('utf-8', 'replace').strip()
+        return RuntimeError(message or f"ffmpeg exited with code {self.process.returncode}")
+
+    def write(self, data):
+        try:
+            self.process.stdin.write(data)
+        except (BrokenPipeError, OSError):
+            # ffmpeg gave up on the input
+            self.process.wait()
+            raise self.error()
+        self.written += len(data)
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        if self.process.wait() != 0:
+            error = self.error()
+            self.abort()
+            raise error
+        self.stderr.close()
+        os.replace(self.part_path, self.path)
+
+    def abort(self):
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        if not self.stderr.closed:
+            self.stderr.close()
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+class OutputNames:
+    """Output paths claimed by downloads in progress.
+
+    Concurrent jobs for the same title would otherwise pick the same free
+    name and write into each other's .part file.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reserved = set()
+
+    def reserve(self, directory, base, ext):
+        # A name that is neither on disk nor claimed by another download
+        with self.lock:
+            filename = f"{base}.{ext}"
+            counter = 1
+            while True:
+                path = os.path.realpath(os.path.join(directory, filename))
+                if path not in self.reserved and not os.path.exists(path):
+                    break
+                filename = f"{base} ({counter}).{ext}"
+                counter += 1
+            self.reserved.add(path)
+            return filename
+
+    def release(self, path):
+        with self.lock:
+            self.reserved.discard(os.path.realpath(path))
+
+# Shared by every download worker in this process
+output_names = OutputNames()
+
+def unique_path(path):
+    # Add a number to the end of the name until the path is free
+    base, ext = os.path.splitext(path)
+    counter = 1
+    while os.path.exists(path):
+        path = f"{base} ({counter}){ext}"
+        counter += 1
+    return path
+
+def find_ffmpeg():
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        raise RuntimeError("ffmpeg was not found. Please install it to use post-processing.")
+    return ffmpeg
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def run_ffmpeg(source, target, args):
+    ffmpeg = find_ffmpeg()
+    command = [ffmpeg, '-nostdin', '-hide_banner', '-loglevel', 'error', '-y',
+               '-i', source] + args + [target]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        # Don't leave half-written outputs behind
+        remove_file(target)
+        raise RuntimeError(result.stderr.strip() or f"ffmpeg exited with code {result.returncode}")
+    return target
+
+class PostProcessManager(QObject):
+    """Runs ffmpeg conversions of finished downloads on a bounded pool.
+
+    Every task is its own ffmpeg process, so transcodes use separate cores and
+    never share a thread with the download workers.
+    """
+    queue_changed = Signal(int, int)  # Queued tasks, running tasks
+    task_finished = Signal(str, str, float)  # Preset, output path, seconds taken
+    task_failed = Signal(str, str)  # Source path, error message
+
+    def __init__(self, max_workers=None, parent=None):
+        super().__init__(parent)
+        if max_workers is None:
+            max_workers = max(1, (os.cpu_count() or 2) // 2)
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix='postprocess')
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+
+    def _update_counts(self, queued=0, running=0):
+        with self.lock:
+            self.queued += queued
+            self.running += running
+            counts = (self.queued, self.running)
+        self.queue_changed.emit(*counts)
+
+    def submit(self, source, preset):
+        label, ext, args = POSTPROCESS_PRESETS[preset]
+        if not ext:
+            return None
+        find_ffmpeg()
+        target = unique_path(os.path.splitext(source)[0] + '.' + ext)
+        # Reserve the name so tasks queued for the same file don't collide
+        open(target, 'a').close()
+        self._update_counts(queued=1)
+        try:
+            future = self.executor.submit(self._run_task, source, target, preset, args)
+        except RuntimeError:
+            remove_file(target)  # Shut down meanwhile
+            self._update_counts(queued=-1)
+            raise
+        future.add_done_callback(lambda f: self._dropped(f, target))
+        return future
+
+    def _dropped(self, future, target):
+        # Tasks cancelled before they ran still hold their reserved name
+        if future.cancelled():
+            remove_file(target)
+            self._update_counts(queued=-1)
+
+    def _run_task(self, source, target, preset, args):
+        self._update_counts(queued=-1, running=1)
+        started = time.monotonic()
+        try:
+            run_ffmpeg(source, target, args)
+            self.task_finished.emit(preset, target, time.monotonic() - started)
+        except Exception as e:
+            remove_file(target)
+            self.task_failed.emit(source, str(e))
+        finally:
+            self._update_counts(running=-1)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+HISTORY_FIELDS = ('video_id', 'title', 'channel', 'url', 'format_id', 'format_note', 'path',
+                  'size', 'duration', 'started_at', 'finished_at', 'throughput',
+                  'hash_algorithm', 'hash', 'mtime')
+
+# Columns added after the first release, created on older databases at startup
+HISTORY_MIGRATIONS = (
+    ('hash_algorithm', 'TEXT'),
+    ('hash', 'TEXT'),
+    ('mtime', 'REAL'),
+)
+
+class HistoryDatabase:
+    """SQLite record of completed downloads with a full-text index on titles and channels."""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(DATA_DIR, "history.db")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.has_fts = self._create_schema()
+
+    def _create_schema(self):
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS downloads (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    video_id TEXT,
+                    title TEXT,
+                    channel TEXT,
+                    url TEXT,
+                    format_id TEXT,
+                    format_note TEXT,
+                    path TEXT,
+                    size INTEGER,
+                    duration REAL,
+                    started_at REAL,
+                    finished_at REAL,
+                    throughput REAL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS downloads_video_id ON downloads(video_id)")
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(downloads)")}
+            for column, column_type in HISTORY_MIGRATIONS:
+                if column not in columns:
+                    self.conn.execute(f"ALTER TABLE downloads ADD COLUMN {column} {column_type}")
+        try:
+            self.conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS downloads_fts
+                    USING fts5(title, channel, content='downloads', content_rowid='id');
+                CREATE TRIGGER IF NOT EXISTS downloads_ai AFTER INSERT ON downloads BEGIN
+                    INSERT INTO downloads_fts(rowid, title, channel) VALUES (new.id, new.title, new.channel);
+                END;
+                CREATE TRIGGER IF NOT EXISTS downloads_ad AFTER DELETE ON downloads BEGIN
+                    INSERT INTO downloads_fts(downloads_fts, rowid, title, channel)
+                        VALUES ('delete', old.id, old.title, old.channel);
+                END;
+                CREATE TRIGGER IF NOT EXISTS downloads_au AFTER UPDATE ON downloads BEGIN
+                    INSERT INTO downloads_fts(downloads_fts, rowid, title, channel)
+                        VALUES ('delete', old.id, old.title, old.channel);
+                    INSERT INTO downloads_fts(rowid, title, channel) VALUES (new.id, new.title, new.channel);
+                END;
+            """)
+            return True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5, searches fall back to LIKE
+            return False
+
+    def add(self, entry):
+        values = [entry.get(field) for field in HISTORY_FIELDS]
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                f"INSERT INTO downloads ({', '.join(HISTORY_FIELDS)}) "
+                f"VALUES ({', '.join('?' * len(HISTORY_FIELDS))})",
+                values
+            )
+            return cursor.lastrowid
+
+    @staticmethod
+    def fts_query(text):
+        # Prefix-match every word so results update while typing
+        return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text))
+
+    def _where(self, query):
+        match = self.fts_query(query) if query else ''
+        if not match:
+            return "", []
+        if self.has_fts:
+            return "id IN (SELECT rowid FROM downloads_fts WHERE downloads_fts MATCH ?)", [match]
+        pattern = f"%{query.strip()}%"
+        return "(title LIKE ? OR channel LIKE ?)", [pattern, pattern]
+
+    def page(self, query='', before_id=None, limit=200):
+        # Keyset pagination: newest first, continuing below the last id seen
+        where, params = self._where(query)
+        clauses = [where] if where else []
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        sql = "SELECT * FROM downloads"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def count(self, query=''):
+        where, params = self._where(query)
+        sql = "SELECT COUNT(*) FROM downloads" + (f" WHERE {where}" if where else "")
+        with self.lock:
+            return self.conn.execute(sql, params).fetchone()[0]
+
+    def hashed_entries(self, batch_size=500):
+        # Every download with a stored hash, read in keyset pages
+        last_id = 0
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT id, path, size, hash_algorithm, hash, mtime FROM downloads "
+                    "WHERE hash IS NOT NULL AND id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1]['id']
+
+    def update_mtime(self, entry_id, mtime):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE downloads SET mtime = ? WHERE id = ?", (mtime, entry_id))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def verify_library(history, report=None):
+    """Check downloaded files against their stored hashes.
+
+    Files whose size and mtime still match the history are trusted without
+    reading them; only changed files are hashed again.
+    """
+    counts = {'unchanged': 0, 'verified': 0, 'corrupt': 0, 'missing': 0}
+    for entry in history.hashed_entries():
+        path = entry['path']
+        try:
+            stat = os.stat(path)
+        except OSError:
+            counts['missing'] += 1
+            if report:
+                report('missing', path)
+            continue
+        if stat.st_size == entry['size'] and stat.st_mtime == entry['mtime']:
+            counts['unchanged'] += 1
+            continue
+        if hash_file(path, entry['hash_algorithm']) == entry['hash']:
+            # Touched but intact, trust the new mtime from now on
+            history.update_mtime(entry['id'], stat.st_mtime)
+            counts['verified'] += 1
+        else:
+            counts['corrupt'] += 1
+            if report:
+                report('corrupt', path)
+    return counts
+
+def backoff_delay(attempt, base=2.0, cap=300.0):
+    # Exponential backoff with jitter so throttled jobs don't retry in lockstep
+    return min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+# Failures that mean the host wants us to slow down
+THROTTLING_ERROR = re.compile(
+    r"HTTP Error (429|403|503)|Too Many Requests|rate.?limit|throttl|timed? ?out|"
+    r"Connection (reset|aborted)|Remote end closed",
+    re.IGNORECASE
+)
+
+def host_key(url):
+    host = (urlparse(url).hostname or '').lower()
+    for prefix in ('www.', 'm.', 'music.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    return {'youtu.be': 'youtube.com'}.get(host, host)
+
+class HostState:
+    __slots__ = ('limit', 'in_flight', 'blocked_until', 'consecutive_throttles', 'outcomes',
+                 'throughput', 'completed', 'failed', 'throttled')
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.consecutive_throttles = 0
+        self.outcomes = deque(maxlen=20)  # Recent results, True for success
+        self.throughput = None  # Moving average in bytes per second
+        self.completed = 0
+        self.failed = 0
+        self.throttled = 0
+
+class HostConcurrencyController:
+    """Per-host download limits adjusted AIMD style.
+
+    Every success raises a host's limit by 1/limit (about one extra slot per
+    round of downloads), every throttling failure halves it and blocks new
+    starts on that host for a jittered, exponentially growing delay.
+    """
+
+    def __init__(self, initial=2, minimum=1, maximum=8):
+        self.initial = min(initial, maximum)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.hosts = {}
+
+    def state(self, host):
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = HostState(self.initial)
+        return state
+
+    def can_start(self, host, now=None):
+        state = self.state(host)
+        now = time.monotonic() if now is None else now
+        return state.in_flight < int(state.limit) and now >= state.blocked_until
+
+    def next_ready(self, host):
+        # Seconds until a blocked host accepts new downloads again
+        return max(0.0, self.state(host).blocked_until - time.monotonic())
+
+    def started(self, host):
+        self.state(host).in_flight += 1
+
+    def released(self, host):
+        state = self.state(host)
+        state.in_flight = max(0, state.in_flight - 1)
+
+    def succeeded(self, host, size=None, seconds=None):
+        state = self.state(host)
+        state.completed += 1
+        state.outcomes.append(True)
+        state.consecutive_throttles = 0
+        state.limit = min(self.maximum, state.limit + 1 / state.limit)
+        if size and seconds:
+            rate = size / seconds
+            state.throughput = rate if state.throughput is None else 0.8 * state.throughput + 0.2 * rate
+
+    def failed(self, host, throttled):
+        # Returns how long the caller should wait before retrying
+        state = self.state(host)
+        state.failed += 1
+        state.outcomes.append(False)
+        if not throttled:
+            return backoff_delay(0)
+        state.throttled += 1
+        state.limit = max(self.minimum, state.limit / 2)
+        delay = backoff_delay(state.consecutive_throttles)
+        state.consecutive_throttles += 1
+        state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
+        return delay
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            host: {
+                'limit': round(state.limit, 2),
+                'in_flight': state.in_flight,
+                'error_rate': (state.outcomes.count(False) / len(state.outcomes)) if state.outcomes else 0.0,
+                'throughput': state.throughput,
+                'completed': state.completed,
+                'failed': state.failed,
+                'throttled': state.throttled,
+                'blocked_for': max(0.0, state.blocked_until - now),
+            }
+            for host, state in self.hosts.items()
+        }
+
+def existing_parent(path):
+    # Nearest directory that exists, for checking a volume before the target is created
+    path = os.path.abspath(os.path.expanduser(path))
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+class DiskSpaceManager:
+    """Reserves each download's estimated size against free disk space and
+    places jobs without a save path on one of several output volumes.
+
+    A job is admitted when its filesystem keeps min_free bytes after its own
+    estimate and the unwritten part of every other reservation there. Jobs are
+    placed on the volume with the best measured write throughput per running
+    download, so parallel downloads spread across disks.
+    """
+    MIN_FREE = 512 * 1024 * 1024
+    UNKNOWN_SIZE = 512 * 1024 * 1024  # Estimate when the site reports no size
+
+    def __init__(self, volumes=(), min_free=MIN_FREE):
+        self.volumes = [os.path.abspath(os.path.expanduser(volume)) for volume in volumes]
+        self.min_free = min_free
+        self.reservations = {}  # Job id -> [(device, path, size)], progress
+        self.progress = {}
+        self.throughput = {}  # Volume -> moving average of bytes per second
+
+    @staticmethod
+    def device(path):
+        return os.stat(existing_parent(path)).st_dev
+
+    def reserved(self, device):
+        # Unwritten bytes of the downloads already admitted on a filesystem
+        total = 0
+        for job_id, entries in self.reservations.items():
+            remaining = 1 - self.progress.get(job_id, 0) / 100
+            total += sum(size * remaining for entry_device, _, size in entries if entry_device == device)
+        return total
+
+    def headroom(self, path):
+        device = self.device(path)
+        return shutil.disk_usage(existing_parent(path)).free - self.reserved(device) - self.min_free
+
+    def running_on(self, volume):
+        return sum(1 for entries in self.reservations.values() for _, path, _ in entries if path == volume)
+
+    def place(self, size):
+        # The fitting volume with the most throughput per running download, then the most room
+        known = [rate for rate in self.throughput.values() if rate]
+        default_rate = max(known) if known else 1.0  # Unmeasured volumes get tried early
+        candidates = []
+        for volume in self.volumes:
+            try:
+                room = self.headroom(volume)
+            except OSError:
+                continue  # Unmounted or unreachable
+            if room >= size:
+                rate = self.throughput.get(volume) or default_rate
+                candidates.append((rate / (self.running_on(volume) + 1), room, volume))
+        return max(candidates)[2] if candidates else None
+
+    def admit(self, job_id, path, size, staging_dir=None, estimate=False):
+        """Reserve size on path (and the staging directory) and return None, or
+        the reason the job can't start yet.
+
+        An estimate only reserves what is free, up to size; resize() corrects
+        it once the download knows its real size.
+        """
+        targets = [path] + ([staging_dir] if staging_dir else [])
+        entries = []
+        for target in targets:
+            try:
+                room = self.headroom(target)
+                device = self.device(target)
+            except OSError as e:
+                return f"Cannot check free space on {target}: {e}"
+            if room < size and not (estimate and room > 0):
+                return (f"Waiting for disk space on {target}: need {format_size(size)}, "
+                        f"{format_size(max(0, room))} available")
+            entries.append((device, target, min(size, room) if estimate else size))
+        self.reservations[job_id] = entries
+        self.progress[job_id] = 0
+        return None
+
+    def resize(self, job_id, size):
+        if job_id in self.reservations:
+            self.reservations[job_id] = [(device, path, size) for device, path, _ in self.reservations[job_id]]
+
+    def fits_alone(self, path, size):
+        # Whether the job could ever start on path once the other reservations are gone
+        try:
+            return shutil.disk_usage(existing_parent(path)).free - self.min_free >= size
+        except OSError:
+            return True
+
+    def update(self, job_id, progress):
+        if job_id in self.progress:
+            self.progress[job_id] = progress
+
+    def release(self, job_id):
+        self.reservations.pop(job_id, None)
+        self.progress.pop(job_id, None)
+
+    def record(self, path, size, seconds):
+        volume = next((v for v in self.volumes if os.path.commonpath([v, os.path.abspath(path)]) == v), None)
+        if volume and size and seconds > 0:
+            rate = size / seconds
+            previous = self.throughput.get(volume)
+            self.throughput[volume] = rate if previous is None else 0.8 * previous + 0.2 * rate
+
+    def stats(self):
+        stats = {}
+        for volume in self.volumes:
+            try:
+                free = shutil.disk_usage(existing_parent(volume)).free
+                reserved = self.reserved(self.device(volume))
+            except OSError:
+                free = reserved = None
+            stats[volume] = {
+                'free': free,
+                'reserved': reserved,
+                'running': self.running_on(volume),
+                'throughput': self.throughput.get(volume),
+            }
+        return stats
+
+class TimeWindow:
+    """Daily window such as 01:00-07:00 (wrapping past midnight when the end is
+    earlier than the start), optionally with its own concurrency limit: 01:00-07:00/4.
+    """
+    __slots__ = ('start', 'end', 'max_concurrent')
+
+    def __init__(self, start, end, max_concurrent=None):
+        self.start = start  # Minutes after midnight, local time
+        self.end = end
+        self.max_concurrent = max_concurrent
+
+    @classmethod
+    def parse(cls, text):
+        match = re.fullmatch(r'\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*(?:/\s*(\d+))?\s*', text or '')
+        if not match:
+            raise ValueError(f"Invalid time window {text!r}, expected e.g. 01:00-07:00 or 01:00-07:00/4")
+        start_hour, start_minute, end_hour, end_minute, limit = match.groups()
+        start = int(start_hour) * 60 + int(start_minute)
+        end = int(end_hour) * 60 + int(end_minute)
+        if start >= 24 * 60 or end > 24 * 60 or start == end or (limit is not None and int(limit) < 1):
+            raise ValueError(f"Invalid time window {text!r}")
+        return cls(start, end, int(limit) if limit else None)
+
+    def __str__(self):
+        text = f"{self.start // 60:02d}:{self.start % 60:02d}-{self.end // 60:02d}:{self.end % 60:02d}"
+        return f"{text}/{self.max_concurrent}" if self.max_concurrent else text
+
+    def is_open(self, when):
+        moment = datetime.fromtimestamp(when)
+        minute = moment.hour * 60 + moment.minute
+        if self.start < self.end:
+            return self.start <= minute < self.end
+        return minute >= self.start or minute < self.end
+
+    def next_open(self, when):
+        # Earliest time at or after when that falls inside the window
+        if self.is_open(when):
+            return when
+        opens = datetime.fromtimestamp(when).replace(hour=self.start // 60, minute=self.start % 60,
+                                                     second=0, microsecond=0)
+        if opens.timestamp() <= when:
+            opens += timedelta(days=1)
+        return opens.timestamp()
+
+def parse_start_time(value):
+    # Epoch seconds or an ISO 8601 local time such as 2024-05-01T01:30
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(str(value)).timestamp()
+
+# Priority classes, most urgent first
+PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+
+JOB_STATES = ('queued', 'downloading', 'finished', 'failed', 'cancelled')
+
+class DownloadJob:
+    def __init__(self, url, format_id, save_path, video_info=None, postprocess='none',
+                 sidecars=(), subtitle_languages=('en',), priority='normal', not_before=None, window=None):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        self.id = uuid.uuid4().hex[:12]
+        self.url = url
+        self.format_id = format_id
+        self.save_path = save_path
+        self.video_info = video_info
+        self.postprocess = postprocess
+        self.sidecars = {kind: {'status': 'pending', 'paths': [], 'error': None} for kind in sidecars}
+        self.subtitle_languages = tuple(subtitle_languages)
+        self.priority = priority
+        self.not_before = not_before
+        self.window = TimeWindow.parse(window) if isinstance(window, str) else window
+        self.retry_at = None
+        self.sequence = None
+        self.host = host_key(url)
+        self.attempts = 0
+        self.status = 'queued'
+        self.progress = 0.0
+        self.status_text = ''
+        self.error = None
+        self.output_path = None
+        self.file_hash = None
+        self.size = None  # Reported by the worker once it knows the format
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.worker = None
+
+    @property
+    def is_done(self):
+        return self.status in ('finished', 'failed', 'cancelled')
+
+    @property
+    def window_key(self):
+        return str(self.window) if self.window else ''
+
+    @property
+    def known_size(self):
+        if self.size:
+            return self.size
+        format_info = self.video_info.get_format(self.format_id) if self.video_info else None
+        return format_info.estimated_size if format_info else None
+
+    @property
+    def estimated_size(self):
+        return self.known_size or DiskSpaceManager.UNKNOWN_SIZE
+
+    def eligible_at(self, now):
+        # When the job may start: after its start time and retry delay, inside its window
+        start = max(now, self.not_before or 0, self.retry_at or 0)
+        return self.window.next_open(start) if self.window else start
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'url': self.url,
+            'title': self.video_info.title if self.video_info else None,
+            'thumbnail': self.video_info.thumbnail if self.video_info else None,
+            'format': self.format_id,
+            'save_path': self.save_path,
+            'postprocess': self.postprocess,
+            'priority': self.priority,
+            'not_before': self.not_before,
+            'window': str(self.window) if self.window else None,
+            'sidecars': {kind: dict(state) for kind, state in self.sidecars.items()},
+            'status': self.status,
+            'progress': self.progress,
+            'status_text': self.status_text,
+            'error': self.error,
+            'attempts': self.attempts,
+            'output_path': self.output_path,
+            'hash': self.file_hash,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+class DownloadQueue(QObject):
+    """Runs download jobs on DownloadWorkers, at most max_concurrent at a time.
+
+    Used by both the window and the daemon. submit() and cancel() may be called
+    from any thread; workers are always started from the thread owning the queue.
+    Within max_concurrent, each host gets as many downloads as its
+    HostConcurrencyController limit allows, and jobs failing with throttling
+    or network errors are retried up to MAX_RETRIES times with backoff.
+
+    Jobs wait in one priority heap per time window (jobs without a window share
+    one), each with its own concurrency limit within max_concurrent. Jobs that
+    may not start yet sit in a heap ordered by start time, and a single timer
+    is armed for the earliest start instead of polling.
+
+    Each job reserves its estimated size with the DiskSpaceManager before it
+    starts; jobs submitted without a save path are placed on its volumes.
+    """
+    MAX_RETRIES = 5
+    job_updated = Signal(dict)
+    job_finished = Signal(dict)  # Emitted once a job is finished, failed or cancelled
+    _start_requested = Signal()
+    _cancel_requested = Signal(str)
+
+    SPACE_RECHECK = 30  # Seconds between free space checks while jobs wait for disk space
+    KEEP_FINISHED = 1000  # Finished, failed and cancelled jobs kept for listing
+
+    def __init__(self, max_concurrent=1, history=None, postprocessor=None, write_policy=None,
+                 download_dir=None, disk=None, parent=None):
+        super().__init__(parent)
+        self.max_concurrent = max_concurrent
+        self.write_policy = write_policy or WritePolicy()
+        self.download_dir = download_dir or DEFAULT_DOWNLOAD_DIR
+        self.disk = disk or DiskSpaceManager()
+        self.history = history
+        self.postprocessor = postprocessor
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.pending = {}  # Window key -> heap of (priority, sequence, job)
+        self.delayed = []  # Heap of (start time, sequence, job)
+        self.sequence = itertools.count()
+        self.running = set()
+        self.retired = []  # Workers whose thread may still be winding down
+        self.hosts = HostConcurrencyController(maximum=max(1, max_concurrent))
+        self.wake_timer = QTimer(self)
+        self.wake_timer.setSingleShot(True)
+        self.wake_timer.timeout.connect(self.start_next)
+        self._start_requested.connect(self.start_next)
+        self._cancel_requested.connect(self._cancel)
+
+    def submit(self, url, format_id, save_path, video_info=None, postprocess='none',
+               sidecars=(), subtitle_languages=('en',), priority='normal', not_before=None, window=None):
+        job = DownloadJob(url, format_id, save_path, video_info, postprocess, sidecars, subtitle_languages,
+                          priority, not_before, window)
+        with self.lock:
+            self.jobs[job.id] = job
+            job.sequence = next(self.sequence)
+            self._push(job)
+        self._start_requested.emit()
+        return job.id
+
+    def _push(self, job):
+        heapq.heappush(self.pending.setdefault(job.window_key, []),
+                       (PRIORITIES[job.priority], job.sequence, job))
+
+    def limit(self, job):
+        # A window's limit applies within max_concurrent, never above it
+        if job.window and job.window.max_concurrent:
+            return min(job.window.max_concurrent, self.max_concurrent)
+        return self.max_concurrent
+
+    def cancel(self, job_id):
+        if job_id not in self.jobs:
+            return False
+        self._cancel_requested.emit(job_id)
+        return True
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def list(self):
+        with self.lock:
+            return [job.to_dict() for job in self.jobs.values()]
+
+    def host_stats(self):
+        with self.lock:
+            return self.hosts.stats()
+
+    def volume_stats(self):
+        with self.lock:
+            return self.disk.stats()
+
+    def start_next(self):
+        now = time.time()
+        ready = []
+        scheduled = []
+        rejected = []
+        waits = []
+        with self.lock:
+            # Jobs whose start time has come join their window's heap
+            while self.delayed and self.delayed[0][0] <= now:
+                job = heapq.heappop(self.delayed)[2]
+                if not job.is_done:
+                    self._push(job)
+            running = {}
+            for job_id in self.running:
+                key = self.jobs[job_id].window_key
+                running[key] = running.get(key, 0) + 1
+            for key, heap in self.pending.items():
+                # Highest priority jobs first; jobs of a host that is full or backing off wait
+                skipped = []
+                while (heap and running.get(key, 0) < self.limit(heap[0][2])
+                        and sum(running.values()) < self.max_concurrent):
+                    entry = heapq.heappop(heap)
+                    job = entry[2]
+                    if job.is_done:
+                        continue  # Cancelled while queued
+                    start = job.eligible_at(now)
+                    if start > now:
+                        heapq.heappush(self.delayed, (start, job.sequence, job))
+                        job.status_text = f"Scheduled for {datetime.fromtimestamp(start):%Y-%m-%d %H:%M}"
+                        scheduled.append(job.to_dict())
+                    elif self.hosts.can_start(job.host):
+                        reason = self._admit(job)
+                        if reason is None:
+                            self.hosts.started(job.host)
+                            running[key] = running.get(key, 0) + 1
+                            ready.append(job)
+                        elif reason is False:
+                            rejected.append(job)
+                        else:
+                            # Smaller jobs behind it may still fit
+                            skipped.append(entry)
+                            waits.append(self.SPACE_RECHECK)
+                            if job.status_text != reason:
+                                job.status_text = reason
+                                scheduled.append(job.to_dict())
+                    else:
+                        skipped.append(entry)
+                        waits.append(self.hosts.next_ready(job.host))
+                for entry in skipped:
+                    heapq.heappush(heap, entry)
+            # Jobs cancelled while delayed must not keep the timer armed
+            if any(entry[2].is_done for entry in self.delayed):
+                self.delayed = [entry for entry in self.delayed if not entry[2].is_done]
+                heapq.heapify(self.delayed)
+            if self.delayed:
+                waits.append(self.delayed[0][0] - now)
+        for job in ready:
+            self._start(job)
+        for job in rejected:
+            self._finish(job, 'failed')
+        for job in scheduled:
+            self.job_updated.emit(job)
+        # Come back for the next scheduled job or when a throttled host opens up again
+        waits = [wait for wait in waits if wait > 0]
+        if waits:
+            self.wake_timer.start(int(min(min(waits), 86400) * 1000) + 50)
+
+    def _admit(self, job):
+        # None when the job may start, False when it can never fit, else why it waits.
+        # Without a known size only a placeholder is reserved, and it never fails the job.
+        size = job.known_size
+        estimate = not size
+        if estimate:
+            size = DiskSpaceManager.UNKNOWN_SIZE
+        if job.save_path is None:
+            if self.disk.volumes:
+                volume = self.disk.place(1 if estimate else size)
+                if volume is None:
+                    if not estimate and not any(self.disk.fits_alone(volume, size) for volume in self.disk.volumes):
+                        job.error = f"Not enough disk space on any output volume: need {format_size(size)}"
+                        return False
+                    return f"Waiting for disk space: need {format_size(size)} on one of the output volumes"
+                path = volume
+            else:
+                path = self.download_dir
+        else:
+            path = job.save_path
+        if not estimate and not self.disk.fits_alone(path, size):
+            job.error = f"Not enough disk space on {path}: need {format_size(size)}"
+            return False
+        reason = self.disk.admit(job.id, path, size, self.write_policy.staging_dir, estimate)
+        if reason is None:
+            job.save_path = path
+        return reason
+
+    def _start(self, job):
+        self.running.add(job.id)
+        try:
+            os.makedirs(job.save_path, exist_ok=True)
+        except OSError as e:
+            job.error = f"Could not create download directory: {e}"
+            self._finish(job, 'failed')
+            return
+        worker = DownloadWorker(job.url, job.format_id, job.save_path, job.video_info, self.write_policy,
+                                job.sidecars, job.subtitle_languages, job.postprocess)
+        def current(handler, *extra):
+            # Drop late signals from a worker the job has already moved past
+            return lambda *args: handler(job, *extra, *args) if job.worker is worker else None
+        worker.progress.connect(current(self._on_progress))
+        worker.finished.connect(current(self._on_finished))
+        worker.error.connect(current(self._on_error))
+        worker.cancelled.connect(current(self._on_cancelled))
+        worker.size_known.connect(current(self._on_size))
+        worker.sidecar_finished.connect(current(self._on_sidecar))
+        with self.lock:
+            job.worker = worker
+            for state in job.sidecars.values():
+                state.update(status='pending', paths=[], error=None)
+            job.status = 'downloading'
+            job.started_at = time.time()
+        worker.start()
+        self.job_updated.emit(job.to_dict())
+
+    def _cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job.is_done:
+            return
+        if job.worker is not None:
+            job.worker.cancel()
+            return
+        # Queued jobs are dropped from the heaps when they come up
+        self._finish(job, 'cancelled')
+
+    def _on_progress(self, job, value, text):
+        with self.lock:
+            job.progress = value
+            self.disk.update(job.id, value)
+            job.status_text = text
+        self.job_updated.emit(job.to_dict())
+
+    def _on_size(self, job, size):
+        # Replace the admission estimate with the real size, failing jobs that can never fit
+        with self.lock:
+            job.size = size
+            fits = self.disk.fits_alone(job.save_path, size)
+            if fits:
+                self.disk.resize(job.id, size)
+            else:
+                job.error = f"Not enough disk space on {job.save_path}: need {format_size(size)}"
+        if not fits and job.worker is not None:
+            job.worker.cancel()
+
+    def _on_cancelled(self, job):
+        self._finish(job, 'failed' if job.error else 'cancelled')
+
+    def _on_sidecar(self, job, kind, paths, error):
+        with self.lock:
+            if error:
+                job.sidecars[kind].update(status='failed', error=error)
+            else:
+                job.sidecars[kind].update(status='finished' if paths else 'unavailable', paths=paths)
+        self.job_updated.emit(job.to_dict())
+
+    def _on_finished(self, job, path):
+        worker = job.worker
+        if path and os.path.exists(path):
+            size = os.path.getsize(path)
+            self.hosts.succeeded(job.host, size, time.time() - job.started_at)
+            with self.lock:
+                self.disk.record(path, size, time.time() - job.started_at)
+        with self.lock:
+            job.output_path = path
+            job.file_hash = worker.file_hash
+            job.video_info = worker.video_info
+            job.progress = 100.0
+        if self.history is not None:
+            try:
+                self.history.add(worker.history_entry())
+            except sqlite3.Error as e:
+                job.status_text = f"Could not save download history: {e}"
+        if self.postprocessor is not None and job.postprocess != 'none' and not worker.transcoded:
+            try:
+                self.postprocessor.submit(path, job.postprocess)
+            except Exception as e:
+                job.status_text = f"Post-processing failed: {e}"
+        self._finish(job, 'finished')
+
+    def _on_error(self, job, message):
+        # Workers may report the same failure from the hook and from run()
+        if job.is_done:
+            return
+        throttled = bool(THROTTLING_ERROR.search(message))
+        delay = self.hosts.failed(job.host, throttled)
+        if throttled and job.attempts < self.MAX_RETRIES:
+            self._retry(job, delay, message)
+            return
+        with self.lock:
+            job.error = message
+        self._finish(job, 'failed')
+
+    def _retry(self, job, delay, message):
+        self._release(job)
+        with self.lock:
+            job.attempts += 1
+            job.status = 'queued'
+            job.progress = 0.0
+            job.status_text = f"Retrying in {delay:.0f}s (attempt {job.attempts + 1}): {message}"
+            job.retry_at = time.time() + delay
+            # Keeps its priority and place in line once the delay is over
+            heapq.heappush(self.delayed, (job.retry_at, job.sequence, job))
+        self.job_updated.emit(job.to_dict())
+        self.start_next()
+
+    def _release(self, job):
+        # Free the job's slot and keep its QThread alive until run() has returned
+        with self.lock:
+            worker, job.worker = job.worker, None
+        if worker is not None:
+            self.retired.append(worker)
+        self.retired = [w for w in self.retired if not w.isFinished()]
+        with self.lock:
+            self.disk.release(job.id)
+        if job.id in self.running:
+            self.running.discard(job.id)
+            self.hosts.released(job.host)
+
+    def _finish(self, job, status):
+        self._release(job)
+        with self.lock:
+            job.status = status
+            job.finished_at = time.time()
+            # Jobs are in submission order, so the oldest finished ones go first
+            done = [job_id for job_id, other in self.jobs.items() if other.is_done]
+            for job_id in done[:max(0, len(done) - self.KEEP_FINISHED)]:
+                del self.jobs[job_id]
+        snapshot = job.to_dict()
+        self.job_updated.emit(snapshot)
+        self.job_finished.emit(snapshot)
+        self.start_next()
+
+    def shutdown(self):
+        self.wake_timer.stop()
+        with self.lock:
+            self.pending.clear()
+            self.delayed.clear()
+            workers = [job.worker for job in self.jobs.values() if job.worker is not None]
+        for worker in workers:
+            worker.cancel()
+        for worker in workers:
+            worker.wait(5000)
+
+DEFAULT_DAEMON_PORT = 8765
+
+def string_list(request, key):
+    # A JSON list of strings, or [] when the key is missing or null
+    value = request.get(key)
+    if value is None:
+        return []
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f'"{key}" must be a list of strings')
+    return value
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    server_version = "TubeMaster"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        # ValueError for anything but a JSON object
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            raise ValueError("Invalid Content-Length")
+        if not length:
+            return {}
+        try:
+            request = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ValueError("Invalid JSON")
+        if not isinstance(request, dict):
+            raise ValueError("Expected a JSON object")
+        return request
+
+    def authorized(self):
+        token = self.server.api.token
+        if token and self.headers.get('Authorization') != f"Bearer {token}":
+            self.send_json(401, {'error': 'Unauthorized'})
+            return False
+        if not token and not self.local_host():
+            self.send_json(403, {'error': 'Host not allowed'})
+            return False
+        return True
+
+    def local_host(self):
+        # Without a token, a page reaching us through DNS rebinding shows up in the Host header
+        hostname = urlparse('//' + (self.headers.get('Host') or '')).hostname or ''
+        if hostname in ('localhost', (self.server.api.host or '').lower()):
+            return True
+        try:
+            return ipaddress.ip_address(hostname).is_loopback
+        except ValueError:
+            return False
+
+    def route(self):
+        parts = [part for part in self.path.split('?')[0].split('/') if part]
+        if parts[:1] != ['api']:
+            return None
+        return parts[1:]
+
+    def do_GET(self):
+        if not self.authorized():
+            return
+        parts = self.route()
+        download_queue = self.server.api.queue
+        if parts == ['status']:
+            jobs = download_queue.list()
+            self.send_json(200, {
+                'jobs': len(jobs),
+                'running': sum(1 for job in jobs if job['status'] == 'downloading'),
+                'queued': sum(1 for job in jobs if job['status'] == 'queued'),
+                'max_concurrent': download_queue.max_concurrent,
+                'hosts': download_queue.host_stats(),
+                'volumes': download_queue.volume_stats(),
+                'coalesced': single_flight.stats(),
+            })
+        elif parts == ['jobs']:
+            self.send_json(200, {'jobs': download_queue.list()})
+        elif parts and len(parts) == 2 and parts[0] == 'jobs':
+            job = download_queue.get(parts[1])
+            if job is None:
+                self.send_json(404, {'error': 'Job not found'})
+            else:
+                self.send_json(200, job)
+        elif parts == ['events']:
+            self.stream_events()
+        elif parts == ['subscriptions'] and self.server.api.subscriptions is not None:
+            self.send_json(200, {'subscriptions': self.server.api.subscriptions.database.list()})
+        else:
+            self.send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        if not self.authorized():
+            return
+        # Cross-site forms can't send JSON without a CORS preflight, which is never answered
+        if self.headers.get_content_type() != 'application/json':
+            self.send_json(415, {'error': 'Content-Type must be application/json'})
+            return
+        parts = self.route()
+        api = self.server.api
+        if parts == ['jobs']:
+            try:
+                request = self.read_json()
+                urls = string_list(request, 'urls') or ([request['url']] if request.get('url') else [])
+                sidecars = string_list(request, 'sidecars')
+                languages = string_list(request, 'subtitle_languages') or ['en']
+                for key in ('url', 'format', 'postprocess', 'priority'):
+                    if not isinstance(request.get(key, ''), str):
+                        raise ValueError(f'"{key}" must be a string')
+            except ValueError as e:
+                self.send_json(400, {'error': str(e)})
+                return
+            if not urls:
+                self.send_json(400, {'error': 'No URLs given'})
+                return
+            postprocess = request.get('postprocess', 'none')
+            if postprocess not in POSTPROCESS_PRESETS:
+                self.send_json(400, {'error': f"Unknown post-processing preset: {postprocess}"})
+                return
+            unknown = [kind for kind in sidecars if kind not in SIDECARS]
+            if unknown:
+                self.send_json(400, {'error': f"Unknown sidecars: {', '.join(unknown)}"})
+                return
+            priority = request.get('priority', 'normal')
+            if priority not in PRIORITIES:
+                self.send_json(400, {'error': f"Unknown priority: {priority}"})
+                return
+            try:
+                not_before = parse_start_time(request.get('start_after'))
+                # Jobs without a "window" key get the daemon's default window, null means none
+                window = request['window'] if 'window' in request else api.window
+                window = TimeWindow.parse(window) if isinstance(window, str) else window
+                # Without a path jobs go to the queue's download directory or output volumes
+                save_path = api.save_path(request.get('path') or api.download_dir)
+            except (TypeError, ValueError) as e:
+                self.send_json(400, {'error': str(e)})
+                return
+            job_ids = [api.queue.submit(url, request.get('format', 'best'), save_path, postprocess=postprocess,
+                                        sidecars=sidecars, subtitle_languages=languages, priority=priority,
+                                        not_before=not_before, window=window)
+                       for url in urls]
+            self.send_json(201, {'jobs': [api.queue.get(job_id) for job_id in job_ids]})
+        elif parts and len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'cancel':
+            self.cancel_job(parts[1])
+        elif parts and parts[0] == 'subscriptions' and api.subscriptions is not None:
+            self.post_subscription(parts[1:])
+        else:
+            self.send_json(404, {'error': 'Not found'})
+
+    def post_subscription(self, parts):
+        manager = self.server.api.subscriptions
+        if len(parts) == 2 and parts[1] == 'sync':
+            if not parts[0].isdigit() or manager.database.get(int(parts[0])) is None:
+                self.send_json(404, {'error': 'Subscription not found'})
+                return
+            manager.request_sync(int(parts[0]))
+            self.send_json(202, {'id': int(parts[0]), 'syncing': True})
+            return
+        if parts:
+            self.send_json(404, {'error': 'Not found'})
+            return
+        try:
+            request = self.read_json()
+            for key in ('url', 'format', 'postprocess'):
+                if not isinstance(request.get(key, ''), str):
+                    raise ValueError(f'"{key}" must be a string')
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+            return
+        if not request.get('url'):
+            self.send_json(400, {'error': 'No URL given'})
+            return
+        postprocess = request.get('postprocess', 'none')
+        if postprocess not in POSTPROCESS_PRESETS:
+            self.send_json(400, {'error': f"Unknown post-processing preset: {postprocess}"})
+            return
+        try:
+            save_path = self.server.api.save_path(request.get('path'))
+            interval = float(request.get('interval_hours', 24)) * 3600
+        except (TypeError, ValueError) as e:
+            self.send_json(400, {'error': str(e)})
+            return
+        subscription_id = manager.database.add(
+            request['url'], request.get('format', 'best'), postprocess, save_path, interval,
+            bool(request.get('newest_first', True)), bool(request.get('backfill', False)))
+        manager.request_sync(subscription_id)
+        self.send_json(201, manager.database.get(subscription_id))
+
+    def do_DELETE(self):
+        if not self.authorized():
+            return
+        parts = self.route()
+        subscriptions = self.server.api.subscriptions
+        if parts and len(parts) == 2 and parts[0] == 'jobs':
+            self.cancel_job(parts[1])
+        elif parts and len(parts) == 2 and parts[0] == 'subscriptions' and subscriptions is not None:
+            if parts[1].isdigit() and subscriptions.database.remove(int(parts[1])):
+                self.send_json(200, {'id': int(parts[1]), 'removed': True})
+            else:
+                self.send_json(404, {'error': 'Subscription not found'})
+        else:
+            self.send_json(404, {'error': 'Not found'})
+
+    def cancel_job(self, job_id):
+        if self.server.api.queue.cancel(job_id):
+            self.send_json(202, {'id': job_id, 'cancelling': True})
+        else:
+            self.send_json(404, {'error': 'Job not found'})
+
+    def stream_events(self):
+        # Server-sent events: one "data:" line per job update
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        events = self.server.api.subscribe()
+        try:
+            while not self.server.api.stopping:
+                try:
+                    event = events.get(timeout=15)
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                except queue.Empty:
+                    self.wfile.write(b": keepalive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.server.api.unsubscribe(events)
+
+class ApiServer:
+    """Local JSON HTTP API over a DownloadQueue, served from a background thread.
+
+    Endpoints (all under /api): GET status, GET jobs, POST jobs, GET jobs/<id>,
+    DELETE jobs/<id> or POST jobs/<id>/cancel, and GET events (server-sent events).
+    With a SubscriptionManager: GET and POST subscriptions, DELETE subscriptions/<id>
+    and POST subscriptions/<id>/sync.
+    """
+
+    def __init__(self, download_queue, host='127.0.0.1', port=DEFAULT_DAEMON_PORT, token=None,
+                 download_dir=None, subscriptions=None, window=None):
+        self.queue = download_queue
+        self.subscriptions = subscriptions
+        self.window = window  # Default TimeWindow for submitted jobs
+        self.token = token
+        self.host = host
+        self.download_dir = download_dir
+        self.subscribers = []
+        self.subscribers_lock = threading.Lock()
+        self.stopping = False
+        self.httpd = ThreadingHTTPServer((host, port), ApiRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.api = self
+        self.thread = None
+        download_queue.job_updated.connect(self.publish)
+
+    @property
+    def address(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def save_path(self, path):
+        # Requests may only write below the download directory or an output volume;
+        # relative paths are taken from the download directory
+        if not path:
+            return None
+        roots = [os.path.realpath(root) for root in [self.queue.download_dir] + self.queue.disk.volumes]
+        target = os.path.realpath(os.path.join(roots[0], os.path.expanduser(str(path))))
+        if not any(os.path.commonpath([root, target]) == root for root in roots):
+            raise ValueError(f"Path is outside the download directories: {path}")
+        return target
+
+    def subscribe(self):
+        events = queue.Queue(maxsize=1000)
+        with self.subscribers_lock:
+            self.subscribers.append(events)
+        return events
+
+    def unsubscribe(self, events):
+        with self.subscribers_lock:
+            if events in self.subscribers:
+                self.subscribers.remove(events)
+
+    def publish(self, job):
+        with self.subscribers_lock:
+            subscribers = list(self.subscribers)
+        for events in subscribers:
+            try:
+                events.put_nowait(job)
+            except queue.Full:
+                # Slow clients miss intermediate progress, never the final state
+                if job['status'] in ('finished', 'failed', 'cancelled'):
+                    try:
+                        events.get_nowait()
+                    except queue.Empty:
+                        pass  # The client caught up meanwhile
+                    try:
+                        events.put_nowait(job)
+                    except queue.Full:
+                        pass
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='api-server', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping = True
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class DaemonEventWorker(QThread):
+    event = Signal(dict)
+    error = Signal(str)
+
+    def __init__(self, base_url, headers):
+        super().__init__()
+        self.base_url = base_url
+        self.headers = headers
+        self.running = True
+
+    def run(self):
+        while self.running:
+            try:
+                with requests.get(f"{self.base_url}/api/events", headers=self.headers,
+                                  stream=True, timeout=(5, 60)) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines(decode_unicode=True):
+                        if not self.running:
+                            return
+                        if line and line.startswith('data: '):
+                            self.event.emit(json.loads(line[6:]))
+            except Exception as e:
+                if self.running:
+                    self.error.emit(str(e))
+                    self.msleep(2000)
+
+    def stop(self):
+        self.running = False
+
+class DaemonClient(QObject):
+    """Same interface as DownloadQueue, forwarding jobs to a running daemon.
+
+    Requests run on worker threads, so an unreachable daemon never blocks the
+    window. submit() returns a local id at once and the daemon's job is
+    reported under that id; list() and get() answer through listed and
+    fetched, and failed requests through request_failed.
+    """
+    job_updated = Signal(dict)
+    job_finished = Signal(dict)
+    listed = Signal(list)
+    fetched = Signal(dict)
+    request_failed = Signal(str)
+    _submitted = Signal(str, dict)  # Local id, job as created by the daemon
+    _submit_failed = Signal(str, str)  # Local id, error message
+
+    def __init__(self, base_url, token=None, parent=None):
+        super().__init__(parent)
+        self.base_url = base_url.rstrip('/')
+        self.headers = {'Authorization': f"Bearer {token}"} if token else {}
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='daemon-client')
+        self.local_ids = {}  # Daemon job id -> local id
+        self.daemon_ids = {}  # Local id -> daemon job id
+        self.submitting = set()  # Local ids the daemon hasn't answered for yet
+        self.held = []  # Events that may belong to a job still being submitted
+        self.cancel_requested = set()
+        self._submitted.connect(self.submitted)
+        self._submit_failed.connect(self.submit_failed)
+        self.events = DaemonEventWorker(self.base_url, self.headers)
+        self.events.event.connect(self.handle_event)
+        self.events.start()
+
+    def request(self, method, path, **kwargs):
+        response = requests.request(method, f"{self.base_url}/api/{path}", headers=self.headers,
+                                    timeout=10, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def call(self, on_result, method, path, **kwargs):
+        # Run a request on a worker thread and pass its result to on_result there
+        def run():
+            try:
+                result = self.request(method, path, **kwargs)
+            except (requests.RequestException, ValueError) as e:
+                self.request_failed.emit(f"Daemon request failed: {e}")
+                return
+            if on_result is not None:
+                on_result(result)
+        self.executor.submit(run)
+
+    def local_job(self, job):
+        local_id = self.local_ids.get(job['id'])
+        return dict(job, id=local_id) if local_id else job
+
+    def submit(self, url, format_id, save_path, video_info=None, postprocess='none',
+               sidecars=(), subtitle_languages=('en',), priority='normal', not_before=None, window=None):
+        local_id = uuid.uuid4().hex[:12]
+        payload = {
+            'url': url,
+            'format': format_id,
+            'path': save_path,
+            'postprocess': postprocess,
+            'sidecars': list(sidecars),
+            'subtitle_languages': list(subtitle_languages),
+            'priority': priority,
+            'start_after': not_before,
+            'window': str(window) if window else None,
+        }
+
+        def run():
+            try:
+                job = self.request('POST', 'jobs', json=payload)['jobs'][0]
+            except (requests.RequestException, ValueError, KeyError, IndexError) as e:
+                self._submit_failed.emit(local_id, str(e))
+            else:
+                self._submitted.emit(local_id, job)
+        self.submitting.add(local_id)
+        self.executor.submit(run)
+        return local_id
+
+    def submitted(self, local_id, job):
+        self.submitting.discard(local_id)
+        self.local_ids[job['id']] = local_id
+        self.daemon_ids[local_id] = job['id']
+        if local_id in self.cancel_requested:
+            self.cancel_requested.discard(local_id)
+            self.cancel(local_id)
+        self.handle_event(job)
+        self.release_held()
+
+    def submit_failed(self, local_id, message):
+        self.submitting.discard(local_id)
+        self.cancel_requested.discard(local_id)
+        self.request_failed.emit(f"Could not start download: {message}")
+        self.release_held()
+
+    def release_held(self):
+        if not self.submitting:
+            held, self.held = self.held, []
+            for job in held:
+                self.handle_event(job)
+
+    def cancel(self, job_id):
+        if job_id in self.submitting:
+            self.cancel_requested.add(job_id)  # Sent once the daemon knows the job
+            return True
+        self.call(None, 'DELETE', f"jobs/{self.daemon_ids.get(job_id, job_id)}")
+        return True
+
+    def get(self, job_id):
+        self.call(lambda job: self.fetched.emit(self.local_job(job)),
+                  'GET', f"jobs/{self.daemon_ids.get(job_id, job_id)}")
+
+    def list(self):
+        self.call(lambda result: self.listed.emit([self.local_job(job) for job in result['jobs']]),
+                  'GET', 'jobs')
+
+    def handle_event(self, job):
+        if job['id'] not in self.local_ids and self.submitting:
+            self.held.append(job)  # May be one of ours, the daemon hasn't answered yet
+            return
+        job = self.local_job(job)
+        self.job_updated.emit(job)
+        if job['status'] in ('finished', 'failed', 'cancelled'):
+            self.job_finished.emit(job)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.events.stop()
+        self.events.wait(1000)
+
+class JobStore:
+    """Shared SQLite job table that several node processes pull work from.
+
+    Workers lease a job for LEASE_TTL seconds and keep renewing the lease while
+    they work on it; a job whose lease expires (crashed or stalled worker) is
+    handed to the next worker asking for work, up to MAX_ATTEMPTS times.
+    """
+    LEASE_TTL = 60
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, path):
+        self.path = path
+        # NodeRunner uses the connection from its own store thread
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        # WAL needs shared memory, which network filesystems don't provide
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                format TEXT NOT NULL DEFAULT 'best',
+                save_path TEXT,
+                postprocess TEXT NOT NULL DEFAULT 'none',
+                status TEXT NOT NULL DEFAULT 'queued',
+                lease_owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL,
+                started_at REAL,
+                finished_at REAL,
+                output_path TEXT,
+                size INTEGER,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created_at);
+            CREATE TABLE IF NOT EXISTS workers (
+                worker_id TEXT PRIMARY KEY,
+                host TEXT,
+                pid INTEGER,
+                started_at REAL,
+                last_heartbeat REAL,
+                jobs_done INTEGER NOT NULL DEFAULT 0,
+                jobs_failed INTEGER NOT NULL DEFAULT 0,
+                leases_lost INTEGER NOT NULL DEFAULT 0,
+                bytes_done INTEGER NOT NULL DEFAULT 0,
+                seconds_busy REAL NOT NULL DEFAULT 0
+            );
+        """)
+
+    def transaction(self):
+        # Take the write lock up front so two workers can't claim the same row
+        return _ImmediateTransaction(self.conn)
+
+    def add(self, url, format_id='best', save_path=None, postprocess='none'):
+        with self.transaction():
+            cursor = self.conn.execute(
+                "INSERT INTO jobs (url, format, save_path, postprocess, created_at) VALUES (?, ?, ?, ?, ?)",
+                (url, format_id, save_path, postprocess, time.time())
+            )
+            return cursor.lastrowid
+
+    def register_worker(self, worker_id):
+        now = time.time()
+        with self.transaction():
+            self.conn.execute("""
+                INSERT INTO workers (worker_id, host, pid, started_at, last_heartbeat) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(worker_id) DO UPDATE SET pid = excluded.pid, started_at = excluded.started_at,
+                    last_heartbeat = excluded.last_heartbeat
+            """, (worker_id, socket.gethostname(), os.getpid(), now, now))
+
+    def claim(self, worker_id):
+        now = time.time()
+        with self.transaction():
+            # Jobs that used up their attempts on expired leases are given up
+            self.conn.execute("""
+                UPDATE jobs SET status = 'failed', lease_owner = NULL, finished_at = ?,
+                    error = 'Lease expired too many times'
+                WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?
+            """, (now, now, self.MAX_ATTEMPTS))
+            row = self.conn.execute("""
+                SELECT * FROM jobs
+                WHERE status = 'queued' OR (status = 'leased' AND lease_expires < ?)
+                ORDER BY created_at LIMIT 1
+            """, (now,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("""
+                UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?,
+                    attempts = attempts + 1, started_at = ?
+                WHERE id = ?
+            """, (worker_id, now + self.LEASE_TTL, now, row['id']))
+            return dict(row)
+
+    def heartbeat(self, worker_id, job_ids):
+        # Renew our leases; returns the ids whose lease was lost to another worker
+        now = time.time()
+        lost = []
+        with self.transaction():
+            self.conn.execute("UPDATE workers SET last_heartbeat = ? WHERE worker_id = ?", (now, worker_id))
+            for job_id in job_ids:
+                cursor = self.conn.execute(
+                    "UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                    (now + self.LEASE_TTL, job_id, worker_id)
+                )
+                if cursor.rowcount == 0:
+                    lost.append(job_id)
+            if lost:
+                self.conn.execute("UPDATE workers SET leases_lost = leases_lost + ? WHERE worker_id = ?",
+                                  (len(lost), worker_id))
+        return lost
+
+    def complete(self, worker_id, job_id, status, output_path=None, size=None, error=None, seconds=0):
+        with self.transaction():
+            cursor = self.conn.execute("""
+                UPDATE jobs SET status = ?, output_path = ?, size = ?, error = ?, finished_at = ?,
+                    lease_owner = NULL, lease_expires = NULL
+                WHERE id = ? AND lease_owner = ?
+            """, (status, output_path, size, error, time.time(), job_id, worker_id))
+            if cursor.rowcount == 0:
+                return False
+            if status == 'finished':
+                self.conn.execute("""
+                    UPDATE workers SET jobs_done = jobs_done + 1, bytes_done = bytes_done + ?,
+                        seconds_busy = seconds_busy + ?
+                    WHERE worker_id = ?
+                """, (size or 0, seconds, worker_id))
+            else:
+                self.conn.execute("UPDATE workers SET jobs_failed = jobs_failed + 1 WHERE worker_id = ?",
+                                  (worker_id,))
+            return True
+
+    def release(self, worker_id, job_id):
+        # Hand a leased job back untouched, e.g. when a node shuts down
+        with self.transaction():
+            self.conn.execute("""
+                UPDATE jobs SET status = 'queued', lease_owner = NULL, lease_expires = NULL,
+                    attempts = MAX(attempts - 1, 0)
+                WHERE id = ? AND lease_owner = ?
+            """, (job_id, worker_id))
+
+    def stats(self):
+        now = time.time()
+        jobs = {row['status']: row['count'] for row in self.conn.execute(
+            "SELECT status, COUNT(*) AS count FROM jobs GROUP BY status")}
+        workers = []
+        for row in self.conn.execute("SELECT * FROM workers ORDER BY worker_id"):
+            worker = dict(row)
+            worker['active_leases'] = self.conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'leased' AND lease_owner = ? AND lease_expires >= ?",
+                (row['worker_id'], now)
+            ).fetchone()[0]
+            worker['throughput'] = row['bytes_done'] / row['seconds_busy'] if row['seconds_busy'] else 0
+            worker['alive'] = now - (row['last_heartbeat'] or 0) < self.LEASE_TTL
+            workers.append(worker)
+        return {'jobs': jobs, 'workers': workers}
+
+    def close(self):
+        self.conn.close()
+
+class _ImmediateTransaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+class NodeRunner(QObject):
+    """Pulls jobs from a shared JobStore into a local DownloadQueue.
+
+    Store calls can wait up to 30 s on a locked database, so they run one at a
+    time on a store thread and their results come back as signals.
+    """
+    POLL_INTERVAL = 2000
+    _claimed = Signal(list)  # Jobs claimed from the store
+    _lost = Signal(list)  # Store job ids whose lease another worker took over
+
+    def __init__(self, store, download_queue, worker_id=None, download_dir=None, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.queue = download_queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.download_dir = download_dir
+        self.leases = {}  # Local job id -> store job id
+        self.claiming = False
+        self.stopped = False
+        self.store.register_worker(self.worker_id)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='node-store')
+        self.queue.job_finished.connect(self.job_finished)
+        self._claimed.connect(self.claimed)
+        self._lost.connect(self.lost)
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.fill_slots)
+        self.heartbeat_timer = QTimer(self)
+        self.heartbeat_timer.timeout.connect(self.heartbeat)
+
+    def start(self):
+        self.poll_timer.start(self.POLL_INTERVAL)
+        self.heartbeat_timer.start(self.store.LEASE_TTL * 1000 // 3)
+        self.fill_slots()
+
+    def fill_slots(self):
+        free = self.queue.max_concurrent - len(self.leases)
+        if free > 0 and not self.claiming:
+            self.claiming = True
+            self.executor.submit(self.claim, free)
+
+    def claim(self, count):
+        jobs = []
+        try:
+            while len(jobs) < count and not self.stopped:
+                job = self.store.claim(self.worker_id)
+                if job is None:
+                    break
+                jobs.append(job)
+        except sqlite3.Error as e:
+            print(f"[{self.worker_id}] Could not claim a job: {e}", file=sys.stderr)
+        if self.stopped:
+            # Stopped while claiming, nothing will pick these up here
+            for job in jobs:
+                self.release(job['id'])
+            return
+        self._claimed.emit(jobs)
+
+    def claimed(self, jobs):
+        self.claiming = False
+        for job in jobs:
+            local_id = self.queue.submit(job['url'], job['format'], job['save_path'] or self.download_dir,
+                                         postprocess=job['postprocess'])
+            self.leases[local_id] = job['id']
+
+    def heartbeat(self):
+        self.executor.submit(self.renew, list(self.leases.values()))
+
+    def renew(self, job_ids):
+        try:
+            self._lost.emit(list(self.store.heartbeat(self.worker_id, job_ids)))
+        except sqlite3.Error as e:
+            print(f"[{self.worker_id}] Heartbeat failed: {e}", file=sys.stderr)
+
+    def lost(self, job_ids):
+        # Another worker owns these now, stop duplicating its work
+        for local_id, job_id in list(self.leases.items()):
+            if job_id in job_ids:
+                del self.leases[local_id]
+                self.queue.cancel(local_id)
+
+    def job_finished(self, job):
+        job_id = self.leases.pop(job['id'], None)
+        if job_id is None:
+            return
+        self.executor.submit(self.record, job_id, job)
+        self.fill_slots()
+
+    def record(self, job_id, job):
+        size = None
+        if job['output_path'] and os.path.exists(job['output_path']):
+            size = os.path.getsize(job['output_path'])
+        seconds = (job['finished_at'] or 0) - (job['started_at'] or 0)
+        try:
+            if job['status'] == 'cancelled':
+                self.store.release(self.worker_id, job_id)
+            else:
+                self.store.complete(self.worker_id, job_id, job['status'], job['output_path'],
+                                    size, job['error'], seconds)
+        except sqlite3.Error as e:
+            print(f"[{self.worker_id}] Could not record job {job_id}: {e}", file=sys.stderr)
+
+    def stop(self):
+        self.stopped = True
+        self.poll_timer.stop()
+        self.heartbeat_timer.stop()
+        for job_id in self.leases.values():
+            self.executor.submit(self.release, job_id)
+        self.leases.clear()
+        self.executor.shutdown(wait=True)
+
+    def release(self, job_id):
+        try:
+            self.store.release(self.worker_id, job_id)
+        except sqlite3.Error:
+            pass
+
+# Columns added to the seen table after the first release
+SEEN_MIGRATIONS = (
+    ('url', 'TEXT'),
+    ('downloaded', 'INTEGER NOT NULL DEFAULT 1'),
+    ('attempts', 'INTEGER NOT NULL DEFAULT 0'),
+)
+
+class SubscriptionDatabase:
+    """SQLite list of channels and playlists to mirror, with the entry ids already listed.
+
+    Listed entries stay undownloaded until their download finishes, so failed
+    ones are queued again by later syncs.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(DATA_DIR, "subscriptions.db")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS subscriptions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT NOT NULL UNIQUE,
+                    title TEXT,
+                    format TEXT NOT NULL DEFAULT 'best',
+                    postprocess TEXT NOT NULL DEFAULT 'none',
+                    save_path TEXT,
+                    interval REAL NOT NULL DEFAULT 86400,
+                    newest_first INTEGER NOT NULL DEFAULT 1,
+                    backfill INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL,
+                    last_synced REAL,
+                    last_error TEXT,
+                    seeded INTEGER NOT NULL DEFAULT 0,
+                    queued INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS seen (
+                    subscription_id INTEGER NOT NULL,
+                    entry_id TEXT NOT NULL,
+                    seen_at REAL,
+                    PRIMARY KEY (subscription_id, entry_id)
+                ) WITHOUT ROWID;
+            """)
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(seen)")}
+            for column, column_type in SEEN_MIGRATIONS:
+                if column not in columns:
+                    self.conn.execute(f"ALTER TABLE seen ADD COLUMN {column} {column_type}")
+
+    def add(self, url, format_id='best', postprocess='none', save_path=None, interval=86400,
+            newest_first=True, backfill=False):
+        # Subscribing again to the same URL updates its settings and keeps its seen entries
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO subscriptions (url, format, postprocess, save_path, interval, newest_first, "
+                "backfill, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET format = excluded.format, postprocess = excluded.postprocess, "
+                "save_path = excluded.save_path, interval = excluded.interval, "
+                "newest_first = excluded.newest_first, backfill = excluded.backfill",
+                (url, format_id, postprocess, save_path, interval, int(newest_first), int(backfill), time.time())
+            )
+            return self.conn.execute("SELECT id FROM subscriptions WHERE url = ?", (url,)).fetchone()[0]
+
+    def remove(self, key):
+        # key is a subscription id or URL
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT id FROM subscriptions WHERE id = ? OR url = ?",
+                                    (key, str(key))).fetchone()
+            if row is None:
+                return False
+            self.conn.execute("DELETE FROM seen WHERE subscription_id = ?", (row['id'],))
+            self.conn.execute("DELETE FROM subscriptions WHERE id = ?", (row['id'],))
+            return True
+
+    def get(self, subscription_id):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM subscriptions WHERE id = ?", (subscription_id,)).fetchone()
+            return dict(row) if row else None
+
+    def list(self):
+        with self.lock:
+            return [dict(row) for row in self.conn.execute("SELECT * FROM subscriptions ORDER BY id")]
+
+    def seen_ids(self, subscription_id):
+        with self.lock:
+            return {row[0] for row in self.conn.execute(
+                "SELECT entry_id FROM seen WHERE subscription_id = ?", (subscription_id,))}
+
+    def due(self, now):
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(
+                "SELECT * FROM subscriptions WHERE last_synced IS NULL OR last_synced + interval <= ?", (now,))]
+
+    def next_due(self, exclude=()):
+        # Subscriptions in exclude are syncing and not due until they finish
+        exclude = list(exclude)
+        placeholders = ', '.join('?' * len(exclude))
+        with self.lock:
+            return self.conn.execute(
+                f"SELECT MIN(COALESCE(last_synced + interval, 0)) FROM subscriptions "
+                f"WHERE id NOT IN ({placeholders})", exclude).fetchone()[0]
+
+    def undownloaded(self, subscription_id, max_attempts):
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(
+                "SELECT entry_id AS id, url FROM seen WHERE subscription_id = ? AND NOT downloaded "
+                "AND attempts < ? AND url IS NOT NULL ORDER BY seen_at", (subscription_id, max_attempts))]
+
+    def record_download(self, subscription_id, entry_id, succeeded):
+        with self.lock, self.conn:
+            if succeeded:
+                self.conn.execute("UPDATE seen SET downloaded = 1 WHERE subscription_id = ? AND entry_id = ?",
+                                  (subscription_id, entry_id))
+            else:
+                self.conn.execute("UPDATE seen SET attempts = attempts + 1 WHERE subscription_id = ? AND entry_id = ?",
+                                  (subscription_id, entry_id))
+
+    def record_sync(self, subscription_id, entries=(), queued=0, title=None, error=None, downloaded=True):
+        # entries are listed entries; ones queued for download are recorded as not yet downloaded
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO seen (subscription_id, entry_id, seen_at, url, downloaded) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(subscription_id, entry['id'], now, entry['url'], int(downloaded)) for entry in entries]
+            )
+            self.conn.execute(
+                "UPDATE subscriptions SET last_synced = ?, last_error = ?, queued = queued + ?, "
+                "title = COALESCE(?, title), seeded = seeded OR ? WHERE id = ?",
+                (now, error, queued, title, int(error is None), subscription_id)
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def list_new_entries(url, seen, newest_first=True, limit=None):
+    """Flat-list a channel or playlist and return its title and the entries not in seen.
+
+    Listings are paged lazily, so a newest-first listing that stops at the
+    first seen entry only fetches the pages holding new videos.
+    """
+    ydl_opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'extract_flat': 'in_playlist',
+        'lazy_playlist': True,
+    }
+    entries = []
+    with youtube_dl(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False, process=False)
+        if info.get('_type') in ('url', 'url_transparent'):
+            # e.g. a channel root that redirects to its videos tab
+            info = ydl.extract_info(info['url'], download=False, process=False)
+        for entry in info.get('entries') or []:
+            if not entry:
+                continue
+            entry_url = entry.get('url') or entry.get('webpage_url')
+            entry_id = str(entry.get('id') or entry_url)
+            if entry_id in seen:
+                if newest_first:
+                    break
+                continue
+            entries.append({'id': entry_id, 'url': entry_url, 'title': entry.get('title')})
+            if limit and len(entries) >= limit:
+                break
+    return info.get('title'), entries
+
+class SubscriptionWorker(QThread):
+    finished = Signal(int, str, list)  # Subscription id, title, new entries
+    error = Signal(int, str)
+
+    def __init__(self, subscription, seen, limit=None):
+        super().__init__()
+        self.subscription = subscription
+        self.seen = seen
+        self.limit = limit
+
+    def run(self):
+        try:
+            title, entries = list_new_entries(self.subscription['url'], self.seen,
+                                              bool(self.subscription['newest_first']), self.limit)
+            self.finished.emit(self.subscription['id'], title or '', entries)
+        except Exception as e:
+            self.error.emit(self.subscription['id'], str(e))
+
+class SubscriptionManager(QObject):
+    """Syncs subscriptions when they are due and queues their new entries.
+
+    A single-shot timer is armed for the next due subscription instead of
+    polling. The first sync of a subscription without backfill only records
+    the newest SEED_ENTRIES entries as seen, so later syncs have a place to stop.
+    Entries whose download failed are queued again by the next MAX_ATTEMPTS - 1 syncs.
+    """
+    SEED_ENTRIES = 50
+    MAX_ATTEMPTS = 3
+    synced = Signal(dict)
+    _sync_requested = Signal(int)
+
+    def __init__(self, database, download_queue, download_dir=None, window=None, parent=None):
+        super().__init__(parent)
+        self.database = database
+        self.queue = download_queue
+        self.download_dir = download_dir
+        self.window = window  # New entries are downloaded in this TimeWindow
+        self.workers = {}
+        self.retired = []
+        self.jobs = {}  # Download job id -> (subscription id, entry id)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.schedule)
+        self._sync_requested.connect(self.sync)
+        self.queue.job_finished.connect(self.job_finished)
+
+    def start(self):
+        self.schedule()
+
+    def request_sync(self, subscription_id):
+        # Safe to call from any thread
+        self._sync_requested.emit(subscription_id)
+
+    def schedule(self):
+        now = time.time()
+        for subscription in self.database.due(now):
+            self.sync(subscription['id'])
+        next_due = self.database.next_due(self.workers)
+        if next_due is not None:
+            wait = min(max(next_due - now, 1), 86400)
+            self.timer.start(int(wait * 1000))
+
+    def sync(self, subscription_id):
+        subscription = self.database.get(subscription_id)
+        if subscription is None or subscription_id in self.workers:
+            return
+        seeding = not subscription['seeded'] and not subscription['backfill'] and subscription['newest_first']
+        worker = SubscriptionWorker(subscription, self.database.seen_ids(subscription_id),
+                                    self.SEED_ENTRIES if seeding else None)
+        worker.finished.connect(self.sync_finished)
+        worker.error.connect(self.sync_failed)
+        self.workers[subscription_id] = worker
+        worker.start()
+
+    def sync_finished(self, subscription_id, title, entries):
+        self.release(subscription_id)
+        subscription = self.database.get(subscription_id)
+        if subscription is None:
+            return  # Removed while syncing
+        seeding = not subscription['seeded'] and not subscription['backfill']
+        queued = 0
+        if not seeding:
+            save_path = subscription['save_path'] or self.download_dir
+            # Earlier failures first; listings run newest first, downloads go oldest first
+            in_flight = set(self.jobs.values())
+            retries = [entry for entry in self.database.undownloaded(subscription_id, self.MAX_ATTEMPTS)
+                       if (subscription_id, entry['id']) not in in_flight]
+            ordered = list(reversed(entries)) if subscription['newest_first'] else entries
+            for entry in retries + ordered:
+                job_id = self.queue.submit(entry['url'], subscription['format'], save_path,
+                                           postprocess=subscription['postprocess'], priority='low',
+                                           window=self.window)
+                self.jobs[job_id] = (subscription_id, entry['id'])
+                queued += 1
+        self.database.record_sync(subscription_id, entries, queued, title or None, downloaded=seeding)
+        self.synced.emit({'id': subscription_id, 'title': title, 'new': len(entries), 'queued': queued})
+        self.schedule()
+
+    def job_finished(self, job):
+        # Cancelled downloads stay undownloaded without using up an attempt
+        key = self.jobs.pop(job['id'], None)
+        if key is None or job['status'] == 'cancelled':
+            return
+        if self.database.get(key[0]) is not None:
+            self.database.record_download(*key, job['status'] == 'finished')
+
+    def sync_failed(self, subscription_id, message):
+        self.release(subscription_id)
+        if self.database.get(subscription_id) is not None:
+            self.database.record_sync(subscription_id, error=message)
+        self.synced.emit({'id': subscription_id, 'error': message})
+        self.schedule()
+
+    def release(self, subscription_id):
+        worker = self.workers.pop(subscription_id, None)
+        if worker is not None:
+            self.retired.append(worker)
+        self.retired = [w for w in self.retired if not w.isFinished()]
+
+    def stop(self):
+        self.timer.stop()
+        for worker in list(self.workers.values()) + self.retired:
+            worker.wait(5000)
+
+# Fields written per crawled video unless --fields says otherwise
+CRAWL_FIELDS = ['id', 'title', 'channel', 'duration', 'upload_date', 'view_count', 'webpage_url', 'formats']
+CRAWL_FORMAT_FIELDS = ('format_id', 'ext', 'width', 'height', 'fps', 'vcodec', 'acodec', 'tbr',
+                       'filesize', 'filesize_approx', 'protocol')
+CRAWL_OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+def open_crawl_output(path, mode):
+    opener = CRAWL_OPENERS.get(os.path.splitext(path)[1].lower(), open)
+    return opener(path, mode)
+
+def crawl_record(info, fields, source):
+    record = {'source': source}
+    for field in fields:
+        value = info.get(field)
+        if field == 'channel':
+            value = value or info.get('uploader')
+        elif field == 'formats' and value:
+            value = [{key: f.get(key) for key in CRAWL_FORMAT_FIELDS if f.get(key) is not None} for f in value]
+        record[field] = value
+    return record
+
+def crawl_sources(sources):
+    """Yield ('url', url) for single videos and ('info', info) for ones already extracted.
+
+    Channels and playlists are flat-listed lazily, one page at a time, so the
+    listing never has to be held in memory. A source that is a file is read
+    as one URL per line.
+    """
+    ydl_opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'extract_flat': 'in_playlist',
+        'lazy_playlist': True,
+    }
+    extractors = list(yt_dlp.extractor.gen_extractor_classes())
+    with youtube_dl(ydl_opts) as ydl:
+        def expand(url, ie_key=None):
+            # Single videos are left to the crawl workers; anything else is listed here
+            if ie_key:
+                ie = ydl.get_info_extractor(ie_key)
+            else:
+                ie = next((ie for ie in extractors if ie.suitable(url)), None)
+            if ie is not None and ie.is_single_video(url):
+                yield 'url', url
+                return
+            info = ydl.extract_info(url, download=False, process=False, ie_key=ie_key)
+            if info.get('_type') in ('url', 'url_transparent'):
+                yield from expand(info['url'], info.get('ie_key'))
+            elif info.get('_type') in ('playlist', 'multi_video'):
+                for entry in info.get('entries') or []:
+                    entry_url = entry and (entry.get('url') or entry.get('webpage_url'))
+                    if entry_url:
+                        # Channel roots list their tabs, which are listings themselves
+                        yield from expand(entry_url, entry.get('ie_key'))
+            else:
+                yield 'info', ydl.sanitize_info(info)
+
+        def urls():
+            for source in sources:
+                if os.path.isfile(source):
+                    with open(source, encoding='utf-8') as f:
+                        for line in f:
+                            line = line.strip()
+                            if line and not line.startswith('#'):
+                                yield line
+                else:
+                    yield source
+
+        for url in urls():
+            try:
+                yield from expand(url)
+            except yt_dlp.utils.DownloadError as e:
+                yield 'error', (url, str(e))
+
+def record_source(line):
+    try:
+        return json.loads(line).get('source')
+    except (ValueError, AttributeError):
+        return None
+
+def read_crawl_sources(path):
+    """Count the sources of the complete records in an existing crawl output, dropping a partly written tail."""
+    sources = Counter()
+    if not os.path.exists(path):
+        return sources
+    opener = CRAWL_OPENERS.get(os.path.splitext(path)[1].lower())
+    if opener is None:
+        end = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                sources[record_source(line)] += 1
+                end += len(line)
+        if end != os.path.getsize(path):
+            with open(path, 'r+b') as f:
+                f.truncate(end)
+        return sources
+    # A compressed stream cut off mid-block can't be appended to, so keep its readable lines
+    damaged = False
+    tmp_path = path + '.tmp'
+    with opener(path, 'rb') as f, opener(tmp_path, 'wb') as out:
+        try:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    damaged = True
+                    break
+                out.write(line)
+                sources[record_source(line)] += 1
+        except (EOFError, OSError):
+            damaged = True
+    if damaged:
+        os.replace(tmp_path, path)
+    else:
+        os.remove(tmp_path)
+    return sources
+
+def crawl(sources, output, fields=None, workers=4, resume=False, progress=None):
+    """Extract metadata for every video in sources and append one JSON line per video to output.
+
+    Records are written in source order and at most a few per worker are in
+    flight, so memory stays flat however many videos there are. With resume,
+    entries whose URL already has a record are skipped, so listings that
+    changed since the last run are still resumed correctly; failed videos are
+    written as records with an "error" field, so every source entry accounts
+    for exactly one line.
+    """
+    fields = fields or CRAWL_FIELDS
+    done = read_crawl_sources(output) if resume else Counter()
+    skip = sum(done.values())
+    written = errors = 0
+    started = time.monotonic()
+    in_flight = deque()
+    executor = ThreadPoolExecutor(max_workers=workers)
+    store = cookie_store()
+    # Building a YoutubeDL loads every extractor, so each crawl thread keeps its own
+    local = threading.local()
+    ydls = []
+
+    def extract(kind, item):
+        if kind == 'error':
+            url, error = item
+            return {'source': url, 'error': error}
+        if kind == 'info':
+            return crawl_record(item, fields, item.get('webpage_url') or item.get('original_url'))
+        ydl = getattr(local, 'ydl', None)
+        if ydl is None:
+            ydl = local.ydl = yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True, 'skip_download': True})
+            if store:
+                store.attach(ydl)
+            ydls.append(ydl)
+        try:
+            return crawl_record(ydl.sanitize_info(ydl.extract_info(item, download=False)), fields, item)
+        except Exception as e:
+            return {'source': item, 'error': str(e)}
+        finally:
+            if store:
+                store.save()
+    f = open_crawl_output(output, 'ab' if resume else 'wb')
+    compressed = os.path.splitext(output)[1].lower() in CRAWL_OPENERS
+
+    def write(record):
+        nonlocal written, errors
+        f.write(json.dumps(record, default=str, ensure_ascii=False).encode('utf-8') + b'\n')
+        written += 1
+        errors += 'error' in record
+        # A sync flush costs compression, so compressed output is flushed in batches
+        if not compressed or written % 100 == 0:
+            f.flush()
+        if progress:
+            progress(skip + written, errors, written / max(time.monotonic() - started, 1e-6))
+
+    def source(kind, item):
+        # The "source" its record is written with
+        if kind == 'error':
+            return item[0]
+        if kind == 'info':
+            return item.get('webpage_url') or item.get('original_url')
+        return item
+
+    try:
+        for kind, item in crawl_sources(sources):
+            key = source(kind, item)
+            if done[key] > 0:
+                done[key] -= 1
+                continue
+            if len(in_flight) >= workers * 4:
+                write(in_flight.popleft().result())
+            in_flight.append(executor.submit(extract, kind, item))
+        while in_flight:
+            write(in_flight.popleft().result())
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        for ydl in ydls:
+            ydl.close()
+        f.close()
+    return skip + written, errors
+
+class NotificationWidget(QWidget):
+    closed = Signal()
+    open_folder = Signal(str)
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setParent(None)
+        self.setWindowFlags(Qt.Window | Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
+        self.setFixedSize(400, 200)
+        
+        self.setStyleSheet("""
+            QWidget {
+                background-color: #2b2b2b;
+                border: 2px solid #4CAF50;
+                border-radius: 10px;
+            }
+            QLabel {
+                color: white;
+                padding: 5px;
+            }
+            QPushButton {
+                background-color: #4CAF50;
+                color: white;
+                border: none;
+                padding: 8px 15px;
+                border-radius: 5px;
+                font-weight: bold;
+                min-width: 100px;
+            }
+            QPushButton:hover {
+                background-color: #45a049;
+            }
+        """)
+        
+        # Main layout
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(15)
+        
+        # Header with icon
+        header_layout = QHBoxLayout()
+        
+        # Success icon
+        icon_label = QLabel()
+        success_icon = create_svg_icon(SUCCESS_ICON, QSize(32, 32))
+        icon_label.setPixmap(success_icon)
+        header_layout.addWidget(icon_label)
+        
+        # Title
+        self.title_label = QLabel("Download Complete!")
+        self.title_label.setStyleSheet("font-size: 18px; font-weight: bold; color: #4CAF50;")
+        header_layout.addWidget(self.title_label)
+        header_layout.addStretch()
+        
+        # Close button
+        close_button = QPushButton("×")
+        close_button.setStyleSheet("""
+            QPushButton {
+                background: transparent;
+                color: #aaa;
+                font-size: 20px;
+                font-weight: bold;
+                padding: 5px;
+                min-width: 30px;
+            }
+            QPushButton:hover {
+                background: transparent;
+                color: white;
+            }
+        """)
+        close_button.clicked.connect(self.close)
+        header_layout.addWidget(close_button)
+        
+        layout.addLayout(header_layout)
+        
+        # Message
+        self.message_label = QLabel()
+        self.message_label.setWordWrap(True)
+        self.message_label.setStyleSheet("font-size: 14px;")
+        layout.addWidget(self.message_label)
+        
+        # Spacer
+        layout.addStretch()
+        
+        # Buttons
+        button_layout = QHBoxLayout()
+        button_layout.setSpacing(10)
+        
+        self.open_folder_btn = QPushButton("Open Folder")
+        self.open_folder_btn.setIcon(QIcon(create_svg_icon(LOCATION_ICON, QSize(16, 16))))
+        self.open_folder_btn.clicked.connect(self.request_open_folder)
+        self.folder_path = None
+        button_layout.addWidget(self.open_folder_btn)
+        
+        ok_button = QPushButton("OK")
+        ok_button.clicked.connect(self.close)
+        button_layout.addWidget(ok_button)
+        
+        layout.addLayout(button_layout)
+        
+        # Auto-close timer
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.close)
+        self.timer.setSingleShot(True)
+
+    def show_notification(self, message, folder_path):
+        self.message_label.setText(message)
+        self.folder_path = folder_path
+        
+        # Position in bottom right
+        if not self.isVisible():
+            screen = QApplication.primaryScreen().geometry()
+            self.move(
+                screen.width() - self.width() - 20,
+                screen.height() - self.height() - 40
+            )
+            self.show()
+        
+        self.timer.start(10000)  # Auto-close after 10 seconds
+
+    def request_open_folder(self):
+        self.open_folder.emit(self.folder_path)
+
+    def closeEvent(self, event):
+        self.hide()
+        self.closed.emit()
+        event.accept()
+
+class NotificationManager(QObject):
+    """Reports finished downloads through one reusable toast and the system tray.
+
+    The first completion is shown right away; ones arriving within BATCH_WINDOW
+    ms after it are merged into the next update, and while a notification is
+    still on screen its count keeps adding up.
+    """
+    BATCH_WINDOW = 1500
+    DISPLAY_TIME = 10000
+    open_folder = Signal(str)
+
+    def __init__(self, window, parent=None):
+        super().__init__(parent)
+        self.window = window
+        self.toast = None
+        self.pending = []
+        self.shown = []  # Completions in the notification currently on screen
+        self.tray_until = 0
+
+        self.batch_timer = QTimer(self)
+        self.batch_timer.setSingleShot(True)
+        self.batch_timer.setInterval(self.BATCH_WINDOW)
+        self.batch_timer.timeout.connect(self.flush)
+
+        self.tray = None
+        self.tray_folder = None
+        if QSystemTrayIcon.isSystemTrayAvailable():
+            self.tray = QSystemTrayIcon(QIcon(create_svg_icon(YOUTUBE_ICON, QSize(32, 32))), self)
+            self.tray.setToolTip("TubeMaster Pro")
+            self.tray.activated.connect(self.restore_window)
+            self.tray.messageClicked.connect(self.tray_message_clicked)
+            self.tray.show()
+
+    def notify(self, file_path, folder_path):
+        self.pending.append((file_path, folder_path))
+        if not self.batch_timer.isActive():
+            self.flush()
+
+    def showing(self):
+        toast_visible = self.toast is not None and self.toast.isVisible()
+        return toast_visible or time.monotonic() < self.tray_until
+
+    def flush(self):
+        if not self.pending:
+            return
+        if not self.showing():
+            self.shown.clear()
+        self.shown.extend(self.pending)
+        self.pending = []
+        # Completions until the timer fires are batched into the next update
+        self.batch_timer.start()
+        folders = {folder for _, folder in self.shown}
+        folder_path = self.shown[-1][1]
+        count = len(self.shown)
+
+        if count == 1:
+            title = "Download Complete!"
+            message = f"Video has been downloaded successfully!\nLocation: {folder_path}"
+        else:
+            title = f"{count} Downloads Complete!"
+            if len(folders) == 1:
+                message = f"{count} downloads finished.\nLocation: {folder_path}"
+            else:
+                message = f"{count} downloads finished in {len(folders)} folders."
+
+        # Prefer the tray while the main window is out of sight
+        if self.tray is not None and (self.window.isMinimized() or not self.window.isVisible()):
+            self.tray_folder = folder_path
+            self.tray_until = time.monotonic() + self.DISPLAY_TIME / 1000
+            self.tray.showMessage(title, message, QSystemTrayIcon.Information, self.DISPLAY_TIME)
+            return
+
+        if self.toast is None:
+            self.toast = NotificationWidget()
+            self.toast.open_folder.connect(self.open_folder)
+            self.toast.closed.connect(self.shown.clear)
+        self.toast.title_label.setText(title)
+        self.toast.show_notification(message, folder_path)
+
+    def tray_message_clicked(self):
+        if self.tray_folder:
+            self.open_folder.emit(self.tray_folder)
+
+    def restore_window(self, reason):
+        if reason == QSystemTrayIcon.Trigger:
+            self.window.showNormal()
+            self.window.activateWindow()
+
+    def close(self):
+        if self.toast is not None:
+            self.toast.close()
+        if self.tray is not None:
+            self.tray.hide()
+
+class HistoryModel(QAbstractTableModel):
+    """Table model over the history database that loads rows one page at a time."""
+    COLUMNS = ("Title", "Channel", "Format", "Size", "Finished", "Speed")
+    PAGE_SIZE = 200
+
+    def __init__(self, history, parent=None):
+        super().__init__(parent)
+        self.history = history
+        self.query = ''
+        self.rows = []
+        self.exhausted = False
+
+    def set_query(self, query):
+        self.beginResetModel()
+        self.query = query
+        self.rows = []
+        self.exhausted = False
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        before_id = self.rows[-1]['id'] if self.rows else None
+        page = self.history.page(self.query, before_id=before_id, limit=self.PAGE_SIZE)
+        if len(page) < self.PAGE_SIZE:
+            self.exhausted = True
+        if page:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+            self.rows.extend(page)
+            self.endInsertRows()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        if role == Qt.ToolTipRole:
+            return row['path']
+        if role != Qt.DisplayRole:
+            return None
+        column = index.column()
+        if column == 0:
+            return row['title']
+        if column == 1:
+            return row['channel'] or ''
+        if column == 2:
+            return row['format_note'] or row['format_id'] or ''
+        if column == 3:
+            return format_size(row['size']) if row['size'] else ''
+        if column == 4:
+            if not row['finished_at']:
+                return ''
+            return datetime.fromtimestamp(row['finished_at']).strftime("%Y-%m-%d %H:%M")
+        if column == 5:
+            return format_size(row['throughput']) + '/s' if row['throughput'] else ''
+        return None
+
+class HistoryDialog(QDialog):
+    def __init__(self, history, parent=None):
+        super().__init__(parent)
+        self.history = history
+        self.setWindowTitle("Download History")
+        self.resize(900, 600)
+        self.setStyleSheet("""
+            QDialog {
+                background-color: #2b2b2b;
+            }
+            QLabel {
+                color: #aaaaaa;
+            }
+            QLineEdit {
+                padding: 10px;
+                border: 2px solid #555555;
+                border-radius: 8px;
+                font-size: 14px;
+                color: #ffffff;
+                background-color: #3b3b3b;
+            }
+            QLineEdit:focus {
+                border-color: #FF0000;
+            }
+            QTableView {
+                background-color: #3b3b3b;
+                alternate-background-color: #333333;
+                color: white;
+                gridline-color: #555555;
+                border: 1px solid #555555;
+                border-radius: 5px;
+            }
+            QHeaderView::section {
+                background-color: #2b2b2b;
+                color: #aaaaaa;
+                padding: 5px;
+                border: none;
+            }
+        """)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(10)
+
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search titles and channels...")
+        layout.addWidget(self.search_input)
+
+        self.model = HistoryModel(history, self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setAlternatingRowColors(True)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.doubleClicked.connect(self.open_item_folder)
+        layout.addWidget(self.table)
+
+        self.count_label = QLabel()
+        layout.addWidget(self.count_label)
+
+        # Debounce searches while typing
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_input.textChanged.connect(self.search_timer.start)
+
+        self.run_search()
+
+    def run_search(self):
+        query = self.search_input.text()
+        self.model.set_query(query)
+        count = self.history.count(query)
+        self.count_label.setText(f"{count} download{'s' if count != 1 else ''}")
+
+    def open_item_folder(self, index):
+        path = self.model.rows[index.row()]['path']
+        if path:
+            QDesktopServices.openUrl(QUrl.fromLocalFile(os.path.dirname(path)))
+
+class ThumbnailLoader(QObject):
+    """Fetches and decodes thumbnails on background threads, newest request first.
+
+    Only MAX_PENDING requests are kept; older ones are dropped, so rows that
+    were scrolled past before their turn are never fetched.
+    """
+    MAX_PENDING = 64
+    loaded = Signal(str, QImage)
+
+    def __init__(self, workers=4, size=QSize(160, 90), parent=None):
+        super().__init__(parent)
+        self.size = size
+        self.condition = threading.Condition()
+        self.pending = deque()
+        self.requested = set()
+        self.failed = set()
+        self.stopping = False
+        self.threads = [threading.Thread(target=self.run, name=f'thumbnails-{i}', daemon=True)
+                        for i in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def request(self, url):
+        with self.condition:
+            if url in self.requested or url in self.failed:
+                return
+            self.requested.add(url)
+            self.pending.append(url)
+            if len(self.pending) > self.MAX_PENDING:
+                self.requested.discard(self.pending.popleft())
+            self.condition.notify()
+
+    def run(self):
+        session = requests.Session()
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopping:
+                    self.condition.wait()
+                if self.stopping:
+                    return
+                url = self.pending.pop()
+            # QImage, unlike QPixmap, may be used off the GUI thread
+            image = QImage()
+            try:
+                image.loadFromData(single_flight.do(('thumbnail', url), session.get, url, timeout=(5, 15)).content)
+            except requests.RequestException:
+                pass
+            if not image.isNull():
+                image = image.scaled(self.size, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+            with self.condition:
+                self.requested.discard(url)
+                if image.isNull():
+                    self.failed.add(url)
+            if not image.isNull():
+                self.loaded.emit(url, image)
+
+    def stop(self):
+        with self.condition:
+            self.stopping = True
+            self.pending.clear()
+            self.condition.notify_all()
+
+class ItemListModel(QAbstractListModel):
+    """List model for large sets of jobs or videos, given as dicts with an "id".
+
+    Items are upserted in batches every BATCH_INTERVAL ms, so thousands of
+    updates a second cost one insert per batch and one dataChanged per row.
+    Filtering and sorting happen in the model: visible rows are kept as a
+    sorted key list, so inserts, moves and row lookups are a bisect away.
+    Thumbnails are requested only when a row is painted.
+    """
+    ItemRole = Qt.UserRole + 1
+    SubtitleRole = Qt.UserRole + 2
+    ProgressRole = Qt.UserRole + 3
+    BATCH_INTERVAL = 50
+    SORT_KEYS = {
+        'added': lambda item: 0,
+        'title': lambda item: (item.get('title') or item.get('url') or '').lower(),
+        'status': lambda item: item.get('status') or '',
+        'progress': lambda item: -(item.get('progress') or 0),
+    }
+
+    def __init__(self, thumbnails=None, parent=None):
+        super().__init__(parent)
+        self.thumbnails = thumbnails
+        self.items = {}
+        self.order = {}  # Id -> insertion number, the tie-breaker of every sort
+        self.keys = []  # Sorted (key, order) of visible rows
+        self.ids = []  # Ids in the same order as keys
+        self.item_keys = {}  # Visible id -> its key in keys
+        self.by_thumbnail = {}
+        self.incoming = {}
+        self.filter_text = ''
+        self.filter_statuses = None
+        self.sort_key = 'added'
+        self.descending = False
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(self.BATCH_INTERVAL)
+        self.flush_timer.timeout.connect(self.flush)
+        if thumbnails is not None:
+            thumbnails.loaded.connect(self.thumbnail_loaded)
+
+    def upsert(self, item):
+        self.incoming[item['id']] = item
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def clear(self):
+        self.beginResetModel()
+        self.items.clear()
+        self.order.clear()
+        self.keys, self.ids = [], []
+        self.item_keys.clear()
+        self.by_thumbnail.clear()
+        self.incoming.clear()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.ids)
+
+    def _row(self, position):
+        return len(self.ids) - 1 - position if self.descending else position
+
+    def _key(self, item_id):
+        return (self.SORT_KEYS[self.sort_key](self.items[item_id]), self.order[item_id])
+
+    def accepts(self, item):
+        if self.filter_statuses is not None and item.get('status') not in self.filter_statuses:
+            return False
+        if self.filter_text:
+            text = f"{item.get('title') or ''} {item.get('channel') or ''} {item.get('url') or ''}".lower()
+            return self.filter_text in text
+        return True
+
+    def set_filter(self, text='', statuses=None):
+        self.filter_text = text.strip().lower()
+        self.filter_statuses = set(statuses) if statuses else None
+        self.rebuild()
+
+    def set_sort(self, key, descending=False):
+        self.sort_key = key
+        self.descending = descending
+        self.rebuild()
+
+    def rebuild(self):
+        self.flush()
+        self.beginResetModel()
+        visible = sorted((self._key(item_id), item_id) for item_id, item in self.items.items()
+                         if self.accepts(item))
+        self.keys = [key for key, _ in visible]
+        self.ids = [item_id for _, item_id in visible]
+        self.item_keys = dict(zip(self.ids, self.keys))
+        self.endResetModel()
+
+    def flush(self):
+        incoming, self.incoming = self.incoming, {}
+        appended = []
+        for item_id, item in incoming.items():
+            previous = self.items.get(item_id)
+            if previous is None:
+                self.order[item_id] = len(self.order)
+            elif previous.get('thumbnail') != item.get('thumbnail'):
+                self.by_thumbnail.get(previous.get('thumbnail'), set()).discard(item_id)
+            self.items[item_id] = item
+            if item.get('thumbnail'):
+                self.by_thumbnail.setdefault(item['thumbnail'], set()).add(item_id)
+            old_key = self.item_keys.get(item_id)
+            visible = self.accepts(item)
+            new_key = self._key(item_id) if visible else None
+            if old_key is not None and old_key == new_key:
+                index = self.index(self._row(bisect.bisect_left(self.keys, old_key)))
+                self.dataChanged.emit(index, index)
+                continue
+            if old_key is not None:
+                self._remove(old_key)
+            if new_key is None:
+                continue
+            if not self.keys or new_key > self.keys[-1]:
+                appended.append((new_key, item_id))  # The common case, inserted as one batch below
+            else:
+                self._insert(new_key, item_id)
+        if appended:
+            self._append(appended)
+
+    def _remove(self, key):
+        position = bisect.bisect_left(self.keys, key)
+        row = self._row(position)
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.keys[position]
+        item_id = self.ids.pop(position)
+        del self.item_keys[item_id]
+        self.endRemoveRows()
+
+    def _insert(self, key, item_id):
+        position = bisect.bisect_left(self.keys, key)
+        row = len(self.ids) - position if self.descending else position
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.keys.insert(position, key)
+        self.ids.insert(position, item_id)
+        self.item_keys[item_id] = key
+        self.endInsertRows()
+
+    def _append(self, entries):
+        entries.sort()
+        count = len(entries)
+        if self.descending:
+            self.beginInsertRows(QModelIndex(), 0, count - 1)
+        else:
+            self.beginInsertRows(QModelIndex(), len(self.ids), len(self.ids) + count - 1)
+        for key, item_id in entries:
+            self.keys.append(key)
+            self.ids.append(item_id)
+            self.item_keys[item_id] = key
+        self.endInsertRows()
+
+    def item(self, row):
+        position = len(self.ids) - 1 - row if self.descending else row
+        return self.items[self.ids[position]]
+
+    def subtitle(self, item):
+        if 'status' in item:
+            text = item['status'].title()
+            if item.get('error'):
+                return f"{text} · {item['error']}"
+            return f"{text} · {item['status_text']}" if item.get('status_text') else text
+        parts = [item.get('channel')]
+        if item.get('duration'):
+            parts.append(f"{int(item['duration']) // 60}:{int(item['duration']) % 60:02d}")
+        return " · ".join(part for part in parts if part)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.item(index.row())
+        if role == Qt.DisplayRole:
+            return item.get('title') or item.get('url') or ''
+        if role == self.SubtitleRole:
+            return self.subtitle(item)
+        if role == self.ProgressRole:
+            return item.get('progress') if item.get('status') == 'downloading' else None
+        if role == self.ItemRole:
+            return item
+        if role == Qt.ToolTipRole:
+            return item.get('output_path') or item.get('url')
+        if role == Qt.DecorationRole:
+            return self.thumbnail(item)
+        return None
+
+    def thumbnail(self, item):
+        # The cached pixmap, or a null one while it loads
+        url = item.get('thumbnail')
+        pixmap = QPixmapCache.find(f"thumb:{url}") if url else None
+        if pixmap is None:
+            if url and self.thumbnails is not None:
+                self.thumbnails.request(url)
+            return QPixmap()
+        return pixmap
+
+    def thumbnail_loaded(self, url, image):
+        QPixmapCache.insert(f"thumb:{url}", QPixmap.fromImage(image))
+        for item_id in self.by_thumbnail.get(url, ()):
+            key = self.item_keys.get(item_id)
+            if key is not None:
+                index = self.index(self._row(bisect.bisect_left(self.keys, key)))
+                self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+class ItemDelegate(QStyledItemDelegate):
+    """Paints a thumbnail, title, subtitle and progress bar per row, or a tile in grid mode."""
+    ROW_HEIGHT = 64
+    TILE_SIZE = QSize(200, 160)
+
+    def __init__(self, grid=False, parent=None):
+        super().__init__(parent)
+        self.grid = grid
+
+    def sizeHint(self, option, index):
+        if self.grid:
+            return self.TILE_SIZE
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def paint(self, painter, option, index):
+        # Read the item straight from the model, skipping a QVariant round trip per role
+        model = index.model()
+        item = model.item(index.row())
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = option.rect.adjusted(4, 4, -4, -4)
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, QColor("#4a4a4a"))
+        if self.grid:
+            thumb_rect = QRectF(rect.x(), rect.y(), rect.width(), rect.width() * 9 / 16).toRect()
+            text_rect = rect.adjusted(0, thumb_rect.height() + 4, 0, 0)
+        else:
+            thumb_rect = QRectF(rect.x(), rect.y(), rect.height() * 16 / 9, rect.height()).toRect()
+            text_rect = rect.adjusted(thumb_rect.width() + 10, 0, 0, 0)
+
+        pixmap = model.thumbnail(item)
+        if not pixmap.isNull():
+            # Centre crop to the thumbnail box
+            source = pixmap.rect()
+            scale = max(thumb_rect.width() / source.width(), thumb_rect.height() / source.height())
+            crop_width, crop_height = thumb_rect.width() / scale, thumb_rect.height() / scale
+            painter.drawPixmap(thumb_rect, pixmap, QRectF((source.width() - crop_width) / 2,
+                                                          (source.height() - crop_height) / 2,
+                                                          crop_width, crop_height).toRect())
+        else:
+            painter.fillRect(thumb_rect, QColor("#3b3b3b"))
+
+        metrics = option.fontMetrics
+        line = metrics.height()
+        title_font = QFont(option.font)
+        title_font.setBold(True)
+        painter.setFont(title_font)
+        painter.setPen(QColor("#ffffff"))
+        title = item.get('title') or item.get('url') or ''
+        painter.drawText(text_rect.x(), text_rect.y(), text_rect.width(), line, Qt.AlignLeft | Qt.AlignVCenter,
+                         metrics.elidedText(title, Qt.ElideRight, text_rect.width()))
+        painter.setFont(option.font)
+        painter.setPen(QColor("#aaaaaa"))
+        painter.drawText(text_rect.x(), text_rect.y() + line + 2, text_rect.width(), line,
+                         Qt.AlignLeft | Qt.AlignVCenter,
+                         metrics.elidedText(model.subtitle(item), Qt.ElideRight, text_rect.width()))
+
+        if item.get('status') == 'downloading':
+            progress = item.get('progress') or 0
+            bar = QRectF(text_rect.x(), text_rect.y() + 2 * line + 8, text_rect.width(), 6)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor("#555555"))
+            painter.drawRoundedRect(bar, 3, 3)
+            painter.setBrush(QColor("#4CAF50"))
+            painter.drawRoundedRect(QRectF(bar.x(), bar.y(), bar.width() * min(progress, 100) / 100, bar.height()), 3, 3)
+        painter.restore()
+
+class SearchResultsModel(ItemListModel):
+    """Keyword search results; the view's fetchMore loads the next page once it scrolls to the end."""
+    error = Signal(str)
+
+    def __init__(self, thumbnails=None, parent=None):
+        super().__init__(thumbnails, parent)
+        self.search = None
+        self.worker = None
+        self.retired = []
+
+    def start(self, query):
+        self.stop()
+        self.clear()
+        self.search = KeywordSearch(query)
+        self.fetchMore()
+
+    def stop(self):
+        if self.search is not None:
+            # The page being fetched finishes on its own thread and is dropped
+            search, self.search = self.search, None
+            threading.Thread(target=search.close, daemon=True).start()
+        if self.worker is not None:
+            self.retired.append(self.worker)
+            self.worker = None
+        self.retired = [w for w in self.retired if not w.isFinished()]
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return (not parent.isValid() and self.search is not None and not self.search.exhausted
+                and self.worker is None)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        search = self.search
+        self.worker = SearchPageWorker(search)
+        self.worker.finished.connect(lambda page: self.page_loaded(search, page))
+        self.worker.error.connect(lambda message: self.page_failed(search, message))
+        self.worker.start()
+
+    def page_loaded(self, search, page):
+        if search is not self.search:
+            return  # A newer search replaced this one
+        self.retired.append(self.worker)
+        self.worker = None
+        for item in page:
+            self.upsert(item)
+        self.flush()
+
+    def page_failed(self, search, message):
+        if search is not self.search:
+            return
+        self.retired.append(self.worker)
+        self.worker = None
+        search.exhausted = True
+        self.error.emit(message)
+
+class DownloadsDialog(QDialog):
+    """All jobs of the queue in a virtualised list, with filtering, sorting and a grid mode."""
+    STATUS_FILTERS = (
+        ("All", None),
+        ("Active", ('queued', 'downloading')),
+        ("Finished", ('finished',)),
+        ("Failed", ('failed', 'cancelled')),
+    )
+    SORTS = (
+        ("Added", 'added', False),
+        ("Newest", 'added', True),
+        ("Title", 'title', False),
+        ("Status", 'status', False),
+        ("Progress", 'progress', False),
+    )
+
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.setWindowTitle("Downloads")
+        self.resize(900, 600)
+        self.setStyleSheet("""
+            QDialog {
+                background-color: #2b2b2b;
             }
-            QLabel {
-                color: white;
-                padding: 5px;
+            QLineEdit, QComboBox {
+                padding: 8px;
+                border: 2px solid #555555;
+                border-radius: 8px;
+                font-size: 14px;
+                color: #ffffff;
+                background-color: #3b3b3b;
             }
-            QPushButton {
-                background-color: #4CAF50;
+            QLineEdit:focus {
+                border-color: #FF0000;
+            }
+            QListView {
+                background-color: #333333;
                 color: white;
-                border: none;
-                padding: 8px 15px;
+                border: 1px solid #555555;
                 border-radius: 5px;
-                font-weight: bold;
-                min-width: 100px;
             }
-            QPushButton:hover {
-                background-color: #45a049;
+            QCheckBox, QLabel {
+                color: #aaaaaa;
             }
         """)
-        
-        # Main layout
+
         layout = QVBoxLayout(self)
         layout.setContentsMargins(20, 20, 20, 20)
-        layout.setSpacing(15)
-        
-        # Header with icon
-        header_layout = QHBoxLayout()
-        
-        # Success icon
-        icon_label = QLabel()
-        success_icon = create_svg_icon("""
-            <svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24">
-                <path fill="#4CAF50" d="M9 16.17L4.83 12l-1.42 1.41L9 19 21 7l-1.41-1.41L9 16.17z"/>
-            </svg>
-        """, QSize(32, 32))
-        icon_label.setPixmap(success_icon)
-        header_layout.addWidget(icon_label)
-        
-        # Title
-        title_label = QLabel("Download Complete!")
-        title_label.setStyleSheet("font-size: 18px; font-weight: bold; color: #4CAF50;")
-        header_layout.addWidget(title_label)
-        header_layout.addStretch()
-        
-        # Close button
-        close_button = QPushButton("×")
-        close_button.setStyleSheet("""
-            QPushButton {
-                background: transparent;
-                color: #aaa;
-                font-size: 20px;
-                font-weight: bold;
-                padding: 5px;
-                min-width: 30px;
-            }
-            QPushButton:hover {
-                background: transparent;
-                color: white;
-            }
-        """)
-        close_button.clicked.connect(self.close)
-        header_layout.addWidget(close_button)
-        
-        layout.addLayout(header_layout)
-        
-        # Message
-        self.message_label = QLabel()
-        self.message_label.setWordWrap(True)
-        self.message_label.setStyleSheet("font-size: 14px;")
-        layout.addWidget(self.message_label)
-        
-        # Spacer
-        layout.addStretch()
-        
-        # Buttons
-        button_layout = QHBoxLayout()
-        button_layout.setSpacing(10)
-        
-        self.open_folder_btn = QPushButton("Open Folder")
-        self.open_folder_btn.setIcon(QIcon(create_svg_icon(LOCATION_ICON, QSize(16, 16))))
-        button_layout.addWidget(self.open_folder_btn)
-        
-        ok_button = QPushButton("OK")
-        ok_button.clicked.connect(self.close)
-        button_layout.addWidget(ok_button)
-        
-        layout.addLayout(button_layout)
-        
-        # Auto-close timer
+        layout.setSpacing(10)
+
+        controls = QHBoxLayout()
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Filter by title or URL...")
+        self.status_combo = QComboBox()
+        for label, statuses in self.STATUS_FILTERS:
+            self.status_combo.addItem(label, statuses)
+        self.sort_combo = QComboBox()
+        for label, key, descending in self.SORTS:
+            self.sort_combo.addItem(f"Sort: {label}", (key, descending))
+        self.grid_check = QCheckBox("Grid")
+        controls.addWidget(self.filter_input)
+        controls.addWidget(self.status_combo)
+        controls.addWidget(self.sort_combo)
+        controls.addWidget(self.grid_check)
+        layout.addLayout(controls)
+
+        self.view = QListView()
+        self.view.setModel(model)
+        self.delegate = ItemDelegate(parent=self.view)
+        self.view.setItemDelegate(self.delegate)
+        # Uniform sizes let the view skip measuring rows, which keeps 50k rows smooth
+        self.view.setUniformItemSizes(True)
+        self.view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.view.doubleClicked.connect(self.open_item)
+        layout.addWidget(self.view)
+
+        self.count_label = QLabel()
+        layout.addWidget(self.count_label)
+
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(150)
+        self.filter_timer.timeout.connect(self.apply_filter)
+        self.filter_input.textChanged.connect(self.filter_timer.start)
+        self.status_combo.currentIndexChanged.connect(self.apply_filter)
+        self.sort_combo.currentIndexChanged.connect(self.apply_sort)
+        self.grid_check.toggled.connect(self.set_grid)
+        model.rowsInserted.connect(self.update_count)
+        model.rowsRemoved.connect(self.update_count)
+        model.modelReset.connect(self.update_count)
+        self.update_count()
+
+    def apply_filter(self):
+        self.model.set_filter(self.filter_input.text(), self.status_combo.currentData())
+
+    def apply_sort(self):
+        self.model.set_sort(*self.sort_combo.currentData())
+
+    def set_grid(self, grid):
+        self.delegate.grid = grid
+        self.view.setViewMode(QListView.IconMode if grid else QListView.ListMode)
+        self.view.setResizeMode(QListView.Adjust)
+        self.view.setMovement(QListView.Static)
+        self.view.setSpacing(6 if grid else 0)
+
+    def update_count(self):
+        shown, total = self.model.rowCount(), len(self.model.items)
+        self.count_label.setText(f"{shown} of {total} item{'s' if total != 1 else ''}")
+
+    def open_item(self, index):
+        item = self.model.item(index.row())
+        path = item.get('output_path')
+        if path:
+            QDesktopServices.openUrl(QUrl.fromLocalFile(os.path.dirname(path)))
+        elif item.get('url'):
+            QDesktopServices.openUrl(QUrl(item['url']))
+
+class EventLoopWatchdog(QObject):
+    """Measures how late the GUI event loop runs a periodic timer and samples
+    the main thread's stack whenever it falls threshold seconds behind.
+
+    Each stall is charged to the call site seen in most of its samples: the
+    innermost frame in this file, plus the library frame it was blocked in.
+    Stalls are printed as they end and aggregated per call site into
+    DATA_DIR/stalls.json.
+    """
+    INTERVAL = 0.05
+
+    def __init__(self, threshold=0.25, report_path=None, parent=None):
+        super().__init__(parent)
+        self.threshold = threshold
+        self.report_path = report_path or os.path.join(DATA_DIR, "stalls.json")
+        self.main_thread_id = threading.get_ident()
+        self.lock = threading.Lock()
+        self.last_tick = time.monotonic()
+        self.samples = []  # Stacks sampled during the current stall
+        self.latencies = deque(maxlen=int(60 / self.INTERVAL))  # The last minute of timer lateness
+        self.sites = {}
+        self.stopping = threading.Event()
         self.timer = QTimer(self)
-        self.timer.timeout.connect(self.close)
-        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+        self.thread = threading.Thread(target=self.monitor, name='stall-watchdog', daemon=True)
 
-    def show_notification(self, message, folder_path, callback):
-        self.message_label.setText(message)
-        self.open_folder_btn.clicked.connect(callback)
-        
-        # Position in bottom right
-        screen = QApplication.primaryScreen().geometry()
-        self.move(
-            screen.width() - self.width() - 20,
-            screen.height() - self.height() - 40
-        )
-        
-        self.show()
-        self.timer.start(10000)  # Auto-close after 10 seconds
+    def start(self):
+        self.last_tick = time.monotonic()
+        self.timer.start(int(self.INTERVAL * 1000))
+        self.thread.start()
 
-    def closeEvent(self, event):
-        self.hide()
-        self.closed.emit()
-        event.accept()
+    def tick(self):
+        now = time.monotonic()
+        with self.lock:
+            gap = now - self.last_tick
+            self.last_tick = now
+            samples, self.samples = self.samples, []
+        self.latencies.append(max(0.0, gap - self.INTERVAL))
+        if gap >= self.threshold and samples:
+            self.record(gap, samples)
+
+    def monitor(self):
+        # Runs on its own thread, so it keeps sampling while the GUI thread is blocked
+        while not self.stopping.wait(self.INTERVAL):
+            with self.lock:
+                stalled = time.monotonic() - self.last_tick >= self.threshold
+            if not stalled:
+                continue
+            frame = sys._current_frames().get(self.main_thread_id)
+            if frame is not None:
+                stack = traceback.extract_stack(frame)
+                with self.lock:
+                    self.samples.append(stack)
+
+    @staticmethod
+    def call_site(stack):
+        own = next((frame for frame in reversed(stack)
+                    if os.path.abspath(frame.filename) == os.path.abspath(__file__)), None)
+        inner = stack[-1]
+        site = f"{inner.name} ({os.path.basename(inner.filename)}:{inner.lineno})"
+        if own is not None and own is not inner:
+            site = f"{own.name} ({os.path.basename(own.filename)}:{own.lineno}) -> {site}"
+        return site
+
+    def record(self, duration, samples):
+        sites = [self.call_site(stack) for stack in samples]
+        site = Counter(sites).most_common(1)[0][0]
+        stack = samples[sites.index(site)]
+        entry = self.sites.setdefault(site, {'site': site, 'count': 0, 'total': 0.0, 'max': 0.0})
+        entry['count'] += 1
+        entry['total'] += duration
+        entry['max'] = max(entry['max'], duration)
+        entry['stack'] = traceback.format_list(stack[-10:])
+        print(f"UI stall: {duration * 1000:.0f} ms in {site}", file=sys.stderr)
+
+    def report(self):
+        latencies = sorted(self.latencies)
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0.0
+        return {
+            'threshold': self.threshold,
+            'latency': {'p50': percentile(0.5), 'p95': percentile(0.95), 'p99': percentile(0.99),
+                        'max': latencies[-1] if latencies else 0.0},
+            'stalls': sum(entry['count'] for entry in self.sites.values()),
+            'sites': sorted(self.sites.values(), key=lambda entry: entry['total'], reverse=True),
+        }
+
+    def write_report(self):
+        # Merges this session's call sites into the saved report
+        previous = {}
+        try:
+            with open(self.report_path, encoding='utf-8') as f:
+                previous = {entry['site']: entry for entry in json.load(f).get('sites', [])}
+        except (OSError, ValueError):
+            pass
+        report = self.report()
+        for entry in report['sites']:
+            old = previous.pop(entry['site'], None)
+            if old:
+                entry['count'] += old['count']
+                entry['total'] += old['total']
+                entry['max'] = max(entry['max'], old['max'])
+        report['sites'] = sorted(report['sites'] + list(previous.values()),
+                                 key=lambda entry: entry['total'], reverse=True)
+        report['stalls'] = sum(entry['count'] for entry in report['sites'])
+        os.makedirs(os.path.dirname(self.report_path), exist_ok=True)
+        tmp_path = self.report_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp_path, self.report_path)
+
+    def stop(self):
+        self.timer.stop()
+        self.stopping.set()
+        self.thread.join(1)
+        if self.sites:
+            try:
+                self.write_report()
+            except OSError:
+                pass
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler for every thread in the process.
+
+    A background thread records the stack of each thread every interval
+    seconds, keeping only code objects, so a sample costs a frame walk and a
+    counter update. Exports collapsed stacks and speedscope JSON.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = Counter()  # (thread name, code objects root first) -> count
+        self.started = None
+        self.stopped = None
+        self.stopping = threading.Event()
+        self.thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self.stopping.clear()
+        self.started = time.monotonic()
+        self.stopped = None
+        self.thread = threading.Thread(target=self.run, name='sampling-profiler', daemon=True)
+        self.thread.start()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stopping.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples[names.get(ident, str(ident)), tuple(stack)] += 1
+
+    def stop(self):
+        if self.running:
+            self.stopping.set()
+            self.thread.join(1)
+            self.stopped = time.monotonic()
+
+    @staticmethod
+    def frame_name(code):
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def collapsed(self):
+        # One "thread;outer;...;inner count" line per distinct stack, as flamegraph.pl reads them
+        lines = []
+        for (thread, stack), count in self.samples.most_common():
+            lines.append(";".join([thread] + [self.frame_name(code) for code in stack]) + f" {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self):
+        frames = []
+        frame_index = {}
+        profiles = {}
+        for (thread, stack), count in self.samples.items():
+            indexes = []
+            for code in stack:
+                if code not in frame_index:
+                    frame_index[code] = len(frames)
+                    frames.append({'name': code.co_name, 'file': code.co_filename, 'line': code.co_firstlineno})
+                indexes.append(frame_index[code])
+            profile = profiles.setdefault(thread, {
+                'type': 'sampled', 'name': thread, 'unit': 'seconds', 'startValue': 0,
+                'endValue': 0, 'samples': [], 'weights': [],
+            })
+            profile['samples'].append(indexes)
+            profile['weights'].append(count * self.interval)
+            profile['endValue'] += count * self.interval
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': 'TubeMaster',
+            'exporter': 'TubeMaster',
+            'shared': {'frames': frames},
+            'profiles': sorted(profiles.values(), key=lambda profile: profile['name']),
+        }
+
+class MemorySnapshots:
+    """tracemalloc snapshots taken on request, reported as top allocations and diffs between them."""
+    FRAMES = 10
+    TOP = 30
 
-class TubeMasterPro(QMainWindow):
     def __init__(self):
+        self.snapshots = []  # (label, time, snapshot)
+        self.started_tracing = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.FRAMES)
+            self.started_tracing = True
+
+    def snapshot(self, label):
+        if not tracemalloc.is_tracing():
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        self.snapshots.append((label, datetime.now(), snapshot))
+        return snapshot
+
+    def stop(self):
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def report(self):
+        if not self.snapshots:
+            return "No memory snapshots were taken\n"
+        lines = []
+        label, taken, latest = self.snapshots[-1]
+        stats = latest.statistics('lineno')
+        lines.append(f"Top {self.TOP} allocations at {label} ({taken:%H:%M:%S}), "
+                     f"{format_size(sum(stat.size for stat in stats))} traced")
+        lines.extend(f"  {stat}" for stat in stats[:self.TOP])
+        for (old_label, _, old), (new_label, _, new) in zip(self.snapshots, self.snapshots[1:]):
+            lines.append(f"\nChanges from {old_label} to {new_label}")
+            lines.extend(f"  {stat}" for stat in new.compare_to(old, 'lineno')[:self.TOP])
+        if len(self.snapshots) > 2:
+            first_label, _, first = self.snapshots[0]
+            lines.append(f"\nChanges from {first_label} to {label}")
+            lines.extend(f"  {stat}" for stat in latest.compare_to(first, 'lineno')[:self.TOP])
+        return "\n".join(lines) + "\n"
+
+class Diagnostics:
+    """Profiler and memory snapshots written to a zip a user can send in with a bug report.
+
+    Started from the Help menu or with TUBEMASTER_DIAGNOSTICS=1 in the
+    environment; the value may also give the sampling interval in ms.
+    """
+    ENV = 'TUBEMASTER_DIAGNOSTICS'
+
+    def __init__(self, interval=0.01, output_dir=None):
+        self.profiler = SamplingProfiler(interval)
+        self.memory = MemorySnapshots()
+        self.output_dir = output_dir or os.path.join(DATA_DIR, "diagnostics")
+        self.started_at = None
+
+    @classmethod
+    def from_environment(cls):
+        value = os.environ.get(cls.ENV, '').strip()
+        if not value or value == '0':
+            return None
+        try:
+            interval = float(value) / 1000 if float(value) > 1 else 0.01
+        except ValueError:
+            interval = 0.01
+        diagnostics = cls(interval)
+        diagnostics.start()
+        # Written however the process ends, so a frozen build leaves a bundle behind
+        atexit.register(diagnostics.write_bundle)
+        return diagnostics
+
+    @property
+    def running(self):
+        return self.profiler.running
+
+    def start(self):
+        self.started_at = datetime.now()
+        self.profiler.samples.clear()
+        self.memory.snapshots = []
+        self.memory.start()
+        self.memory.snapshot("start")
+        self.profiler.start()
+
+    def snapshot(self):
+        return self.memory.snapshot(f"snapshot {len(self.memory.snapshots)}")
+
+    def stop(self):
+        self.profiler.stop()
+        self.memory.snapshot("stop")
+        self.memory.stop()
+
+    def info(self):
+        return {
+            'version': sys.version,
+            'platform': platform.platform(),
+            'frozen': bool(getattr(sys, 'frozen', False)),
+            'argv': sys.argv,
+            'yt_dlp': yt_dlp.version.__version__,
+            'started': self.started_at.isoformat() if self.started_at else None,
+            'written': datetime.now().isoformat(),
+            'sample_interval': self.profiler.interval,
+            'samples': sum(self.profiler.samples.values()),
+            'threads': [{'name': thread.name, 'daemon': thread.daemon} for thread in threading.enumerate()],
+            'coalesced': single_flight.stats(),
+        }
+
+    def write_bundle(self, extra=None):
+        """Stop recording and write the bundle, adding extra (name -> JSON-able value).
+
+        Returns the bundle's path, or None if nothing was recorded.
+        """
+        if self.started_at is None:
+            return None
+        if self.running:
+            self.stop()
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"tubemaster-diagnostics-{datetime.now():%Y%m%d-%H%M%S}.zip")
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as bundle:
+            bundle.writestr('info.json', json.dumps(self.info(), indent=2, default=str))
+            bundle.writestr('profile.collapsed.txt', self.profiler.collapsed())
+            bundle.writestr('profile.speedscope.json', json.dumps(self.profiler.speedscope()))
+            bundle.writestr('memory.txt', self.memory.report())
+            stalls = os.path.join(DATA_DIR, "stalls.json")
+            if os.path.exists(stalls):
+                bundle.write(stalls, 'stalls.json')
+            for name, value in (extra or {}).items():
+                bundle.writestr(name, json.dumps(value, indent=2, default=str))
+        self.started_at = None
+        return path
+
+class TubeMasterPro(QMainWindow):
+    def __init__(self, daemon_url=None, daemon_token=None, extraction_backend='process', write_policy=None,
+                 off_peak=None, disk=None, stall_threshold=0.25, diagnostics=None):
         super().__init__()
         self.setWindowTitle("TubeMaster Pro - CODED BY TELVIN TEUM")
         self.setMinimumSize(1000, 800)
         
+        # Report event loop stalls with the call site that caused them
+        self.watchdog = None
+        if stall_threshold:
+            self.watchdog = EventLoopWatchdog(stall_threshold, parent=self)
+            self.watchdog.start()
+        self.diagnostics = diagnostics or Diagnostics()
+        
         # Initialize variables first
         self.video_info = None
+        self.video_url = None
         self.is_searching = False
         self.search_worker = None
-        self.notification = None  # Store notification reference
+        self.notifications = NotificationManager(self, self)
+        self.notifications.open_folder.connect(self.open_download_folder)
+        self.metadata_cache = MetadataCache()
+        self.extraction_pool = None
+        if extraction_backend == 'process':
+            try:
+                self.extraction_pool = ExtractionPool()
+            except (OSError, ValueError):
+                # No usable process support, extract on the search thread instead
+                self.extraction_pool = None
+        try:
+            self.history = HistoryDatabase()
+        except sqlite3.Error:
+            self.history = None
+        
+        # Post-processing runs separately from the download workers
+        self.postprocessor = PostProcessManager()
+        self.postprocessor.queue_changed.connect(self.update_postprocess_status)
+        self.postprocessor.task_finished.connect(self.postprocess_finished)
+        self.postprocessor.task_failed.connect(self.postprocess_error)
+        self.last_postprocess = ""
+        
+        # Downloads run locally or, when attached, on a running daemon
+        if daemon_url:
+            self.queue = DaemonClient(daemon_url, daemon_token, self)
+            self.queue.request_failed.connect(self.download_error)
+            self.setWindowTitle(f"TubeMaster Pro - Attached to {daemon_url}")
+        else:
+            self.queue = DownloadQueue(history=self.history, postprocessor=self.postprocessor,
+                                       write_policy=write_policy, disk=disk, parent=self)
+        self.queue.job_updated.connect(self.update_job_progress)
+        self.queue.job_finished.connect(self.job_finished)
+        self.current_job_id = None
+        
+        # Every job of the session, for the downloads list
+        self.thumbnails = ThumbnailLoader(parent=self)
+        self.jobs_model = ItemListModel(self.thumbnails, self)
+        self.queue.job_updated.connect(self.jobs_model.upsert)
+        self.downloads_dialog = None
+        self.results_model = SearchResultsModel(self.thumbnails, self)
+        self.size_prober = SizeProber(parent=self)
+        self.size_prober.probed.connect(self.update_format_size)
+        self.results_model.error.connect(self.handle_keyword_search_error)
+        self.off_peak = off_peak or TimeWindow.parse("01:00-07:00")
         
         # Set default download directory
-        self.download_dir = os.path.join(os.path.expanduser("~"), "Downloads", "TubeMaster")
+        self.download_dir = DEFAULT_DOWNLOAD_DIR
         
         # Then setup UI
         self.setup_ui()
@@ -508,11 +5415,33 @@ class TubeMasterPro(QMainWindow):
                 color: #ffffff;
                 background-color: #3b3b3b;
             }
+            QMenuBar {
+                color: #ffffff;
+                background-color: #2b2b2b;
+            }
+            QMenuBar::item:selected, QMenu::item:selected {
+                background-color: #4CAF50;
+            }
+            QMenu {
+                color: #ffffff;
+                background-color: #3b3b3b;
+            }
         """)
 
     def setup_ui(self):
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
+        
+        # Diagnostics for "it's slow" reports
+        diagnostics_menu = self.menuBar().addMenu("Help").addMenu("Diagnostics")
+        self.profile_action = diagnostics_menu.addAction("Record Profile and Memory")
+        self.profile_action.setCheckable(True)
+        self.profile_action.setChecked(self.diagnostics.running)
+        self.profile_action.toggled.connect(self.toggle_diagnostics)
+        self.snapshot_action = diagnostics_menu.addAction("Take Memory Snapshot")
+        self.snapshot_action.setEnabled(self.diagnostics.running)
+        self.snapshot_action.triggered.connect(self.diagnostics.snapshot)
+        diagnostics_menu.addAction("Save Diagnostics Bundle").triggered.connect(self.save_diagnostics)
         layout = QVBoxLayout(central_widget)
         layout.setContentsMargins(20, 20, 20, 20)
         layout.setSpacing(20)
@@ -543,7 +5472,7 @@ class TubeMasterPro(QMainWindow):
         # Search section
         search_layout = QHBoxLayout()
         self.url_input = QLineEdit()
-        self.url_input.setPlaceholderText("Enter YouTube URL...")
+        self.url_input.setPlaceholderText("Enter a YouTube URL or search terms...")
         self.url_input.setStyleSheet("""
             QLineEdit {
                 padding: 15px;
@@ -576,10 +5505,63 @@ class TubeMasterPro(QMainWindow):
         """)
         self.search_button.clicked.connect(self.search_video)
         
+        self.history_button = QPushButton("History")
+        self.history_button.setStyleSheet("""
+            QPushButton {
+                padding: 15px 20px;
+                background-color: #666666;
+                color: white;
+                border: none;
+                border-radius: 8px;
+                font-weight: bold;
+                font-size: 16px;
+            }
+            QPushButton:hover {
+                background-color: #777777;
+            }
+            QPushButton:disabled {
+                background-color: #444444;
+            }
+        """)
+        self.history_button.clicked.connect(self.show_history)
+        self.history_button.setEnabled(self.history is not None)
+        
+        self.downloads_button = QPushButton("Downloads")
+        self.downloads_button.setStyleSheet(self.history_button.styleSheet())
+        self.downloads_button.clicked.connect(self.show_downloads)
+        
+        self.cookies_button = QPushButton("Cookies")
+        self.cookies_button.setStyleSheet(self.history_button.styleSheet())
+        self.cookies_button.setToolTip("Import a cookies.txt for signed-in or age-restricted videos")
+        self.cookies_button.clicked.connect(self.import_cookies)
+        self.cookies_button.setEnabled(cookie_store() is not None)
+        
         search_layout.addWidget(self.url_input)
         search_layout.addWidget(self.search_button)
+        search_layout.addWidget(self.downloads_button)
+        search_layout.addWidget(self.history_button)
+        search_layout.addWidget(self.cookies_button)
         layout.addLayout(search_layout)
 
+        # Keyword search results, shown once a search that isn't a URL has run
+        self.results_view = QListView()
+        self.results_view.setModel(self.results_model)
+        self.results_view.setItemDelegate(ItemDelegate(parent=self.results_view))
+        self.results_view.setUniformItemSizes(True)
+        self.results_view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.results_view.setMinimumHeight(260)
+        self.results_view.setStyleSheet("""
+            QListView {
+                background-color: #333333;
+                color: white;
+                border: 2px solid #555555;
+                border-radius: 10px;
+            }
+        """)
+        self.results_view.clicked.connect(self.select_result)
+        self.results_view.hide()
+        layout.addWidget(self.results_view)
+
         # Preview section
         self.preview_label = QLabel()
         self.preview_label.setAlignment(Qt.AlignCenter)
@@ -707,11 +5689,46 @@ class TubeMasterPro(QMainWindow):
         self.download_button.clicked.connect(self.start_download)
         self.download_button.setEnabled(False)
         
+        # Post-processing selection
+        self.postprocess_combo = QComboBox()
+        self.postprocess_combo.setStyleSheet(self.format_combo.styleSheet().replace("min-width: 300px", "min-width: 200px"))
+        for key, (label, ext, args) in POSTPROCESS_PRESETS.items():
+            self.postprocess_combo.addItem(label, key)
+        
         controls_layout.addWidget(self.format_combo)
+        controls_layout.addWidget(self.postprocess_combo)
         controls_layout.addWidget(self.location_button)
         controls_layout.addWidget(self.download_button)
         download_layout.addLayout(controls_layout)
         
+        # Sidecar files fetched alongside the download
+        sidecar_layout = QHBoxLayout()
+        sidecar_label = QLabel("Also save:")
+        sidecar_label.setStyleSheet("color: #aaaaaa; font-size: 13px;")
+        sidecar_layout.addWidget(sidecar_label)
+        self.sidecar_checks = {}
+        for kind, label in SIDECARS.items():
+            check = QCheckBox(label)
+            check.setStyleSheet("color: white; font-size: 13px;")
+            sidecar_layout.addWidget(check)
+            self.sidecar_checks[kind] = check
+        sidecar_layout.addStretch()
+        
+        # Scheduling: priority class and when the download may start
+        small_combo_style = self.format_combo.styleSheet().replace("min-width: 300px", "min-width: 120px")
+        self.priority_combo = QComboBox()
+        self.priority_combo.setStyleSheet(small_combo_style)
+        for priority in PRIORITIES:
+            self.priority_combo.addItem(f"{priority.title()} priority", priority)
+        self.priority_combo.setCurrentIndex(list(PRIORITIES).index('normal'))
+        self.schedule_combo = QComboBox()
+        self.schedule_combo.setStyleSheet(small_combo_style)
+        self.schedule_combo.addItem("Start now", None)
+        self.schedule_combo.addItem(f"Off-peak ({self.off_peak})", self.off_peak)
+        sidecar_layout.addWidget(self.priority_combo)
+        sidecar_layout.addWidget(self.schedule_combo)
+        download_layout.addLayout(sidecar_layout)
+        
         layout.addWidget(download_section)
 
         # Progress bar
@@ -734,6 +5751,12 @@ class TubeMasterPro(QMainWindow):
         """)
         layout.addWidget(self.progress_bar)
 
+        # Post-processing status
+        self.postprocess_label = QLabel()
+        self.postprocess_label.setStyleSheet("color: #aaaaaa; font-size: 13px;")
+        self.update_postprocess_status(0, 0)
+        layout.addWidget(self.postprocess_label)
+
     def show_loading(self, show=True):
         if show:
             self.loading_overlay.resize(self.size())
@@ -752,9 +5775,13 @@ class TubeMasterPro(QMainWindow):
         if self.is_searching:
             return
             
-        url = self.url_input.text()
+        url = self.url_input.text().strip()
         if not url:
-            QMessageBox.warning(self, "Error", "Please enter a YouTube URL")
+            QMessageBox.warning(self, "Error", "Please enter a YouTube URL or search terms")
+            return
+        text, url = url, as_url(url)
+        if url is None:
+            self.keyword_search(text)
             return
 
         self.show_loading(True)
@@ -763,15 +5790,33 @@ class TubeMasterPro(QMainWindow):
         self.preview_label.clear()
         self.title_label.clear()
         
-        self.search_worker = SearchWorker(url)
+        self.search_worker = SearchWorker(url, self.metadata_cache, self.extraction_pool)
         self.search_worker.progress.connect(self.loading_overlay.set_progress)
         self.search_worker.finished.connect(self.handle_search_complete)
         self.search_worker.error.connect(self.handle_search_error)
         self.search_worker.start()
 
+    def keyword_search(self, query):
+        # Flat result pages only; formats are resolved once a result is picked
+        self.results_model.start(query)
+        self.results_view.show()
+        self.results_view.scrollToTop()
+        self.preview_label.setMinimumHeight(220)
+
+    def select_result(self, index):
+        item = self.results_model.item(index.row())
+        if item.get('url'):
+            self.url_input.setText(item['url'])
+            self.search_video()
+
+    def handle_keyword_search_error(self, error_msg):
+        QMessageBox.critical(self, "Error", f"Search failed: {error_msg}")
+
     def handle_search_complete(self, result):
         try:
             self.video_info = result['info']
+            # Normalized by as_url, so the queue sees the host even for scheme-less links
+            self.video_url = self.search_worker.url
             
             # Update thumbnail
             if result['thumbnail']:
@@ -780,26 +5825,28 @@ class TubeMasterPro(QMainWindow):
                 self.preview_label.setPixmap(pixmap)
 
             # Update title
-            self.title_label.setText(self.video_info.get('title', ''))
+            self.title_label.setText(self.video_info.title or '')
+            full_size, compact_size = result['memory']
+            self.title_label.setToolTip(
+                f"Metadata retained: {self.format_size(compact_size)} "
+                f"(full info: {self.format_size(full_size)})"
+            )
 
             # Update formats
-            formats = self.video_info.get('formats', [])
+            formats = self.video_info.formats
             
             # Add video+audio formats
             for f in formats:
-                if f.get('acodec') != 'none' and f.get('vcodec') != 'none':
-                    format_str = f"Video+Audio - {f.get('ext', 'N/A')} - {f.get('format_note', 'N/A')}"
-                    if f.get('filesize'):
-                        format_str += f" ({self.format_size(f.get('filesize'))})"
-                    self.format_combo.addItem(format_str, f.get('format_id'))
+                if f.has_audio and f.has_video:
+                    self.format_combo.addItem(self.format_label(f), f.format_id)
             
             # Add audio-only formats
             for f in formats:
-                if f.get('acodec') != 'none' and f.get('vcodec') == 'none':
-                    format_str = f"Audio Only - {f.get('ext', 'N/A')} - {f.get('format_note', 'N/A')}"
-                    if f.get('filesize'):
-                        format_str += f" ({self.format_size(f.get('filesize'))})"
-                    self.format_combo.addItem(format_str, f.get('format_id'))
+                if f.has_audio and not f.has_video:
+                    self.format_combo.addItem(self.format_label(f), f.format_id)
+
+            # Sizes the site didn't report are filled in as the probes return
+            self.size_prober.probe(self.video_info)
 
             self.download_button.setEnabled(True)
 
@@ -808,6 +5855,23 @@ class TubeMasterPro(QMainWindow):
         finally:
             self.show_loading(False)
 
+    def format_label(self, f):
+        kind = "Video+Audio" if f.has_video else "Audio Only"
+        label = f"{kind} - {f.ext or 'N/A'} - {f.format_note or 'N/A'}"
+        if f.filesize:
+            label += f" ({self.format_size(f.filesize)})"
+        elif f.filesize_approx:
+            label += f" (~{self.format_size(f.filesize_approx)})"
+        return label
+
+    def update_format_size(self, video_id, format_id, size):
+        if self.video_info is None or (self.video_info.id or '') != video_id:
+            return  # A newer search replaced the list
+        index = self.format_combo.findData(format_id)
+        format_info = self.video_info.get_format(format_id)
+        if index >= 0 and format_info is not None:
+            self.format_combo.setItemText(index, self.format_label(format_info))
+
     def handle_search_error(self, error_msg):
         QMessageBox.critical(self, "Error", f"Error fetching video info: {error_msg}")
         self.show_loading(False)
@@ -851,76 +5915,460 @@ class TubeMasterPro(QMainWindow):
 
         format_id = self.format_combo.currentData()
         
-        # Create download worker with video info
-        self.download_worker = DownloadWorker(
-            self.url_input.text(),
-            format_id,
-            self.download_dir,
-            self.video_info
-        )
-        
-        self.download_worker.progress.connect(self.update_progress)
-        self.download_worker.finished.connect(self.download_finished)
-        self.download_worker.error.connect(self.download_error)
+        try:
+            self.current_job_id = self.queue.submit(
+                self.video_url,
+                format_id,
+                self.download_dir,
+                self.video_info,
+                self.postprocess_combo.currentData(),
+                [kind for kind, check in self.sidecar_checks.items() if check.isChecked()],
+                priority=self.priority_combo.currentData(),
+                window=self.schedule_combo.currentData()
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not start download: {str(e)}")
+            return
         
+        window = self.schedule_combo.currentData()
+        if window and not window.is_open(time.time()):
+            # Waits for the window, the next video can be queued meanwhile
+            self.progress_bar.setValue(0)
+            self.progress_bar.setFormat(f"Scheduled for {window}")
+            return
         self.download_button.setEnabled(False)
         self.progress_bar.setValue(0)
-        self.download_worker.start()
 
     def format_size(self, size):
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size < 1024.0:
-                return f"{size:.1f} {unit}"
-            size /= 1024.0
-        return f"{size:.1f} TB"
+        return format_size(size)
 
     def update_progress(self, percentage, status):
         self.progress_bar.setValue(int(percentage))
         self.progress_bar.setFormat(f"{percentage:.1f}% | {status}")
 
-    def download_finished(self):
-        self.download_button.setEnabled(True)
-        self.progress_bar.setValue(100)
-        
-        # Clean up previous notification if it exists
-        if self.notification:
-            self.notification.close()
-            self.notification = None
-        
-        # Create and show new notification
-        self.notification = NotificationWidget()
-        self.notification.closed.connect(self._on_notification_closed)
-        message = f"Video has been downloaded successfully!\nLocation: {self.download_dir}"
-        self.notification.show_notification(message, self.download_dir, self.open_download_folder)
+    def update_job_progress(self, job):
+        if job['id'] == self.current_job_id and job['status'] == 'downloading':
+            status = job['status_text']
+            sidecars = job.get('sidecars') or {}
+            if sidecars:
+                done = sum(1 for state in sidecars.values() if state['status'] != 'pending')
+                status += f" | Sidecars: {done}/{len(sidecars)}"
+            self.update_progress(job['progress'], status)
+        elif job['id'] == self.current_job_id and job['status'] == 'queued' and job['status_text']:
+            # Waiting for its schedule, a retry or disk space
+            self.progress_bar.setFormat(job['status_text'])
+
+    def job_finished(self, job):
+        if job['status'] == 'finished':
+            self.download_finished(job)
+        elif job['status'] == 'failed':
+            self.download_error(job['error'] if job['id'] == self.current_job_id
+                                else f"{job['title'] or job['url']}: {job['error']}")
+        elif job['id'] == self.current_job_id:
+            self.download_button.setEnabled(True)
 
-    def _on_notification_closed(self):
-        self.notification = None
+    def download_finished(self, job):
+        if job['id'] == self.current_job_id:
+            self.download_button.setEnabled(True)
+            self.progress_bar.setValue(100)
+        
+        # Completions are batched into a single reused notification
+        self.notifications.notify(job['output_path'], job['save_path'])
 
-    def open_download_folder(self):
+    def open_download_folder(self, folder=None):
+        folder = folder or self.download_dir
         try:
             if sys.platform == 'win32':
-                os.startfile(self.download_dir)
+                os.startfile(folder)
             elif sys.platform == 'darwin':  # macOS
-                os.system(f'open "{self.download_dir}"')
+                os.system(f'open "{folder}"')
             else:  # Linux
                 try:
-                    os.system(f'xdg-open "{self.download_dir}"')
+                    os.system(f'xdg-open "{folder}"')
                 except:
                     # Fallback to common file managers
                     for file_manager in ['nautilus', 'dolphin', 'thunar', 'pcmanfm', 'nemo']:
                         try:
-                            os.system(f'{file_manager} "{self.download_dir}"')
+                            os.system(f'{file_manager} "{folder}"')
                             break
                         except:
                             continue
         except Exception as e:
-            QMessageBox.warning(self, "Warning", f"Could not open folder: {str(e)}\nPath: {self.download_dir}")
+            QMessageBox.warning(self, "Warning", f"Could not open folder: {str(e)}\nPath: {folder}")
 
     def download_error(self, error_msg):
         self.download_button.setEnabled(True)
         QMessageBox.critical(self, "Download Error", str(error_msg))
 
+    def update_postprocess_status(self, queued, running):
+        status = f"Post-processing: {running} running, {queued} queued (pool of {self.postprocessor.max_workers})"
+        if self.last_postprocess:
+            status += f" | Last: {self.last_postprocess}"
+        self.postprocess_label.setText(status)
+
+    def postprocess_finished(self, preset, output_path, seconds):
+        label = POSTPROCESS_PRESETS[preset][0]
+        self.last_postprocess = f"{label} of {os.path.basename(output_path)} in {seconds:.1f}s"
+        self.update_postprocess_status(self.postprocessor.queued, self.postprocessor.running)
+
+    def postprocess_error(self, source, error_msg):
+        QMessageBox.warning(self, "Post-processing Error",
+                            f"Could not convert {os.path.basename(source)}:\n{error_msg}")
+
+    def show_history(self):
+        dialog = HistoryDialog(self.history, self)
+        dialog.exec()
+
+    def import_cookies(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Import Cookies", os.path.expanduser("~"),
+                                              "Cookie files (*.txt);;All files (*)")
+        if not path:
+            return
+        try:
+            count = cookie_store().import_cookies(path)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not import cookies:\n{str(e)}")
+            return
+        stats = cookie_store().stats()
+        QMessageBox.information(self, "Cookies",
+                                f"Imported {count} cookies, {stats['cookies']} stored for {stats['domains']} sites")
+
+    def show_downloads(self):
+        # Non-modal and kept around, so it keeps following the queue
+        if self.downloads_dialog is None:
+            self.downloads_dialog = DownloadsDialog(self.jobs_model, self)
+        self.downloads_dialog.show()
+        self.downloads_dialog.raise_()
+
+    def toggle_diagnostics(self, checked):
+        if checked and not self.diagnostics.running:
+            self.diagnostics.start()
+        elif not checked and self.diagnostics.running:
+            self.diagnostics.stop()
+        self.snapshot_action.setEnabled(self.diagnostics.running)
+
+    def save_diagnostics(self):
+        if self.diagnostics.started_at is None:
+            QMessageBox.information(self, "Diagnostics",
+                                    "Choose Help > Diagnostics > Record Profile and Memory, reproduce the "
+                                    "problem, then save the bundle.")
+            return
+        extra = {'stalls-session.json': self.watchdog.report()} if self.watchdog is not None else None
+        try:
+            path = self.diagnostics.write_bundle(extra)
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Could not write the diagnostics bundle:\n{str(e)}")
+            return
+        self.profile_action.setChecked(False)
+        QMessageBox.information(self, "Diagnostics", f"Diagnostics saved to:\n{path}")
+        QDesktopServices.openUrl(QUrl.fromLocalFile(os.path.dirname(path)))
+
+    def closeEvent(self, event):
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        self.notifications.close()
+        self.results_model.stop()
+        self.size_prober.shutdown()
+        self.thumbnails.stop()
+        self.queue.shutdown()
+        self.postprocessor.shutdown()
+        if self.extraction_pool is not None:
+            self.extraction_pool.shutdown()
+        if self.history is not None:
+            self.history.close()
+        super().closeEvent(event)
+
+def parse_size(text):
+    # Sizes like 512K, 4M or 1G; plain numbers are bytes
+    text = str(text).strip().upper().rstrip('B')
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+def write_policy_from_args(args):
+    return WritePolicy(
+        preallocate=args.preallocate,
+        buffer_size=args.write_buffer,
+        chunk_size=args.chunk_size,
+        fsync_interval=args.fsync_every,
+        staging_dir=os.path.expanduser(args.staging_dir) if args.staging_dir else None,
+        hash_algorithm=None if args.hash == 'none' else args.hash,
+    )
+
+def download_dir_from_args(args):
+    return os.path.expanduser(args.download_dir) if args.download_dir else None
+
+def disk_space_from_args(args):
+    return DiskSpaceManager(args.volume, args.min_free)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="TubeMaster Pro")
+    parser.add_argument('--daemon', action='store_true',
+                        help="run headless and accept jobs over the local HTTP API")
+    parser.add_argument('--attach', metavar='URL',
+                        help="use a running daemon for downloads, e.g. http://127.0.0.1:8765")
+    parser.add_argument('--host', default='127.0.0.1', help="daemon listen address")
+    parser.add_argument('--port', type=int, default=DEFAULT_DAEMON_PORT, help="daemon listen port")
+    parser.add_argument('--jobs', type=int, default=2, help="concurrent downloads in daemon mode")
+    parser.add_argument('--download-dir', help="default download directory for daemon and node jobs "
+                                                 "(ignored with --volume)")
+    parser.add_argument('--store', metavar='PATH', help="shared job store (SQLite file) for --node, --submit and --stats")
+    parser.add_argument('--node', action='store_true', help="run headless and work on jobs from --store")
+    parser.add_argument('--worker-id', help="node name in the job store (default: host-pid)")
+    parser.add_argument('--submit', nargs='+', metavar='URL', help="add URLs to --store and exit")
+    parser.add_argument('--format', default='best', help="yt-dlp format rule for --submit and --subscribe")
+    parser.add_argument('--postprocess', default='none', choices=list(POSTPROCESS_PRESETS),
+                        help="post-processing preset for --submit and --subscribe")
+    parser.add_argument('--window', type=TimeWindow.parse, metavar='HH:MM-HH:MM[/N]',
+                        help="off-peak window, e.g. 01:00-07:00/4: the daemon's default for API and "
+                             "subscription jobs, the window's \"Off-peak\" choice")
+    parser.add_argument('--extraction', choices=['process', 'thread'],
+                        default=os.environ.get('TUBEMASTER_EXTRACTION', 'process'),
+                        help="run video extraction in worker processes (default) or on a thread")
+    parser.add_argument('--preallocate', action='store_true',
+                        help="reserve each file's expected size before writing")
+    parser.add_argument('--write-buffer', type=parse_size, default='1M', help="write buffer size, e.g. 4M")
+    parser.add_argument('--chunk-size', type=parse_size, default='10M', help="bytes per HTTP range request")
+    parser.add_argument('--fsync-every', type=parse_size, default='0',
+                        help="fsync after this many bytes, 0 leaves flushing to the OS")
+    parser.add_argument('--staging-dir', help="download to this local directory, then move into place")
+    parser.add_argument('--volume', action='append', default=[], metavar='DIR',
+                        help="output volume for daemon and node jobs without a path, repeat to spread "
+                             "downloads across disks by free space and write speed")
+    parser.add_argument('--min-free', type=parse_size, default=str(DiskSpaceManager.MIN_FREE),
+                        help="free space to leave on every volume, e.g. 2G")
+    parser.add_argument('--hash', default='sha256', choices=HASH_ALGORITHMS + ['none'],
+                        help="hash computed while downloading, stored in the history")
+    parser.add_argument('--verify-library', action='store_true',
+                        help="check downloaded files against their stored hashes and exit")
+    parser.add_argument('--stall-threshold', type=float, default=250, metavar='MS',
+                        help="report GUI freezes longer than this, 0 disables the watchdog")
+    parser.add_argument('--stall-report', action='store_true',
+                        help="print the call sites of recorded GUI freezes and exit")
+    parser.add_argument('--stats', action='store_true', help="print job and per-worker lease stats of --store")
+    parser.add_argument('--subscribe', nargs='+', metavar='URL',
+                        help="mirror channels or playlists; the daemon queues their new entries")
+    parser.add_argument('--every', type=float, default=24, metavar='HOURS', help="sync interval for --subscribe")
+    parser.add_argument('--backfill', action='store_true',
+                        help="queue a new subscription's existing entries too, not just future ones")
+    parser.add_argument('--oldest-first', action='store_true',
+                        help="the subscription lists oldest entries first (most playlists); syncs list it fully")
+    parser.add_argument('--unsubscribe', nargs='+', metavar='URL_OR_ID', help="remove subscriptions")
+    parser.add_argument('--subscriptions', action='store_true', help="list subscriptions and exit")
+    parser.add_argument('--crawl', nargs='+', metavar='URL_OR_FILE',
+                        help="write metadata of videos, channels and playlists to --output without downloading; "
+                             "a file argument holds one URL per line")
+    parser.add_argument('--output', metavar='PATH',
+                        help="JSON Lines output for --crawl, compressed when it ends in .gz, .bz2 or .xz")
+    parser.add_argument('--fields', type=lambda value: [f.strip() for f in value.split(',') if f.strip()],
+                        metavar='A,B,...', help=f"fields per video for --crawl (default {','.join(CRAWL_FIELDS)})")
+    parser.add_argument('--crawl-jobs', type=int, default=4, help="concurrent extractions for --crawl")
+    parser.add_argument('--resume', action='store_true', help="continue a --crawl after its last written record")
+    parser.add_argument('--cookies', metavar='FILE', help="import a Netscape cookies.txt into the shared cookie store")
+    parser.add_argument('--cookies-from-browser', metavar='BROWSER[:PROFILE]',
+                        help="import cookies from a browser profile, e.g. firefox or chrome:Profile 1")
+    parser.add_argument('--clear-cookies', action='store_true', help="remove all stored cookies")
+    # Qt strips its own arguments, anything else unknown is ignored
+    args, _ = parser.parse_known_args(argv)
+    args.token = os.environ.get('TUBEMASTER_API_TOKEN')
+    return args
+
+def is_loopback_host(host):
+    # Whether every address host resolves to is local to this machine
+    if not host:
+        return False
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except socket.gaierror:
+        return False
+    return all(ipaddress.ip_address(address.split('%')[0]).is_loopback for address in addresses)
+
+def run_daemon(args):
+    if not args.token and not is_loopback_host(args.host):
+        print(f"Refusing to listen on {args.host} without TUBEMASTER_API_TOKEN set", file=sys.stderr)
+        sys.exit(1)
+    app = QCoreApplication(sys.argv)
+    try:
+        history = HistoryDatabase()
+    except sqlite3.Error:
+        history = None
+    postprocessor = PostProcessManager()
+    download_queue = DownloadQueue(max_concurrent=args.jobs, history=history, postprocessor=postprocessor,
+                                   write_policy=write_policy_from_args(args), download_dir=download_dir_from_args(args),
+                                   disk=disk_space_from_args(args))
+    subscriptions = SubscriptionManager(SubscriptionDatabase(), download_queue, window=args.window)
+    subscriptions.synced.connect(lambda result: print(f"Subscription sync: {json.dumps(result)}"))
+    server = ApiServer(download_queue, args.host, args.port, args.token, subscriptions=subscriptions,
+                       window=args.window)
+    server.start()
+    subscriptions.start()
+    print(f"TubeMaster daemon listening on {server.address}")
+
+    # Let Python handle Ctrl+C while the Qt event loop is running
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+    signal.signal(signal.SIGTERM, lambda *_: app.quit())
+    interrupt_timer = QTimer()
+    interrupt_timer.timeout.connect(lambda: None)
+    interrupt_timer.start(500)
+
+    code = app.exec()
+    server.stop()
+    subscriptions.stop()
+    download_queue.shutdown()
+    postprocessor.shutdown()
+    subscriptions.database.close()
+    if history is not None:
+        history.close()
+    sys.exit(code)
+
+def run_subscription_command(args):
+    database = SubscriptionDatabase()
+    save_path = os.path.expanduser(args.download_dir) if args.download_dir else None
+    for url in args.subscribe or []:
+        subscription_id = database.add(url, args.format, args.postprocess, save_path, args.every * 3600,
+                                       not args.oldest_first, args.backfill)
+        print(f"Subscribed {subscription_id}: {url}")
+    for key in args.unsubscribe or []:
+        removed = database.remove(int(key) if key.isdigit() else key)
+        print(f"{'Removed' if removed else 'No subscription'}: {key}")
+    if args.subscriptions:
+        for subscription in database.list():
+            synced = (datetime.fromtimestamp(subscription['last_synced']).strftime('%Y-%m-%d %H:%M')
+                      if subscription['last_synced'] else 'never')
+            print(f"{subscription['id']:>4}  {subscription['title'] or subscription['url']}  "
+                  f"every {subscription['interval'] / 3600:g}h, synced {synced}, "
+                  f"{subscription['queued']} queued" +
+                  (f", error: {subscription['last_error']}" if subscription['last_error'] else ""))
+    database.close()
+
+def run_store_command(args):
+    store = JobStore(args.store)
+    if args.submit:
+        save_path = os.path.expanduser(args.download_dir) if args.download_dir else None
+        for url in args.submit:
+            job_id = store.add(url, args.format, save_path, args.postprocess)
+            print(f"Queued job {job_id}: {url}")
+    if args.stats:
+        print(json.dumps(store.stats(), indent=2))
+    store.close()
+
+def run_node(args):
+    app = QCoreApplication(sys.argv)
+    store = JobStore(args.store)
+    postprocessor = PostProcessManager()
+    try:
+        history = HistoryDatabase()
+    except sqlite3.Error:
+        history = None
+    download_queue = DownloadQueue(max_concurrent=args.jobs, history=history, postprocessor=postprocessor,
+                                   write_policy=write_policy_from_args(args), download_dir=download_dir_from_args(args),
+                                   disk=disk_space_from_args(args))
+    runner = NodeRunner(store, download_queue, args.worker_id)
+    runner.start()
+    print(f"TubeMaster node {runner.worker_id} working on {args.store}")
+
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+    signal.signal(signal.SIGTERM, lambda *_: app.quit())
+    interrupt_timer = QTimer()
+    interrupt_timer.timeout.connect(lambda: None)
+    interrupt_timer.start(500)
+
+    code = app.exec()
+    # Give unfinished jobs back to the store before stopping the workers
+    runner.stop()
+    download_queue.shutdown()
+    postprocessor.shutdown()
+    store.close()
+    if history is not None:
+        history.close()
+    sys.exit(code)
+
+def run_verify_library():
+    history = HistoryDatabase()
+    counts = verify_library(history, lambda problem, path: print(f"{problem}: {path}"))
+    history.close()
+    print(", ".join(f"{count} {name}" for name, count in counts.items()))
+    return 1 if counts['corrupt'] or counts['missing'] else 0
+
+def print_stall_report():
+    try:
+        with open(os.path.join(DATA_DIR, "stalls.json"), encoding='utf-8') as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        print("No GUI stalls recorded")
+        return
+    print(f"{report['stalls']} stalls over {report['threshold'] * 1000:.0f} ms")
+    for entry in report['sites']:
+        print(f"\n{entry['total']:8.2f}s total, {entry['count']} stalls, max {entry['max'] * 1000:.0f} ms: "
+              f"{entry['site']}")
+        print("".join(entry['stack']).rstrip())
+
+def run_crawl(args):
+    if not args.output:
+        print("--crawl needs --output")
+        return 1
+    if not args.resume and os.path.exists(args.output) and os.path.getsize(args.output):
+        print(f"{args.output} exists; use --resume to continue it or choose another --output")
+        return 1
+
+    def progress(records, errors, rate):
+        if records % 50 == 0:
+            print(f"\r{records} records, {errors} errors, {rate:.1f}/s", end='', file=sys.stderr, flush=True)
+
+    try:
+        records, errors = crawl(args.crawl, args.output, args.fields, max(1, args.crawl_jobs), args.resume, progress)
+    except KeyboardInterrupt:
+        print(f"\nStopped; run again with --resume to continue {args.output}", file=sys.stderr)
+        return 130
+    print(f"\r{records} records, {errors} errors written to {args.output}", file=sys.stderr)
+    return 0
+
+def run_cookie_command(args):
+    # Imports happen before any other mode starts, so they also apply to that run
+    store = cookie_store()
+    if store is None:
+        print(f"Cookie store {os.path.join(DATA_DIR, 'cookies.db')} is not available")
+        sys.exit(1)
+    if args.clear_cookies:
+        store.clear()
+        print("Cleared stored cookies")
+    try:
+        if args.cookies:
+            print(f"Imported {store.import_cookies(cookie_file=os.path.expanduser(args.cookies))} cookies "
+                  f"from {args.cookies}")
+        if args.cookies_from_browser:
+            print(f"Imported {store.import_cookies(browser=args.cookies_from_browser)} cookies "
+                  f"from {args.cookies_from_browser}")
+    except Exception as e:
+        print(f"Could not import cookies: {e}")
+        sys.exit(1)
+
 def main():
+    args = parse_args(sys.argv[1:])
+    diagnostics = Diagnostics.from_environment()
+    if args.cookies or args.cookies_from_browser or args.clear_cookies:
+        run_cookie_command(args)
+    if args.stall_report:
+        print_stall_report()
+        return
+    if args.verify_library:
+        sys.exit(run_verify_library())
+    if args.crawl:
+        sys.exit(run_crawl(args))
+    if args.subscribe or args.unsubscribe or args.subscriptions:
+        run_subscription_command(args)
+        return
+    if args.daemon:
+        run_daemon(args)
+        return
+    if args.store:
+        if args.node:
+            run_node(args)
+        else:
+            run_store_command(args)
+        return
+
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
     
@@ -942,9 +6390,12 @@ def main():
         }
     """)
     
-    window = TubeMasterPro()
+    window = TubeMasterPro(args.attach, args.token, args.extraction, write_policy_from_args(args), args.window,
+                           DiskSpaceManager(min_free=args.min_free), args.stall_threshold / 1000, diagnostics)
     window.show()
     sys.exit(app.exec())
 
 if __name__ == '__main__':
+    # Needed for extraction processes in frozen builds
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,68 @@
+import http.cookiejar
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import CookieStore
+
+
+def make_cookie(name, value, expires=None):
+    expires = expires or int(time.time()) + 3600
+    return http.cookiejar.Cookie(0, name, value, None, False, '.example.com', True, True,
+                                 '/', True, False, expires, False, None, None, {})
+
+
+def sent_cookies(store):
+    # The Cookie header a request to the site would carry
+    request = urllib.request.Request('http://www.example.com/')
+    store.jar().add_cookie_header(request)
+    return request.get_header('Cookie')
+
+
+class CookieStoreSharingTest(unittest.TestCase):
+    """Two stores on one database stand in for two TubeMaster processes."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, 'cookies.db')
+        self.first = CookieStore(path)
+        self.second = CookieStore(path)
+        self.first.jar().set_cookie(make_cookie('SID', 'one'))
+        self.assertTrue(self.first.save())
+        self.assertEqual(sent_cookies(self.second), 'SID=one')
+
+    def tearDown(self):
+        self.first.conn.close()
+        self.second.conn.close()
+        shutil.rmtree(self.directory)
+
+    def test_clear_elsewhere_stops_sending(self):
+        self.first.clear()
+        self.assertIsNone(sent_cookies(self.second))
+
+    def test_delete_elsewhere_stops_sending(self):
+        self.first.jar().clear('.example.com', '/', 'SID')
+        self.assertTrue(self.first.save())
+        self.assertIsNone(sent_cookies(self.second))
+
+    def test_update_elsewhere_replaces_value(self):
+        self.first.jar().set_cookie(make_cookie('SID', 'two'))
+        self.assertTrue(self.first.save())
+        self.assertEqual(sent_cookies(self.second), 'SID=two')
+
+    def test_unsaved_changes_survive_reload(self):
+        self.second.jar().set_cookie(make_cookie('PREF', 'local'))
+        self.first.clear()
+        self.assertEqual(sent_cookies(self.second), 'PREF=local')
+        self.assertTrue(self.second.save())
+        self.assertEqual(sent_cookies(self.first), 'PREF=local')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import http.server
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import WritePolicy, download_http
+
+BODY = bytes(range(256)) * 40
+
+
+class RangeHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        start, end = 0, len(BODY) - 1
+        header = self.headers.get('Range')
+        if header:
+            first, last = header.split('=', 1)[1].split('-')
+            start = int(first)
+            end = min(int(last or end), end)
+        if start >= len(BODY):
+            self.send_response(416)
+            self.send_header('Content-Range', f"bytes */{len(BODY)}")
+            self.end_headers()
+            return
+        data = BODY[start:end + 1]
+        self.send_response(206 if header else 200)
+        if header:
+            self.send_header('Content-Range', f"bytes {start}-{end}/{len(BODY)}")
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class DownloadHttpSizeTest(unittest.TestCase):
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/video"
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'video.mp4')
+        self.policy = WritePolicy(chunk_size=1000, hash_algorithm=None)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def test_unknown_size_uses_server_total(self):
+        self.assertEqual(download_http(self.url, self.path, self.policy), len(BODY))
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), BODY)
+
+    def test_matching_estimate(self):
+        written = download_http(self.url, self.path, self.policy, expected_size=len(BODY))
+        self.assertEqual(written, len(BODY))
+
+    def test_underestimated_size_fails_instead_of_truncating(self):
+        with self.assertRaises(ValueError):
+            download_http(self.url, self.path, self.policy, expected_size=len(BODY) - 1500)
+        self.assertFalse(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(self.path + '.part'))
+
+    def test_overestimated_size_fails(self):
+        with self.assertRaises(ValueError):
+            download_http(self.url, self.path, self.policy, expected_size=len(BODY) + 1500)
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
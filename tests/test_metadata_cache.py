@@ -0,0 +1,46 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import MetadataCache
+
+
+class MetadataCacheBoundsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def age(self, cache, video_id, seconds):
+        modified = time.time() - seconds
+        os.utime(cache.path_for(video_id), (modified, modified))
+
+    def test_expired_entries_are_misses(self):
+        cache = MetadataCache(self.directory, ttl=60)
+        cache.put('a', {'id': 'a'})
+        self.assertEqual(cache.get('a'), {'id': 'a'})
+        self.age(cache, 'a', 120)
+        self.assertIsNone(cache.get('a'))
+        self.assertFalse(os.path.exists(cache.path_for('a')))
+
+    def test_least_recently_used_are_pruned(self):
+        cache = MetadataCache(self.directory, max_entries=2)
+        cache.put('a', {'id': 'a'})
+        cache.put('b', {'id': 'b'})
+        self.age(cache, 'a', 20)
+        self.age(cache, 'b', 10)
+        cache.get('a')  # Now used more recently than b
+        cache.put('c', {'id': 'c'})
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+
+if __name__ == '__main__':
+    unittest.main()